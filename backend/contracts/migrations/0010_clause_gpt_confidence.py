@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 12:00
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0009_alter_legalanalysis_affected_laws_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clause',
+            name='gpt_confidence',
+            field=models.FloatField(blank=True, help_text='Confianza declarada por el LLM (0-1); vacía si el LLM no evaluó la cláusula', null=True, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)]),
+        ),
+    ]
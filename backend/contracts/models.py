@@ -127,6 +127,12 @@ class Clause(models.Model):
     gpt_is_abusive = models.BooleanField(default=False)
     gpt_explanation = models.TextField(blank=True, null=True, help_text="Explicación del análisis GPT")
     gpt_suggested_fix = models.TextField(blank=True, null=True, help_text="Sugerencia de corrección de GPT")
+    gpt_confidence = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        help_text="Confianza declarada por el LLM (0-1); vacía si el LLM no evaluó la cláusula"
+    )
     
     # Posición en el documento
     start_position = models.IntegerField(null=True, blank=True)
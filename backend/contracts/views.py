@@ -17,10 +17,36 @@ from .serializers import (
 )
 from ml_analysis.ml_service import ml_service
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
 
+def _sanitize_confidence(value):
+    """
+    Normaliza la confianza declarada por el LLM a un float en [0, 1]. Acepta números o textos
+    ("0.9", "85%") y trata los valores entre 1 y 100 como porcentajes; devuelve None si no es
+    un número válido.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        if isinstance(value, str):
+            text = value.strip().replace(',', '.')
+            confidence = float(text.rstrip('%').strip())
+            if text.endswith('%'):
+                confidence /= 100
+        else:
+            confidence = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(confidence):
+        return None
+    if 1 < confidence <= 100:
+        confidence /= 100
+    return min(1.0, max(0.0, confidence))
+
+
 class ContractTypeViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para tipos de contratos (solo lectura)"""
     queryset = ContractType.objects.all()
@@ -251,7 +277,8 @@ class ContractViewSet(viewsets.ModelViewSet):
                     gpt_is_valid_clause=gpt_analysis.get('is_valid_clause', True),
                     gpt_is_abusive=gpt_is_abusive,
                     gpt_explanation=gpt_analysis.get('explanation') or '',
-                    gpt_suggested_fix=gpt_analysis.get('abusive_reason') or ''
+                    gpt_suggested_fix=gpt_analysis.get('abusive_reason') or '',
+                    gpt_confidence=_sanitize_confidence(gpt_analysis.get('confidence')),
                     # --- FIN: Limpieza de datos GPT ---
                 )
             
@@ -273,7 +300,11 @@ class ContractViewSet(viewsets.ModelViewSet):
                     'executive_summary': analysis_result.get('executive_summary', ''),
                     'recommendations': analysis_result.get('recommendations', ''),
                     'ml_model_accuracy': None,
-                    'features_extracted': {}
+                    'features_extracted': {
+                        'analysis_paths': analysis_result.get('analysis_paths', {}),
+                        'degraded': analysis_result.get('degraded', False),
+                        'llm_usage': analysis_result.get('llm_usage', {})
+                    }
                 }
             )
             
@@ -395,7 +426,9 @@ def analyze_contract_task(contract_id: str):
                 'recommendations': analysis_results['recommendations'],
                 'features_extracted': {
                     'entities_count': len(analysis_results['entities']),
-                    'entities': analysis_results['entities'][:10]  # Limitamos para no sobrecargar
+                    'entities': analysis_results['entities'][:10],  # Limitamos para no sobrecargar
+                    'degraded': analysis_results.get('degraded', False),
+                    'llm_usage': analysis_results.get('llm_usage', {})
                 }
             }
         )
@@ -35,3 +35,35 @@ group = None  # Mantener grupo actual
 
 # Configuraciones de red
 backlog = 2048
+
+
+def when_ready(server):
+    """
+    Con preload_app los modelos ML se cargan una vez en el master antes de forkear, y los
+    workers los comparten por copy-on-write en lugar de cargarlos en la primera petición.
+    Solo carga: nada de inferencia (los pools de hilos de LightGBM/OpenMP no sobreviven al fork)
+    ni consultas a la base de datos (los workers heredarían el mismo socket).
+    """
+    if not preload_app:
+        return
+    try:
+        from ml_analysis.warmup import warm_up
+        timings = warm_up(include_rag=False, inference=False)
+        server.log.info("Modelos precargados: %s", timings)
+    except Exception as e:
+        server.log.error("Error precargando modelos: %s", e)
+    finally:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    """Inferencia de prueba e índice RAG en cada worker, con sus propios hilos y conexión a la base de datos."""
+    if not preload_app:
+        return
+    try:
+        from ml_analysis.warmup import warm_up
+        timings = warm_up()
+        server.log.info("Worker %s listo: %s", worker.pid, timings)
+    except Exception as e:
+        server.log.error("Error en el warm-up del worker %s: %s", worker.pid, e)
@@ -1,13 +1,14 @@
+import os
+import json
 import logging
 import hashlib
+import threading
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple, Optional
 from django.utils import timezone
 from django.db.models import Q
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 
+from ml_analysis import shared_artifacts
 from .models import LegalArticle, RAGSearchHistory, LegalKnowledgeCache
 
 logger = logging.getLogger('legal_knowledge')
@@ -17,17 +18,36 @@ class SimpleLegalRAGService:
     """
     Servicio RAG simplificado para conocimiento legal dominicano.
     Formato: numero | tema | articulo | contenido | ley_asociada
+
+    El vectorizador se construye en la primera búsqueda (o con `warm_up()`), no al importar:
+    así el import no consulta la base de datos ni carga scikit-learn.
     """
     
     def __init__(self):
         self.vectorizer = None
         self.article_vectors = None
         self.articles_cache = []
-        self._initialize_vectorizer()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _ensure_initialized(self):
+        """Inicializa el vectorizador una sola vez (thread-safe)"""
+        if self._initialized:
+            return
+        with self._init_lock:
+            if not self._initialized:
+                self._initialize_vectorizer()
+                self._initialized = True
+
+    def warm_up(self):
+        """Construye el índice TF-IDF por adelantado para no penalizar la primera búsqueda"""
+        self._ensure_initialized()
     
     def _initialize_vectorizer(self):
         """Inicializa el vectorizador TF-IDF con todos los artículos activos"""
         try:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
             articles = LegalArticle.objects.filter(is_active=True)
             if not articles.exists():
                 logger.warning("No hay artículos legales disponibles para inicializar RAG")
@@ -53,7 +73,7 @@ class SimpleLegalRAGService:
                 })
             
             # Crear vectorizador TF-IDF optimizado para español legal
-            self.vectorizer = TfidfVectorizer(
+            vectorizer_params = dict(
                 stop_words=self._get_spanish_legal_stopwords(),
                 max_features=3000,
                 ngram_range=(1, 2),  # Unigramas y bigramas
@@ -63,8 +83,12 @@ class SimpleLegalRAGService:
                 strip_accents='unicode'
             )
             
-            # Entrenar y transformar el corpus
-            self.article_vectors = self.vectorizer.fit_transform(corpus)
+            # Reutilizar el índice ya publicado en disco para este corpus (mapeado en memoria y
+            # compartido entre workers); si no existe, entrenar y publicarlo
+            if not self._load_shared_index(corpus, vectorizer_params):
+                self.vectorizer = TfidfVectorizer(**vectorizer_params)
+                self.article_vectors = self.vectorizer.fit_transform(corpus)
+                self._publish_shared_index(corpus, vectorizer_params)
             
             logger.info(f"RAG inicializado con {len(self.articles_cache)} artículos legales")
             
@@ -73,6 +97,44 @@ class SimpleLegalRAGService:
             self.vectorizer = None
             self.article_vectors = None
     
+    def _shared_index_dir(self, corpus: List[str], vectorizer_params: Dict) -> Optional[str]:
+        """Directorio del índice TF-IDF para este corpus: la clave cambia si cambian artículos o parámetros."""
+        root = shared_artifacts.artifacts_dir('rag_index')
+        if not root:
+            return None
+        digest = hashlib.sha256(json.dumps([corpus, vectorizer_params], ensure_ascii=False, default=str).encode('utf-8'))
+        return os.path.join(root, digest.hexdigest()[:24])
+
+    def _load_shared_index(self, corpus: List[str], vectorizer_params: Dict) -> bool:
+        index_dir = self._shared_index_dir(corpus, vectorizer_params)
+        if not index_dir or not os.path.isdir(index_dir):
+            return False
+        try:
+            self.vectorizer = shared_artifacts.load_joblib(os.path.join(index_dir, 'vectorizer.joblib'))
+            self.article_vectors = shared_artifacts.load_csr(index_dir)
+            return True
+        except Exception as e:
+            logger.warning(f"Índice RAG en disco ilegible, se reconstruye: {e}")
+            return False
+
+    def _publish_shared_index(self, corpus: List[str], vectorizer_params: Dict):
+        """Guarda el índice en disco y lo recarga mapeado para no conservar la copia privada."""
+        index_dir = self._shared_index_dir(corpus, vectorizer_params)
+        if not index_dir:
+            return
+        try:
+            import joblib
+
+            tmp_dir = os.path.join(os.path.dirname(index_dir), f'.tmp-{os.getpid()}-{os.path.basename(index_dir)}')
+            os.makedirs(tmp_dir, exist_ok=True)
+            joblib.dump(self.vectorizer, os.path.join(tmp_dir, 'vectorizer.joblib'), compress=0)
+            shared_artifacts.save_csr(self.article_vectors, tmp_dir)
+            shared_artifacts.publish_directory(tmp_dir, index_dir)
+            shared_artifacts.prune_siblings(index_dir)
+            self._load_shared_index(corpus, vectorizer_params)
+        except Exception as e:
+            logger.warning(f"No se pudo publicar el índice RAG compartido: {e}")
+
     def _get_spanish_legal_stopwords(self):
         """Palabras vacías personalizadas para texto legal en español"""
         return [
@@ -123,10 +185,14 @@ class SimpleLegalRAGService:
     
     def _semantic_search(self, query: str, max_results: int, min_similarity: float) -> List[Dict]:
         """Búsqueda semántica usando TF-IDF"""
+        self._ensure_initialized()
         if not self.vectorizer or self.article_vectors is None:
             return []
         
         try:
+            import numpy as np
+            from sklearn.metrics.pairwise import cosine_similarity
+
             # Vectorizar la consulta
             query_vector = self.vectorizer.transform([query])
             
@@ -307,6 +373,7 @@ class SimpleLegalRAGService:
     def get_statistics(self) -> Dict:
         """Obtiene estadísticas del sistema RAG"""
         try:
+            self._ensure_initialized()
             stats = {
                 'total_articles': LegalArticle.objects.filter(is_active=True).count(),
                 'total_searches': RAGSearchHistory.objects.count(),
@@ -341,7 +408,9 @@ class SimpleLegalRAGService:
     def refresh_vectorizer(self):
         """Refresca el vectorizador"""
         logger.info("Refrescando vectorizador RAG...")
-        self._initialize_vectorizer()
+        with self._init_lock:
+            self._initialize_vectorizer()
+            self._initialized = True
 
 
 # Singleton instance
@@ -0,0 +1,114 @@
+import os
+import re
+import hashlib
+import unicodedata
+from typing import Optional
+
+from decouple import config
+
+from .llm_cache import LLMResponseCache
+
+
+# Versión de `normalize_clause_text`: forma parte de la versión de la cache, así que cambiar
+# la normalización purga las entradas calculadas con la anterior
+NORMALIZATION_VERSION = 2
+
+# Patrones de datos variables que se enmascaran antes de calcular el hash.
+# Dos cláusulas de la misma plantilla que solo difieren en estos datos comparten resultado.
+# Los números sueltos (porcentajes, plazos, cantidades) NO se enmascaran: "5%" frente a "50%"
+# o "1 día" frente a "30 días" cambian el veredicto de abusividad.
+_LEADING_HEADING = re.compile(
+    r'^\s*(?:(?:PRIMER[OA]?|SEGUND[OA]|TERCER[OA]?|CUART[OA]|QUINT[OA]|SEXT[OA]|S[EÉ]PTIM[OA]|OCTAV[OA]|'
+    r'NOVEN[OA]|D[EÉ]CIM[OA](?:\s+\w+)?|ART[IÍ]CULO\s+[\dIVXLC]+|CL[AÁ]USULA\s+[\dIVXLC]+|POR\s+CUANTO|POR\s+TANTO)'
+    r'\s*[:.\-–)]?\s*)',
+    re.IGNORECASE
+)
+_CEDULA = re.compile(r'\b\d{3}-?\d{7}-?\d\b')
+_MONEY = re.compile(r'(?:RD|US)?\$\s?[\d.,]+', re.IGNORECASE)
+_MONTHS = r'(?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|octubre|noviembre|diciembre)'
+_DATE = re.compile(
+    r'\b\d{1,2}\s+(?:de\s+)?' + _MONTHS + r'(?:\s+(?:de|del)\s+\d{4})?\b|\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
+    re.IGNORECASE
+)
+_TITLED_NAME = re.compile(
+    r'\b(?:señor|señora|sr\.|sra\.|srta\.|lic\.|licda\.|dr\.|dra\.|ing\.)\s+'
+    r'(?:[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+\s*){1,4}'
+)
+_COMPANY = re.compile(r'\b(?:[A-ZÁÉÍÓÚÑ&]{2,}\s+)+(?:[A-ZÁÉÍÓÚÑ&]{2,}),?\s*(?:S\.?\s?R\.?\s?L\.?|S\.?\s?A\.?)')
+# Secuencias de 2 a 4 palabras capitalizadas (nombres propios). Se excluyen los roles
+# contractuales para no confundir "El Inquilino" con "La Propietaria".
+_PROPER_NAME = re.compile(r'\b[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+(?:\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+){1,3}\b')
+_ROLE_WORDS = {
+    'el', 'la', 'los', 'las', 'de', 'del', 'y', 'en', 'por', 'este', 'esta', 'dicho', 'dicha',
+    'vendedor', 'vendedora', 'comprador', 'compradora', 'arrendador', 'arrendadora', 'arrendatario',
+    'arrendataria', 'inquilino', 'inquilina', 'propietario', 'propietaria', 'deudor', 'deudora',
+    'acreedor', 'acreedora', 'fiador', 'fiadora', 'socio', 'socia', 'parte', 'partes', 'contrato',
+    'primera', 'segunda', 'república', 'dominicana', 'código', 'civil', 'ley',
+}
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _mask_proper_name(match: re.Match) -> str:
+    words = match.group(0).split()
+    if any(word.lower() in _ROLE_WORDS for word in words):
+        return match.group(0)
+    return '<NOMBRE>'
+
+
+def normalize_clause_text(text: str) -> str:
+    """
+    Normaliza una cláusula para compararla con otras de la misma plantilla: quita el encabezado
+    ordinal, enmascara cédulas, montos, fechas y nombres, y unifica mayúsculas y espacios.
+    """
+    text = unicodedata.normalize('NFC', text)
+    text = _LEADING_HEADING.sub('', text, count=1)
+    text = _CEDULA.sub('<CEDULA>', text)
+    text = _MONEY.sub('<MONTO>', text)
+    text = _DATE.sub('<FECHA>', text)
+    text = _TITLED_NAME.sub('<NOMBRE> ', text)
+    text = _COMPANY.sub('<EMPRESA>', text)
+    text = _PROPER_NAME.sub(_mask_proper_name, text)
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+
+class ClauseAnalysisCache(LLMResponseCache):
+    """
+    Almacén de resultados por cláusula (clasificador, veredicto del LLM y entidades) compartido
+    entre contratos. La clave combina el hash del texto normalizado con la versión del modelo
+    clasificador y el nombre del modelo LLM, de modo que cambiar cualquiera de los dos invalida
+    las entradas; `invalidate_except` purga las de versiones anteriores.
+    """
+
+    table = 'clause_cache'
+
+    @staticmethod
+    def make_version(classifier_version: str, llm_model_name: str) -> str:
+        return f"{classifier_version}|{llm_model_name}|n{NORMALIZATION_VERSION}"
+
+    @staticmethod
+    def make_clause_key(clause_text: str, version: str) -> str:
+        normalized = normalize_clause_text(clause_text)
+        return hashlib.sha256(f"{version}\n{normalized}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def text_hash(clause_text: str) -> str:
+        """Hash del texto exacto; las entidades solo se reutilizan si coincide."""
+        return hashlib.sha256(clause_text.encode('utf-8')).hexdigest()
+
+
+def _default_db_path() -> Optional[str]:
+    from django.conf import settings
+    models_path = getattr(settings, 'ML_MODELS_PATH', None)
+    if not models_path:
+        return None
+    return os.path.join(models_path, 'clause_cache.sqlite3')
+
+
+# Instancia compartida por el proceso
+clause_cache = ClauseAnalysisCache(
+    db_path=config('CLAUSE_CACHE_PATH', default=None) or _default_db_path,
+    memory_size=config('CLAUSE_CACHE_MEMORY_SIZE', default=2048, cast=int),
+    max_entries=config('CLAUSE_CACHE_MAX_ENTRIES', default=200000, cast=int),
+    ttl_seconds=config('CLAUSE_CACHE_TTL_SECONDS', default=90 * 24 * 3600, cast=int),
+    enabled=config('CLAUSE_CACHE_ENABLED', default=True, cast=bool),
+)
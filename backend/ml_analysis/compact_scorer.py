@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import unicodedata
+from collections import Counter
+from typing import List
+
+from .featurizers import FEATURIZER_HASHING, FEATURIZER_TFIDF, featurizer_kind
+from .shared_artifacts import ARTIFACTS_MMAP_MODE
+
+BUNDLE_FORMAT_VERSION = 1
+# Archivos del paquete; el registro guarda el checksum de cada uno
+BUNDLE_FILES = ('config.json', 'vocabulary.txt', 'idf.npy', 'stopwords.txt', 'booster.txt')
+
+# Cláusulas de control con las que se compara el paquete con el Pipeline al exportarlo
+PARITY_SAMPLES = [
+    "El Inquilino acepta hacerse responsable de cualquier multa impuesta por regulaciones ajenas a su operación.",
+    "La señora Carla Estévez Herrera se obliga al pago de la suma de RD$3,200,000.00 al Banco Popular Dominicano.",
+    "El contrato se prorroga automáticamente cada año con un aumento de 25% en el alquiler, sin opción de renegociación.",
+    "El depósito de RD$ 20,000 no será devuelto si el inquilino decide no renovar.",
+    "Las partes eligen domicilio en sus respectivas direcciones indicadas al inicio del presente contrato.",
+    "LA PROPIETARIA PODRÁ RESCINDIR EL CONTRATO SIN PREVIO AVISO Y SIN INDEMNIZACIÓN ALGUNA.",
+    "",
+]
+
+
+def _strip_accents_unicode(text: str) -> str:
+    # Mismo criterio que sklearn: si ya es ASCII no se toca
+    try:
+        text.encode('ASCII', errors='strict')
+        return text
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize('NFKD', text)
+        return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+
+def _strip_accents_ascii(text: str) -> str:
+    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+
+
+_ACCENT_STRIPPERS = {'unicode': _strip_accents_unicode, 'ascii': _strip_accents_ascii}
+
+
+def export_bundle(pipeline, bundle_dir: str):
+    """
+    Exporta un Pipeline (featurizador TF-IDF o hashing + 'classifier' LightGBM) a un paquete de
+    inferencia compacto: el booster nativo de LightGBM en texto, el vocabulario en orden de
+    columna (vacío con hashing), el IDF como array NumPy, las stopwords y la configuración del
+    analizador. No contiene pickles.
+    """
+    import numpy as np
+
+    kind = featurizer_kind(pipeline)
+    featurizer = pipeline.steps[0][1]
+    classifier = pipeline.steps[-1][1]
+    if kind == FEATURIZER_HASHING:
+        vectorizer, weighting = featurizer.named_steps['hashing'], featurizer.named_steps['idf']
+        if vectorizer.norm is not None or vectorizer.alternate_sign:
+            raise ValueError('El paquete compacto requiere HashingVectorizer con norm=None y alternate_sign=False')
+    else:
+        vectorizer = weighting = featurizer
+    if vectorizer.analyzer != 'word' or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None:
+        raise ValueError('El paquete compacto solo admite el analizador de palabras estándar de sklearn')
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get) if kind == FEATURIZER_TFIDF else []
+    with open(os.path.join(bundle_dir, 'vocabulary.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(terms))
+    np.save(os.path.join(bundle_dir, 'idf.npy'), np.asarray(weighting.idf_, dtype=np.float64))
+    stop_words = sorted(vectorizer.get_stop_words() or [])
+    with open(os.path.join(bundle_dir, 'stopwords.txt'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(stop_words))
+    classifier.booster_.save_model(os.path.join(bundle_dir, 'booster.txt'))
+
+    config = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'featurizer': kind,
+        'n_features': int(len(weighting.idf_)),
+        'lowercase': vectorizer.lowercase,
+        'strip_accents': vectorizer.strip_accents,
+        'token_pattern': vectorizer.token_pattern,
+        'ngram_range': list(vectorizer.ngram_range),
+        'binary': vectorizer.binary,
+        'norm': weighting.norm,
+        'use_idf': weighting.use_idf,
+        'sublinear_tf': weighting.sublinear_tf,
+        'classes': [int(c) for c in classifier.classes_],
+    }
+    with open(os.path.join(bundle_dir, 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+
+
+class CompactClauseScorer:
+    """
+    Clasificador de cláusulas sobre un paquete exportado con `export_bundle`: reproduce el
+    TF-IDF de sklearn con un diccionario de vocabulario (o el hash MurmurHash3 de sklearn con
+    el featurizador 'hashing') y el IDF en un array, y puntúa con el booster nativo de LightGBM. Carga en milisegundos (sin unpickling de sklearn) y expone
+    `predict_proba` con la misma forma que el Pipeline para sustituirlo directamente.
+    """
+
+    def __init__(self, bundle_dir: str):
+        import numpy as np
+        import lightgbm as lgb
+
+        with open(os.path.join(bundle_dir, 'config.json'), encoding='utf-8') as f:
+            self.config = json.load(f)
+        if self.config.get('format_version') != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Versión de paquete no soportada: {self.config.get('format_version')}")
+        with open(os.path.join(bundle_dir, 'vocabulary.txt'), encoding='utf-8') as f:
+            self.vocabulary = {term: i for i, term in enumerate(f.read().split('\n')) if term}
+        with open(os.path.join(bundle_dir, 'stopwords.txt'), encoding='utf-8') as f:
+            self.stop_words = frozenset(word for word in f.read().split('\n') if word)
+        self.idf = np.load(os.path.join(bundle_dir, 'idf.npy'), mmap_mode=ARTIFACTS_MMAP_MODE)
+        self.booster = lgb.Booster(model_file=os.path.join(bundle_dir, 'booster.txt'))
+
+        self._token_re = re.compile(self.config['token_pattern'])
+        self._strip_accents = _ACCENT_STRIPPERS.get(self.config['strip_accents'])
+        self._min_n, self._max_n = self.config['ngram_range']
+        self.classes_ = np.asarray(self.config['classes'])
+        self.n_features = self.config.get('n_features', len(self.vocabulary))
+        self._hashing = self.config.get('featurizer', FEATURIZER_TFIDF) == FEATURIZER_HASHING
+        if self._hashing:
+            from sklearn.utils import murmurhash3_32
+            self._murmurhash = murmurhash3_32
+
+    def _columns(self, grams: List[str]) -> Counter:
+        """Conteos por columna: vocabulario (se ignoran términos desconocidos) o hashing."""
+        if self._hashing:
+            # Mismo índice que HashingVectorizer: abs(hash firmado) módulo n_features
+            return Counter(abs(self._murmurhash(g, seed=0)) % self.n_features for g in grams)
+        return Counter(self.vocabulary[g] for g in grams if g in self.vocabulary)
+
+    def _analyze(self, text: str) -> List[str]:
+        if self.config['lowercase']:
+            text = text.lower()
+        if self._strip_accents:
+            text = self._strip_accents(text)
+        tokens = [t for t in self._token_re.findall(text) if t not in self.stop_words]
+        if self._max_n == 1:
+            return tokens
+        grams = list(tokens) if self._min_n == 1 else []
+        for n in range(max(self._min_n, 2), self._max_n + 1):
+            grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def transform(self, texts: List[str]):
+        """Matriz TF-IDF dispersa equivalente a `TfidfVectorizer.transform`."""
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        data, indices, indptr = [], [], [0]
+        for text in texts:
+            counts = self._columns(self._analyze(text))
+            for column in sorted(counts):
+                indices.append(column)
+                data.append(counts[column])
+            indptr.append(len(indices))
+
+        values = np.asarray(data, dtype=np.float64)
+        columns = np.asarray(indices, dtype=np.int32)
+        if self.config['binary']:
+            values[:] = 1.0
+        elif self.config['sublinear_tf']:
+            values = np.log(values) + 1.0
+        if self.config['use_idf']:
+            values *= self.idf[columns]
+
+        offsets = np.asarray(indptr, dtype=np.int64)
+        norm = self.config['norm']
+        if norm and len(values):
+            row_ids = np.repeat(np.arange(len(texts)), np.diff(offsets))
+            row_norms = np.bincount(row_ids, weights=values ** 2 if norm == 'l2' else np.abs(values), minlength=len(texts))
+            if norm == 'l2':
+                row_norms = np.sqrt(row_norms)
+            row_norms[row_norms == 0.0] = 1.0
+            values /= row_norms[row_ids]
+        return csr_matrix((values, columns, offsets), shape=(len(texts), self.n_features))
+
+    def predict_proba(self, texts: List[str]):
+        import numpy as np
+
+        positive = self.booster.predict(self.transform(list(texts)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, texts: List[str]):
+        return self.classes_[(self.predict_proba(texts)[:, 1] >= 0.5).astype(int)]
+
+
+def parity_max_diff(pipeline, bundle_dir: str, texts: List[str] = None) -> float:
+    """
+    Diferencia absoluta máxima entre las probabilidades del Pipeline y las del paquete exportado
+    en `bundle_dir`, sobre `texts` (por defecto `PARITY_SAMPLES` más textos armados con el
+    vocabulario del paquete, para ejercitar sus n-gramas).
+    """
+    import numpy as np
+
+    scorer = CompactClauseScorer(bundle_dir)
+    if texts is None:
+        terms = sorted(scorer.vocabulary, key=scorer.vocabulary.get)
+        texts = PARITY_SAMPLES + [' '.join(terms[i:i + 25]) for i in range(0, min(len(terms), 500), 25)]
+    texts = list(texts)
+    expected = pipeline.predict_proba(texts)[:, 1]
+    actual = scorer.predict_proba(texts)[:, 1]
+    return float(np.max(np.abs(expected - actual)))
@@ -0,0 +1,155 @@
+import re
+import csv
+import hashlib
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_MAX_HASH = (1 << 32) - 1
+_TOKEN = re.compile(r'\w+')
+
+TEXT_COLUMNS = ('text', 'clausula')
+LABEL_COLUMNS = ('is_abusive', 'etiqueta')
+
+
+def normalize_for_dedup(text: str) -> str:
+    """Minúsculas, sin acentos y con espacios unificados: dos filas iguales bajo esta forma son duplicados exactos."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(_TOKEN.findall(text))
+
+
+def shingles(normalized: str, size: int = 3) -> List[bytes]:
+    words = normalized.split()
+    if len(words) < size:
+        return [normalized.encode('utf-8')] if normalized else []
+    return [' '.join(words[i:i + size]).encode('utf-8') for i in range(len(words) - size + 1)]
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bandas, filas por banda) cuyo umbral LSH aproximado (1/b)^(1/r) queda más cerca de `threshold`."""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1.0 / br[0]) ** (1.0 / br[1]) - threshold))
+
+
+class MinHasher:
+    """Firmas MinHash de `num_perm` permutaciones (hash universal módulo primo de Mersenne, vectorizado con NumPy)."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        import numpy as np
+
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_list: List[bytes]):
+        import numpy as np
+
+        if not shingle_list:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s, digest_size=4).digest(), 'little') for s in set(shingle_list)),
+            dtype=np.uint64,
+        )
+        # a < 2^31 y h < 2^32: el producto cabe en uint64 sin desbordar
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    Deduplicación en streaming con MinHash + LSH. Cada fila nueva se compara solo con los
+    representantes que comparten alguna banda de su firma; si la similitud de Jaccard estimada
+    alcanza el umbral se une a ese grupo, y si no abre uno nuevo. La memoria crece con el número
+    de grupos distintos, no con el de filas, así que escala a cientos de miles de filas.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 3):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows_per_band = choose_bands(num_perm, threshold)
+        self._buckets = [dict() for _ in range(self.bands)]
+        self._exact = {}
+        self.groups = []  # {'text', 'labels': Counter, 'size', 'signature'}
+        self.stats = {'rows': 0, 'exact_duplicates': 0, 'near_duplicates': 0}
+
+    def _band_keys(self, signature) -> List[bytes]:
+        r = self.rows_per_band
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add(self, text: str, label: int) -> int:
+        """Añade una fila y devuelve el índice de su grupo."""
+        self.stats['rows'] += 1
+        normalized = normalize_for_dedup(text)
+        exact_key = hashlib.sha1(normalized.encode('utf-8')).digest()
+        group_id = self._exact.get(exact_key)
+        if group_id is not None:
+            self.stats['exact_duplicates'] += 1
+            return self._join(group_id, label)
+
+        signature = self.hasher.signature(shingles(normalized, self.shingle_size))
+        band_keys = self._band_keys(signature)
+        candidates = {group for i, key in enumerate(band_keys) for group in self._buckets[i].get(key, ())}
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float((self.groups[candidate]['signature'] == signature).mean())
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is not None:
+            self.stats['near_duplicates'] += 1
+            self._exact[exact_key] = best
+            return self._join(best, label)
+
+        group_id = len(self.groups)
+        self.groups.append({'text': text, 'labels': Counter({label: 1}), 'size': 1, 'signature': signature})
+        self._exact[exact_key] = group_id
+        for i, key in enumerate(band_keys):
+            self._buckets[i].setdefault(key, []).append(group_id)
+        return group_id
+
+    def _join(self, group_id: int, label: int) -> int:
+        group = self.groups[group_id]
+        group['labels'][label] += 1
+        group['size'] += 1
+        return group_id
+
+    def collapsed(self, drop_conflicts: bool = True) -> Iterator[Tuple[str, int]]:
+        """Un (texto representativo, etiqueta mayoritaria) por grupo; los empates se omiten si `drop_conflicts`."""
+        for group in self.groups:
+            (label, votes), *rest = group['labels'].most_common()
+            if rest and rest[0][1] == votes and drop_conflicts:
+                continue
+            yield group['text'], label
+
+    def conflicts(self) -> List[Dict]:
+        """Grupos cuyas filas tienen etiquetas distintas (ruido de etiquetado o plantillas ambiguas)."""
+        return [
+            {'text': group['text'], 'size': group['size'], 'labels': dict(group['labels'])}
+            for group in self.groups if len(group['labels']) > 1
+        ]
+
+
+def iter_labelled_rows(path: str) -> Iterator[Tuple[str, int]]:
+    """Lee el CSV fila a fila (sin cargarlo entero) aceptando 'text,is_abusive' o 'clausula,etiqueta'."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        text_column = next((c for c in TEXT_COLUMNS if c in fields), None)
+        label_column = next((c for c in LABEL_COLUMNS if c in fields), None)
+        if not text_column or not label_column:
+            raise ValueError('El CSV debe contener las columnas "text" y "is_abusive" (o "clausula" y "etiqueta").')
+        for row in reader:
+            text, label = (row.get(text_column) or '').strip(), (row.get(label_column) or '').strip()
+            if not text or label == '':
+                continue
+            yield text, int(float(label))
+
+
+def deduplicate(rows: Iterable[Tuple[str, int]], threshold: float = 0.8, num_perm: int = 128) -> NearDuplicateIndex:
+    index = NearDuplicateIndex(threshold=threshold, num_perm=num_perm)
+    for text, label in rows:
+        index.add(text, label)
+    return index
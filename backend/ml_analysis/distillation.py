@@ -0,0 +1,138 @@
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .clause_cache import normalize_clause_text
+
+logger = logging.getLogger('ml_analysis')
+
+
+def harvest_llm_labels(min_confidence: float = 0.8, include_unscored: bool = False,
+                       chunk_size: int = 2000, since=None) -> Iterator[List[Tuple[str, int]]]:
+    """
+    Recorre la tabla `Clause` por bloques y devuelve, bloque a bloque, pares (texto, etiqueta)
+    con los veredictos del LLM aptos para destilar: cláusulas válidas, evaluadas de verdad por
+    el LLM (se descartan errores, modo degradado y cláusulas resueltas solo por el clasificador)
+    y con confianza declarada >= `min_confidence`. Las filas anteriores a `gpt_confidence`
+    (confianza vacía) solo se incluyen con `include_unscored`.
+    """
+    from django.db.models import Q
+    from contracts.models import Clause
+    from .ml_service import LLM_ERROR_EXPLANATION, LLM_DEGRADED_EXPLANATION
+
+    confidence = Q(gpt_confidence__gte=min_confidence)
+    if include_unscored:
+        confidence |= Q(gpt_confidence__isnull=True)
+    queryset = (
+        Clause.objects.filter(confidence, gpt_is_valid_clause=True)
+        .exclude(gpt_explanation__isnull=True)
+        .exclude(gpt_explanation__in=['', LLM_ERROR_EXPLANATION, LLM_DEGRADED_EXPLANATION])
+    )
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+
+    chunk = []
+    for text, is_abusive in queryset.values_list('text', 'gpt_is_abusive').iterator(chunk_size=chunk_size):
+        chunk.append((text, int(is_abusive)))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class LabelAggregator:
+    """
+    Agrupa los veredictos por plantilla de cláusula (`normalize_clause_text`) con voto mayoritario.
+    Las plantillas en empate se descartan: el LLM no es consistente con ellas.
+    """
+
+    def __init__(self):
+        self.votes = defaultdict(lambda: [0, 0])
+        self.examples = {}
+
+    def add(self, rows: List[Tuple[str, int]]):
+        for text, label in rows:
+            key = normalize_clause_text(text)
+            self.votes[key][label] += 1
+            self.examples.setdefault(key, text)
+
+    def labelled(self) -> List[Tuple[str, str, int]]:
+        """(clave de plantilla, texto representativo, etiqueta mayoritaria)."""
+        return [
+            (key, self.examples[key], int(votes[1] > votes[0]))
+            for key, votes in self.votes.items() if votes[0] != votes[1]
+        ]
+
+    @property
+    def conflicts(self) -> int:
+        return sum(1 for votes in self.votes.values() if votes[0] == votes[1])
+
+
+def split_holdout(rows: List[Tuple[str, str, int]], holdout_fraction: float) -> Tuple[List, List]:
+    """Separación determinista por plantilla: la misma plantilla nunca cae en ambos lados."""
+    threshold = int(holdout_fraction * 1000)
+    train, holdout = [], []
+    for row in rows:
+        bucket = int(hashlib.sha256(row[0].encode('utf-8')).hexdigest()[:8], 16) % 1000
+        (holdout if bucket < threshold else train).append(row)
+    return train, holdout
+
+
+def cascade_coverage(model, texts: List[str], labels: List[int], safe_threshold: float,
+                     abusive_threshold: float) -> Dict:
+    """
+    Proporción de cláusulas que el clasificador decide sin el LLM en modo cascada (probabilidad
+    fuera de la banda incierta) y acuerdo con el veredicto del LLM en esas cláusulas.
+    """
+    if not texts:
+        return {'coverage': 0.0, 'agreement': 0.0, 'decided': 0, 'total': 0}
+    probabilities = model.predict_proba(texts)[:, 1]
+    decided = agree = 0
+    for probability, label in zip(probabilities, labels):
+        if probability <= safe_threshold or probability >= abusive_threshold:
+            decided += 1
+            agree += int((probability >= abusive_threshold) == bool(label))
+    return {
+        'coverage': round(decided / len(texts), 4),
+        'agreement': round(agree / decided, 4) if decided else 0.0,
+        'decided': decided,
+        'total': len(texts),
+    }
+
+
+def boost_incrementally(pipeline, texts: List[str], labels: List[int], trees_per_chunk: int = 50,
+                        chunk_size: int = 5000, replay: Optional[Tuple[List[str], List[int]]] = None):
+    """
+    Continúa el boosting de LightGBM del Pipeline con las etiquetas del LLM, bloque a bloque
+    (`init_model` = booster anterior), sin reajustar el featurizador: el espacio de features
+    no cambia (con 'hashing' los términos nuevos también tienen columna). `replay` mezcla en
+    cada bloque una muestra del dataset original para no olvidar lo aprendido.
+    Devuelve un Pipeline nuevo; el original no se modifica.
+    """
+    import random
+    import lightgbm as lgb
+    from sklearn.pipeline import Pipeline
+
+    step_name, featurizer = pipeline.steps[0]
+    base = pipeline.steps[-1][1]
+    booster = base.booster_
+    classifier = base
+    rng = random.Random(42)
+    for start in range(0, len(texts), chunk_size):
+        chunk_texts = list(texts[start:start + chunk_size])
+        chunk_labels = list(labels[start:start + chunk_size])
+        if replay and replay[0]:
+            sample = rng.sample(range(len(replay[0])), min(len(replay[0]), len(chunk_texts)))
+            chunk_texts += [replay[0][i] for i in sample]
+            chunk_labels += [replay[1][i] for i in sample]
+        if len(set(chunk_labels)) < 2:
+            logger.warning(f"Bloque de destilación {start // chunk_size} con una sola clase: se omite")
+            continue
+        classifier = lgb.LGBMClassifier(**dict(base.get_params(), n_estimators=trees_per_chunk))
+        classifier.fit(featurizer.transform(chunk_texts), chunk_labels, init_model=booster)
+        booster = classifier.booster_
+        logger.info(f"Bloque de destilación {start // chunk_size}: {len(chunk_texts)} filas, "
+                    f"{booster.num_trees()} árboles en total")
+    return Pipeline([(step_name, featurizer), ('classifier', classifier)])
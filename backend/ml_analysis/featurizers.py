@@ -0,0 +1,52 @@
+from typing import Dict, List, Optional
+
+# Featurizadores del clasificador de cláusulas:
+#   'tfidf'   -> TfidfVectorizer con vocabulario ajustado (crece con el corpus y se serializa entero)
+#   'hashing' -> HashingVectorizer sin estado + vector IDF persistido: el tamaño del modelo no
+#                depende del corpus y textos nuevos no requieren reajustar ningún vocabulario
+FEATURIZER_TFIDF = 'tfidf'
+FEATURIZER_HASHING = 'hashing'
+FEATURIZERS = (FEATURIZER_TFIDF, FEATURIZER_HASHING)
+
+DEFAULT_HASH_FEATURES = 2 ** 18
+
+
+def build_featurizer(kind: str, stop_words: Optional[List[str]] = None, max_features: int = 2000,
+                     ngram_range=(1, 2), n_features: int = DEFAULT_HASH_FEATURES):
+    """
+    Construye el primer paso del Pipeline del clasificador. Devuelve (nombre del paso, estimador,
+    configuración para los metadatos del modelo). El paso TF-IDF conserva el nombre 'tfidf'
+    de los modelos existentes.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+    from sklearn.pipeline import Pipeline
+
+    if kind == FEATURIZER_TFIDF:
+        config = {'vectorizer': FEATURIZER_TFIDF, 'max_features': max_features, 'ngram_range': list(ngram_range)}
+        return 'tfidf', TfidfVectorizer(stop_words=stop_words, max_features=max_features, ngram_range=tuple(ngram_range)), config
+    if kind == FEATURIZER_HASHING:
+        config = {'vectorizer': FEATURIZER_HASHING, 'n_features': n_features, 'ngram_range': list(ngram_range)}
+        featurizer = Pipeline([
+            # Conteos crudos (sin signo alterno ni normalización): la ponderación la hace el IDF
+            ('hashing', HashingVectorizer(stop_words=stop_words, n_features=n_features, ngram_range=tuple(ngram_range),
+                                          alternate_sign=False, norm=None)),
+            ('idf', TfidfTransformer()),
+        ])
+        return 'features', featurizer, config
+    raise ValueError(f"Featurizador desconocido: {kind} (opciones: {', '.join(FEATURIZERS)})")
+
+
+def featurizer_kind(pipeline) -> str:
+    """Tipo de featurizador de un Pipeline entrenado (los modelos antiguos son siempre TF-IDF)."""
+    featurizer = pipeline.steps[0][1]
+    return FEATURIZER_HASHING if hasattr(featurizer, 'named_steps') and 'hashing' in featurizer.named_steps else FEATURIZER_TFIDF
+
+
+def describe_featurizer(pipeline) -> Dict:
+    """Tamaño del estado del featurizador: entradas de vocabulario y longitud del IDF."""
+    featurizer = pipeline.steps[0][1]
+    if featurizer_kind(pipeline) == FEATURIZER_HASHING:
+        return {'vectorizer': FEATURIZER_HASHING, 'vocabulary_size': 0,
+                'idf_length': len(featurizer.named_steps['idf'].idf_)}
+    return {'vectorizer': FEATURIZER_TFIDF, 'vocabulary_size': len(featurizer.vocabulary_),
+            'idf_length': len(featurizer.idf_)}
@@ -0,0 +1,206 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from decouple import config
+
+logger = logging.getLogger('ml_analysis')
+
+
+def load_secondary_backends() -> List[Dict[str, str]]:
+    """
+    Backends secundarios para hedging, desde `LLM_HEDGE_BACKENDS` (lista JSON), p. ej.:
+        [{"url": "https://api.together.xyz/v1/chat/completions", "model": "meta-llama/Llama-3-70b-chat-hf"},
+         {"url": "https://otro-proveedor/v1/chat/completions", "model": "...", "api_key_env": "OTRO_API_KEY"}]
+    `api_key_env` indica la variable con la API key (por defecto TOGETHER_API_KEY).
+    """
+    raw = config('LLM_HEDGE_BACKENDS', default='')
+    if not raw:
+        return []
+    try:
+        backends = json.loads(raw)
+    except ValueError:
+        logger.error("LLM_HEDGE_BACKENDS no es un JSON válido; hedging desactivado")
+        return []
+    valid = []
+    for backend in backends if isinstance(backends, list) else []:
+        if isinstance(backend, dict) and backend.get('url') and backend.get('model'):
+            valid.append({
+                'url': backend['url'],
+                'model': backend['model'],
+                'api_key': config(backend.get('api_key_env', 'TOGETHER_API_KEY'), default=''),
+            })
+    return valid
+
+
+class HedgingPolicy:
+    """
+    Peticiones "hedged" contra varios backends del LLM para recortar la latencia de cola.
+
+    Se envía la petición al backend primario; si no ha respondido tras `delay()` segundos
+    (el p95 de sus latencias recientes, acotado entre `min_delay` y `max_delay`), se envía un
+    duplicado al siguiente backend. Gana la primera respuesta válida y el resto se cancela.
+    Si un intento falla antes de la espera, el siguiente backend se lanza de inmediato.
+    """
+
+    def __init__(self, secondaries: List[Dict[str, str]], enabled: bool = True, percentile: float = 0.95,
+                 min_delay: float = 2.0, max_delay: float = 20.0, default_delay: float = 8.0, min_samples: int = 20):
+        self.secondaries = secondaries
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+
+        self._lock = threading.Lock()
+        self._primary_latencies = deque(maxlen=500)
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'primary_wins': 0, 'failures': 0}
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and bool(self.secondaries)
+
+    def delay(self) -> float:
+        """Espera antes de lanzar el duplicado: p95 reciente del primario (o `default_delay` sin historial)."""
+        with self._lock:
+            latencies = sorted(self._primary_latencies)
+        if len(latencies) < self.min_samples:
+            return self.default_delay
+        p95 = latencies[min(len(latencies) - 1, int(self.percentile * len(latencies)))]
+        return max(self.min_delay, min(self.max_delay, p95))
+
+    def _observe_primary(self, latency: float):
+        with self._lock:
+            self._primary_latencies.append(latency)
+
+    def _record(self, launched: int, winner: int):
+        with self._lock:
+            self.stats['requests'] += 1
+            if launched > 1:
+                self.stats['hedged'] += 1
+            if winner < 0:
+                self.stats['failures'] += 1
+            elif winner == 0:
+                self.stats['primary_wins'] += 1
+            else:
+                self.stats['hedge_wins'] += 1
+
+    def _timed_primary(self, attempt: Callable[[], Any], abandoned: threading.Event) -> Callable[[], Any]:
+        def run():
+            start = time.monotonic()
+            result = attempt()
+            # Si ya se abandonó, `call` registró su muestra censurada al perder
+            if not abandoned.is_set():
+                self._observe_primary(time.monotonic() - start)
+            return result
+        return run
+
+    def call(self, attempts: List[Callable[[], Any]]) -> Tuple[Any, int]:
+        """
+        Ejecuta `attempts` (primario primero) con hedging y devuelve (resultado, índice ganador).
+        A diferencia de `acall`, aquí el perdedor NO se cancela: con `requests` no se puede
+        interrumpir una petición en vuelo, así que se abandona y su hilo termina solo, consumiendo
+        igualmente su token del limitador y cuota del proveedor. Si el primario pierde, se registra
+        el tiempo transcurrido como muestra censurada de su latencia, igual que en `acall`.
+        Si todos fallan, relanza el último error.
+        """
+        delay = self.delay()
+        executor = ThreadPoolExecutor(max_workers=len(attempts), thread_name_prefix='llm-hedge')
+        abandoned = threading.Event()
+        primary_start = time.monotonic()
+        primary = executor.submit(self._timed_primary(attempts[0], abandoned))
+        futures = {primary: 0}
+        launched, last_error = 1, None
+        try:
+            while futures:
+                timeout = delay if launched < len(attempts) else None
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                failed = False
+                for future in done:
+                    index = futures.pop(future)
+                    if future.exception() is None:
+                        for loser in futures:
+                            loser.cancel()
+                        if index > 0 and primary in futures:
+                            abandoned.set()
+                            self._observe_primary(time.monotonic() - primary_start)
+                        self._record(launched, index)
+                        return future.result(), index
+                    last_error, failed = future.exception(), True
+                    logger.warning(f"Backend LLM #{index} falló en petición hedged: {last_error}")
+                if (not done or failed) and launched < len(attempts):
+                    if not done:
+                        logger.info(f"Backend LLM primario sin respuesta tras {delay:.1f}s: enviando petición duplicada")
+                    futures[executor.submit(attempts[launched])] = launched
+                    launched += 1
+        finally:
+            executor.shutdown(wait=False)
+        self._record(launched, -1)
+        raise last_error
+
+    async def acall(self, attempts: List[Callable[[], Awaitable[Any]]]) -> Tuple[Any, int]:
+        """Versión asyncio de `call`: aquí el perdedor sí se cancela (`Task.cancel`)."""
+        delay = self.delay()
+
+        async def timed_primary():
+            start = time.monotonic()
+            try:
+                result = await attempts[0]()
+            except asyncio.CancelledError:
+                # Primario cancelado porque ganó el duplicado: su latencia real es al menos la
+                # transcurrida. Sin esta muestra (censurada) el p95 solo vería primarios rápidos
+                # y el retardo del hedge bajaría sin motivo.
+                self._observe_primary(time.monotonic() - start)
+                raise
+            self._observe_primary(time.monotonic() - start)
+            return result
+
+        tasks = {asyncio.ensure_future(timed_primary()): 0}
+        launched, last_error = 1, None
+        try:
+            while tasks:
+                timeout = delay if launched < len(attempts) else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                failed = False
+                for task in done:
+                    index = tasks.pop(task)
+                    if task.exception() is None:
+                        self._record(launched, index)
+                        return task.result(), index
+                    last_error, failed = task.exception(), True
+                    logger.warning(f"Backend LLM #{index} falló en petición hedged: {last_error}")
+                if (not done or failed) and launched < len(attempts):
+                    tasks[asyncio.ensure_future(attempts[launched]())] = launched
+                    launched += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+        self._record(launched, -1)
+        raise last_error
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            metrics = dict(self.stats)
+        requests_count = metrics['requests']
+        metrics['hedge_rate'] = metrics['hedged'] / requests_count if requests_count else 0.0
+        metrics['hedge_win_rate'] = metrics['hedge_wins'] / metrics['hedged'] if metrics['hedged'] else 0.0
+        metrics['current_delay'] = self.delay()
+        metrics['backends'] = 1 + len(self.secondaries)
+        return metrics
+
+
+# Política compartida por el proceso
+llm_hedging = HedgingPolicy(
+    load_secondary_backends(),
+    enabled=config('LLM_HEDGING_ENABLED', default=False, cast=bool),
+    percentile=config('LLM_HEDGE_PERCENTILE', default=0.95, cast=float),
+    min_delay=config('LLM_HEDGE_MIN_DELAY', default=2.0, cast=float),
+    max_delay=config('LLM_HEDGE_MAX_DELAY', default=20.0, cast=float),
+    default_delay=config('LLM_HEDGE_DEFAULT_DELAY', default=8.0, cast=float),
+)
@@ -0,0 +1,117 @@
+import os
+import time
+import random
+import itertools
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+# Espacio de búsqueda por defecto de LightGBM (rejilla completa o muestreo aleatorio)
+DEFAULT_PARAM_SPACE = {
+    'num_leaves': [15, 31, 63],
+    'learning_rate': [0.03, 0.05, 0.1],
+    'n_estimators': [100, 200, 400],
+    'min_child_samples': [5, 10, 20],
+    'colsample_bytree': [0.5, 0.8, 1.0],
+}
+
+# Features de cada fold, cargadas una vez por proceso del pool (ver `_init_worker`)
+_FOLDS = None
+
+
+def candidate_params(space: Dict[str, List], mode: str = 'grid', n_iter: int = 20, seed: int = 42) -> List[Dict]:
+    """Candidatos de la búsqueda: todas las combinaciones ('grid') o `n_iter` sin repetir ('random')."""
+    keys = sorted(space)
+    combinations = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    if mode == 'random' and n_iter < len(combinations):
+        return random.Random(seed).sample(combinations, n_iter)
+    return combinations
+
+
+def precompute_folds(featurizer, texts: List[str], labels: List[int], n_folds: int = 5, seed: int = 42) -> List[Dict]:
+    """
+    Ajusta el featurizador una vez por fold (sobre su parte de entrenamiento) y guarda las matrices
+    dispersas de entrenamiento y validación: ningún candidato vuelve a vectorizar el texto.
+    """
+    from sklearn.base import clone
+    from sklearn.model_selection import StratifiedKFold
+
+    folds = []
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for train_idx, val_idx in splitter.split(texts, labels):
+        fold_featurizer = clone(featurizer)
+        folds.append({
+            'X_train': fold_featurizer.fit_transform([texts[i] for i in train_idx]),
+            'y_train': [labels[i] for i in train_idx],
+            'X_val': fold_featurizer.transform([texts[i] for i in val_idx]),
+            'y_val': [labels[i] for i in val_idx],
+        })
+    return folds
+
+
+def _init_worker(folds):
+    global _FOLDS
+    _FOLDS = folds
+
+
+def _evaluate(task):
+    """Entrena un candidato en un fold (un hilo de LightGBM por proceso) y devuelve sus métricas."""
+    import lightgbm as lgb
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+    candidate_index, params, fold_index, base_params = task
+    fold = _FOLDS[fold_index]
+    start = time.perf_counter()
+    model = lgb.LGBMClassifier(**dict(base_params, **params, n_jobs=1, verbose=-1))
+    model.fit(fold['X_train'], fold['y_train'])
+    probabilities = model.predict_proba(fold['X_val'])[:, 1]
+    predictions = (probabilities >= 0.5).astype(int)
+    try:
+        auc = roc_auc_score(fold['y_val'], probabilities)
+    except ValueError:
+        auc = float('nan')
+    return candidate_index, fold_index, {
+        'f1': f1_score(fold['y_val'], predictions, zero_division=0),
+        'accuracy': accuracy_score(fold['y_val'], predictions),
+        'auc': auc,
+        'fit_seconds': time.perf_counter() - start,
+    }
+
+
+def cross_validated_search(featurizer, texts: List[str], labels: List[int], base_params: Dict,
+                           space: Optional[Dict[str, List]] = None, mode: str = 'grid', n_iter: int = 20,
+                           n_folds: int = 5, n_jobs: Optional[int] = None, seed: int = 42) -> Dict:
+    """
+    Búsqueda de hiperparámetros de LightGBM con validación cruzada k-fold en un pool de procesos.
+    Devuelve los resultados por candidato (métricas por fold, media y desviación de F1) ordenados
+    de mejor a peor, el mejor candidato y los tiempos de la búsqueda.
+    """
+    candidates = candidate_params(space or DEFAULT_PARAM_SPACE, mode, n_iter, seed)
+    texts, labels = list(texts), [int(label) for label in labels]
+
+    start = time.perf_counter()
+    folds = precompute_folds(featurizer, texts, labels, n_folds, seed)
+    featurize_seconds = time.perf_counter() - start
+
+    tasks = [(c, params, f, base_params) for c, params in enumerate(candidates) for f in range(n_folds)]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    results = [{'params': params, 'folds': [None] * n_folds} for params in candidates]
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(folds,)) as executor:
+        for candidate_index, fold_index, metrics in executor.map(_evaluate, tasks, chunksize=max(1, len(tasks) // (n_jobs * 4))):
+            results[candidate_index]['folds'][fold_index] = metrics
+
+    for result in results:
+        f1_scores = [fold['f1'] for fold in result['folds']]
+        result['mean_f1'] = statistics.mean(f1_scores)
+        result['std_f1'] = statistics.pstdev(f1_scores)
+        result['mean_accuracy'] = statistics.mean(fold['accuracy'] for fold in result['folds'])
+    results.sort(key=lambda r: (-r['mean_f1'], r['std_f1']))
+    return {
+        'results': results,
+        'best': results[0],
+        'candidates': len(candidates),
+        'folds': n_folds,
+        'n_jobs': n_jobs,
+        'featurize_seconds': featurize_seconds,
+        'wall_seconds': time.perf_counter() - start,
+    }
@@ -0,0 +1,235 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Union
+
+from decouple import config
+
+logger = logging.getLogger('ml_analysis')
+
+
+class LLMResponseCache:
+    """
+    Cache direccionado por contenido para las respuestas del LLM.
+
+    Dos niveles:
+      1. LRU en memoria del proceso (rápido, se pierde al reiniciar el worker).
+      2. Almacén SQLite en disco (compartido entre workers y reinicios).
+
+    La clave es un hash SHA-256 de (modelo, mensaje de sistema, prompt, temperatura, max_tokens),
+    así que cualquier cambio en el prompt o en el modelo produce una entrada nueva.
+    Cada entrada guarda además un `namespace` (p. ej. el nombre del modelo) para poder
+    invalidar en bloque lo generado con versiones anteriores.
+    `get` devuelve siempre una copia: quien la reciba puede modificarla sin alterar la cache.
+    """
+
+    table = 'llm_cache'
+
+    def __init__(self, db_path: Union[str, Callable[[], Optional[str]], None] = None, memory_size: int = 512,
+                 max_entries: int = 50000, ttl_seconds: int = 30 * 24 * 3600, enabled: bool = True,
+                 evict_every: int = 100):
+        # `db_path` puede ser una función: se resuelve en el primer acceso, no al importar el
+        # módulo (la ruta por defecto depende de los settings de Django)
+        self._db_path = db_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        # La purga en disco (expiradas + COUNT(*)) se hace una vez cada `evict_every` escrituras,
+        # no en cada una: `max_entries` es un límite aproximado
+        self.evict_every = max(1, evict_every)
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_ready = False
+        self._writes_since_evict = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(model_name: str, system_message: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        payload = json.dumps(
+            [model_name, system_message, prompt, temperature, max_tokens],
+            ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # --- Almacén en disco ---
+
+    @property
+    def db_path(self) -> Optional[str]:
+        if callable(self._db_path):
+            self._db_path = self._db_path()
+        return self._db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        # Una conexión por operación: sqlite3 no comparte conexiones entre hilos.
+        # El directorio se crea antes de conectar: sqlite3 no crea directorios intermedios
+        if not self._db_ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        if not self._db_ready:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                ' key TEXT PRIMARY KEY,'
+                " namespace TEXT NOT NULL DEFAULT '',"
+                ' response TEXT NOT NULL,'
+                ' created_at REAL NOT NULL,'
+                ' last_access REAL NOT NULL)'
+            )
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_last_access ON {self.table}(last_access)')
+            self._db_ready = True
+        return conn
+
+    def _disk_get(self, key: str) -> Optional[Dict]:
+        if not self.db_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(f'SELECT response, created_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                response, created_at = row
+                if time.time() - created_at > self.ttl_seconds:
+                    conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+                    return None
+                conn.execute(f'UPDATE {self.table} SET last_access = ? WHERE key = ?', (time.time(), key))
+                return json.loads(response)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Error leyendo cache LLM en disco: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: Dict, namespace: str = ''):
+        if not self.db_path:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    f'INSERT OR REPLACE INTO {self.table} (key, namespace, response, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, namespace, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                with self._lock:
+                    self._writes_since_evict += 1
+                    due = self._writes_since_evict >= self.evict_every
+                    if due:
+                        self._writes_since_evict = 0
+                if due:
+                    self._evict_disk(conn, now)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Error escribiendo cache LLM en disco: {e}")
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float):
+        """Elimina entradas expiradas y, si se supera `max_entries`, las menos usadas."""
+        expired = conn.execute(f'DELETE FROM {self.table} WHERE created_at < ?', (now - self.ttl_seconds,)).rowcount
+        (count,) = conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                f'DELETE FROM {self.table} WHERE key IN '
+                f'(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)', (overflow,)
+            )
+        evicted = max(expired, 0) + max(overflow, 0)
+        if evicted:
+            with self._lock:
+                self.stats['evictions'] += evicted
+
+    # --- API pública ---
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if time.time() - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(key, copy.deepcopy(value))
+        return value
+
+    def set(self, key: str, value: Dict, namespace: str = ''):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remember(key, copy.deepcopy(value))
+            self.stats['writes'] += 1
+        self._disk_set(key, value, namespace)
+
+    def _remember(self, key: str, value: Dict):
+        """Inserta en el LRU en memoria. Debe llamarse con `_lock` tomado."""
+        self._memory[key] = (value, time.time())
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.db_path and os.path.exists(self.db_path):
+            with self._connect() as conn:
+                conn.execute(f'DELETE FROM {self.table}')
+
+    def invalidate_except(self, namespace: str) -> int:
+        """
+        Borra del almacén en disco las entradas de cualquier namespace distinto a `namespace`.
+        El LRU en memoria se vacía por completo porque no guarda el namespace.
+        """
+        with self._lock:
+            self._memory.clear()
+        if not self.db_path:
+            return 0
+        try:
+            with self._connect() as conn:
+                deleted = conn.execute(f'DELETE FROM {self.table} WHERE namespace != ?', (namespace,)).rowcount
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Error invalidando cache {self.table}: {e}")
+            return 0
+        if deleted:
+            logger.info(f"Cache {self.table}: {deleted} entradas de versiones anteriores eliminadas")
+        return deleted
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+def _default_db_path() -> Optional[str]:
+    from django.conf import settings
+    models_path = getattr(settings, 'ML_MODELS_PATH', None)
+    if not models_path:
+        return None
+    return os.path.join(models_path, 'llm_cache.sqlite3')
+
+
+# Instancia compartida por el proceso
+llm_cache = LLMResponseCache(
+    db_path=config('LLM_CACHE_PATH', default=None) or _default_db_path,
+    memory_size=config('LLM_CACHE_MEMORY_SIZE', default=512, cast=int),
+    max_entries=config('LLM_CACHE_MAX_ENTRIES', default=50000, cast=int),
+    ttl_seconds=config('LLM_CACHE_TTL_SECONDS', default=30 * 24 * 3600, cast=int),
+    enabled=config('LLM_CACHE_ENABLED', default=True, cast=bool),
+    evict_every=config('LLM_CACHE_EVICT_EVERY', default=100, cast=int),
+)
@@ -0,0 +1,536 @@
+import abc
+import time
+import random
+import asyncio
+import logging
+import json
+import threading
+import weakref
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from decouple import config
+
+from .rate_limiter import llm_rate_limiter
+
+logger = logging.getLogger('ml_analysis')
+
+# Códigos HTTP que se consideran transitorios y se reintentan
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """La API LLM se considera caída (circuito abierto): la petición no se envía."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de un proveedor LLM, por proceso (ver `CircuitBreakerRegistry`).
+
+      - closed: las peticiones pasan; `failure_threshold` fallos consecutivos del proveedor
+        (red, 429 o 5xx tras agotar los reintentos) abren el circuito.
+      - open: se rechaza todo al instante con `CircuitOpenError` durante `recovery_timeout` segundos.
+      - half_open: se deja pasar hasta `half_open_max_calls` peticiones de prueba; un éxito cierra
+        el circuito y un fallo lo vuelve a abrir.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, enabled: bool = True, name: str = ''):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.stats = {'opened': 0, 'rejected': 0}
+
+    def _current_state(self) -> str:
+        # Llamar con el lock tomado: pasa de open a half_open cuando vence el tiempo de recuperación
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def is_open(self) -> bool:
+        """True si ahora mismo no se enviaría ninguna petición (el servicio debe degradarse)."""
+        return self.enabled and self.state == self.OPEN
+
+    def before_call(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return
+            self.stats['rejected'] += 1
+        raise CircuitOpenError(f"Circuito del LLM abierto: el proveedor {self.name} no está disponible")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"API LLM {self.name} recuperada: circuito cerrado")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or (state == self.CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self.stats['opened'] += 1
+                logger.error(f"API LLM {self.name} no disponible ({self._consecutive_failures} fallos seguidos): "
+                             f"circuito abierto durante {self.recovery_timeout:.0f}s")
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            metrics = dict(self.stats)
+            metrics['state'] = self._current_state()
+            metrics['consecutive_failures'] = self._consecutive_failures
+        return metrics
+
+
+class CircuitBreakerRegistry:
+    """
+    Un `CircuitBreaker` por proveedor, identificado por esquema y host de su URL base: la caída
+    de un backend de hedging no bloquea al primario ni al revés. Los circuitos se crean al vuelo
+    con la misma configuración.
+    """
+
+    def __init__(self, **breaker_settings):
+        self._settings = breaker_settings
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    @staticmethod
+    def provider_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}" if parts.netloc else url
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        key = self.provider_key(url)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(name=key, **self._settings)
+            return breaker
+
+    def all_open(self, urls: Iterable[str]) -> bool:
+        """True si el circuito de todos los proveedores de `urls` está abierto."""
+        return all(self.for_url(url).is_open() for url in urls)
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {key: breaker.get_metrics() for key, breaker in breakers.items()}
+
+
+class BaseLLMClient(abc.ABC):
+    """
+    Política común de los clientes del LLM: timeouts, reintentos con backoff exponencial
+    y jitter (respetando Retry-After), limitador compartido entre workers (cada intento pasa
+    por `rate_limiter`), circuit breaker por proveedor y métricas de latencia por proceso.
+
+    `total_timeout` es el plazo total de una llamada (esperas del limitador, intentos y backoff):
+    el timeout de lectura de cada intento se recorta a lo que queda y no se reintenta si la espera
+    no deja al menos `connect_timeout` segundos. Debe quedar por debajo del `timeout` de gunicorn
+    para que una llamada lenta termine en un error controlado y no en un SIGKILL del worker.
+    """
+
+    def __init__(self, connect_timeout: float = 5.0, read_timeout: float = 45.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 20.0, pool_size: int = 10, rate_limiter=None,
+                 circuit_breakers: Optional[CircuitBreakerRegistry] = None, total_timeout: float = 40.0):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.circuit_breakers = circuit_breakers or CircuitBreakerRegistry(enabled=False)
+
+        self._metrics_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._metrics = {'calls': 0, 'successes': 0, 'failures': 0, 'retries': 0, 'rate_limited': 0}
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Espera antes del siguiente intento: Retry-After si existe, si no backoff exponencial con jitter."""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    return min(max(delay, 0.0), self.backoff_max)
+                except (TypeError, ValueError):
+                    pass
+        # "Full jitter": uniforme entre 0 y el backoff exponencial del intento
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _remaining(self, start: float) -> float:
+        return self.total_timeout - (time.monotonic() - start)
+
+    def _attempt_read_timeout(self, start: float) -> float:
+        """Timeout de lectura del próximo intento, recortado al plazo restante de la llamada."""
+        return max(1.0, min(self.read_timeout, self._remaining(start)))
+
+    def _can_retry(self, start: float, attempt: int, delay: float) -> bool:
+        """True si quedan reintentos y el plazo total admite esperar `delay` y un intento más."""
+        if attempt >= self.max_retries:
+            return False
+        if self._remaining(start) - delay < self.connect_timeout:
+            logger.warning(f"Plazo total de la llamada al LLM ({self.total_timeout:.0f}s) agotado: no se reintenta")
+            return False
+        return True
+
+    def _count_rate_limited(self):
+        with self._metrics_lock:
+            self._metrics['rate_limited'] += 1
+
+    @staticmethod
+    @abc.abstractmethod
+    def _is_provider_failure(exc: Exception) -> bool:
+        """Errores que indican caída del proveedor (no errores de la petición, como un 400)."""
+
+    def _record_breaker(self, breaker: CircuitBreaker, exc: Optional[Exception] = None):
+        if exc is None or not self._is_provider_failure(exc):
+            # Un 4xx distinto de 429 demuestra que el proveedor responde
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+    def _record(self, start: float, retries: int, success: bool):
+        latency = time.monotonic() - start
+        with self._metrics_lock:
+            self._metrics['calls'] += 1
+            self._metrics['retries'] += retries
+            self._metrics['successes' if success else 'failures'] += 1
+            self._latencies.append(latency)
+
+    def get_metrics(self) -> Dict:
+        """Contadores acumulados y percentiles de latencia (segundos) de las últimas llamadas."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            latencies = sorted(self._latencies)
+        if latencies:
+            def percentile(p):
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+            metrics.update({
+                'latency_p50': percentile(0.50),
+                'latency_p95': percentile(0.95),
+                'latency_p99': percentile(0.99),
+                'latency_max': latencies[-1],
+            })
+        if self.rate_limiter is not None:
+            metrics['rate_limiter'] = self.rate_limiter.get_metrics()
+        metrics['circuit_breakers'] = self.circuit_breakers.get_metrics()
+        return metrics
+
+
+class LLMClient(BaseLLMClient):
+    """
+    Cliente HTTP compartido para la API del LLM (Together AI, formato /v1/chat/completions).
+
+    - Reutiliza conexiones (keep-alive) mediante un `requests.Session` con pool.
+    - Aplica timeouts de conexión y lectura para que un socket colgado no bloquee el worker.
+    - Reintenta errores 429/5xx y fallos de red con backoff exponencial y jitter,
+      respetando la cabecera Retry-After cuando el proveedor la envía.
+    - Lleva métricas de latencia, reintentos y errores por proceso (`get_metrics`).
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        # Creación perezosa: con gunicorn `preload_app` cada worker abre sus propias conexiones
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    @staticmethod
+    def _is_provider_failure(exc: Exception) -> bool:
+        if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        response = getattr(exc, 'response', None)
+        return isinstance(exc, requests.exceptions.HTTPError) and response is not None \
+            and response.status_code in RETRYABLE_STATUS_CODES
+
+    def _post(self, url: str, headers: Dict, payload: Dict, call_start: float, **kwargs) -> requests.Response:
+        """Un intento HTTP, pasando antes por el limitador y devolviéndole el resultado."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        start = time.monotonic()
+        status_code = None
+        try:
+            response = self.session.post(
+                url, headers=headers, json=payload,
+                timeout=(self.connect_timeout, self._attempt_read_timeout(call_start)), **kwargs
+            )
+            status_code = response.status_code
+            return response
+        finally:
+            if self.rate_limiter is not None:
+                self.rate_limiter.release(status_code, time.monotonic() - start)
+
+    def post_chat_completion(self, url: str, headers: Dict, payload: Dict, stats: Optional[Dict] = None) -> Dict:
+        """
+        Envía una petición de chat completion y devuelve el JSON de respuesta.
+        Lanza `requests.exceptions.HTTPError` (o el error de red) cuando se agotan los reintentos
+        y `CircuitOpenError` sin enviar nada si el circuito está abierto.
+        Si se pasa `stats`, se rellena con el número de reintentos de la llamada.
+        """
+        breaker = self.circuit_breakers.for_url(url)
+        breaker.before_call()
+        start = time.monotonic()
+        retries = 0
+        try:
+            for attempt in range(self.max_retries + 1):
+                response, error = None, None
+                try:
+                    response = self._post(url, headers, payload, start)
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        response.raise_for_status()
+                        result = response.json()
+                        if stats is not None:
+                            stats['retries'] = retries
+                        self._record(start, retries, success=True)
+                        self._record_breaker(breaker)
+                        return result
+                    if response.status_code == 429:
+                        self._count_rate_limited()
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    error = e
+
+                delay = self._retry_delay(attempt, response.headers.get('Retry-After') if response is not None else None)
+                if not self._can_retry(start, attempt, delay):
+                    if error is not None:
+                        raise error
+                    response.raise_for_status()
+                if error is not None:
+                    logger.warning(f"Error de red con la API LLM ({type(error).__name__}), reintentando")
+                retries += 1
+                status_code = response.status_code if response is not None else 'red'
+                logger.warning(f"API LLM respondió {status_code}; reintento {retries}/{self.max_retries} en {delay:.2f}s")
+                time.sleep(delay)
+        except Exception as e:
+            self._record(start, retries, success=False)
+            self._record_breaker(breaker, e)
+            raise
+
+    def stream_chat_completion(self, url: str, headers: Dict, payload: Dict,
+                               stats: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Envía una petición con `stream: true` y va devolviendo los fragmentos de contenido
+        (eventos SSE `data: {...}` del formato OpenAI/Together) a medida que llegan.
+        Solo se reintenta el establecimiento de la respuesta; una vez empezado el stream,
+        un error se propaga al llamador. `stats` recibe los reintentos, como en `post_chat_completion`.
+        """
+        payload = dict(payload, stream=True)
+        breaker = self.circuit_breakers.for_url(url)
+        breaker.before_call()
+        start = time.monotonic()
+        retries = 0
+        response = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                response, error = None, None
+                try:
+                    response = self._post(url, headers, payload, start, stream=True)
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        response.raise_for_status()
+                        break
+                    if response.status_code == 429:
+                        self._count_rate_limited()
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    error = e
+
+                delay = self._retry_delay(attempt, response.headers.get('Retry-After') if response is not None else None)
+                if not self._can_retry(start, attempt, delay):
+                    if error is not None:
+                        raise error
+                    response.raise_for_status()
+                if error is not None:
+                    logger.warning(f"Error de red con la API LLM ({type(error).__name__}), reintentando")
+                else:
+                    response.close()
+                retries += 1
+                time.sleep(delay)
+
+            response.encoding = 'utf-8'
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                event = json.loads(data)
+                choices = event.get('choices') or [{}]
+                content = (choices[0].get('delta') or {}).get('content')
+                if content:
+                    yield content
+            if stats is not None:
+                stats['retries'] = retries
+            self._record(start, retries, success=True)
+            self._record_breaker(breaker)
+        except Exception as e:
+            self._record(start, retries, success=False)
+            self._record_breaker(breaker, e)
+            raise
+        finally:
+            if response is not None:
+                response.close()
+
+
+class AsyncLLMClient(BaseLLMClient):
+    """
+    Variante asyncio de `LLMClient` sobre `httpx.AsyncClient`, con la misma política de
+    timeouts, reintentos y métricas. Un `httpx.AsyncClient` queda ligado a su event loop,
+    así que se mantiene uno por loop.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client_for_running_loop(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            self._clients[loop] = client
+        return client
+
+    @staticmethod
+    def _is_provider_failure(exc: Exception) -> bool:
+        if isinstance(exc, (httpx.TransportError, httpx.TimeoutException)):
+            return True
+        return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in RETRYABLE_STATUS_CODES
+
+    async def _post(self, client: httpx.AsyncClient, url: str, headers: Dict, payload: Dict,
+                    call_start: float) -> httpx.Response:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.aacquire()
+        start = time.monotonic()
+        status_code = None
+        try:
+            timeout = httpx.Timeout(self._attempt_read_timeout(call_start), connect=self.connect_timeout)
+            response = await client.post(url, headers=headers, json=payload, timeout=timeout)
+            status_code = response.status_code
+            return response
+        finally:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.arelease(status_code, time.monotonic() - start)
+
+    async def post_chat_completion(self, url: str, headers: Dict, payload: Dict, stats: Optional[Dict] = None) -> Dict:
+        """
+        Envía una petición de chat completion y devuelve el JSON de respuesta.
+        Lanza `httpx.HTTPStatusError` (o el error de red) cuando se agotan los reintentos
+        y `CircuitOpenError` sin enviar nada si el circuito está abierto.
+        Si se pasa `stats`, se rellena con el número de reintentos de la llamada.
+        """
+        breaker = self.circuit_breakers.for_url(url)
+        breaker.before_call()
+        client = self._client_for_running_loop()
+        start = time.monotonic()
+        retries = 0
+        try:
+            for attempt in range(self.max_retries + 1):
+                response, error = None, None
+                try:
+                    response = await self._post(client, url, headers, payload, start)
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        response.raise_for_status()
+                        result = response.json()
+                        if stats is not None:
+                            stats['retries'] = retries
+                        self._record(start, retries, success=True)
+                        self._record_breaker(breaker)
+                        return result
+                    if response.status_code == 429:
+                        self._count_rate_limited()
+                except (httpx.TransportError, httpx.TimeoutException) as e:
+                    error = e
+
+                delay = self._retry_delay(attempt, response.headers.get('Retry-After') if response is not None else None)
+                if not self._can_retry(start, attempt, delay):
+                    if error is not None:
+                        raise error
+                    response.raise_for_status()
+                if error is not None:
+                    logger.warning(f"Error de red con la API LLM ({type(error).__name__}), reintentando")
+                retries += 1
+                status_code = response.status_code if response is not None else 'red'
+                logger.warning(f"API LLM respondió {status_code}; reintento {retries}/{self.max_retries} en {delay:.2f}s")
+                await asyncio.sleep(delay)
+        except Exception as e:
+            self._record(start, retries, success=False)
+            self._record_breaker(breaker, e)
+            raise
+
+    async def aclose(self):
+        """Cierra el cliente del loop actual (p. ej. en el apagado de la aplicación ASGI)."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_CLIENT_SETTINGS = dict(
+    connect_timeout=config('LLM_CONNECT_TIMEOUT', default=5.0, cast=float),
+    read_timeout=config('LLM_READ_TIMEOUT', default=45.0, cast=float),
+    # Plazo total por llamada: por debajo del `timeout` de 60s de gunicorn (gunicorn.conf.py)
+    total_timeout=config('LLM_TOTAL_TIMEOUT', default=40.0, cast=float),
+    max_retries=config('LLM_MAX_RETRIES', default=3, cast=int),
+    backoff_base=config('LLM_BACKOFF_BASE', default=0.5, cast=float),
+    backoff_max=config('LLM_BACKOFF_MAX', default=20.0, cast=float),
+    pool_size=config('LLM_POOL_SIZE', default=10, cast=int),
+    rate_limiter=llm_rate_limiter,
+)
+
+# Circuitos por proveedor compartidos por el proceso: si un proveedor cae, lo saben tanto el
+# cliente síncrono como el asíncrono
+llm_circuit_breakers = CircuitBreakerRegistry(
+    failure_threshold=config('LLM_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int),
+    recovery_timeout=config('LLM_CIRCUIT_RECOVERY_TIMEOUT', default=30.0, cast=float),
+    half_open_max_calls=config('LLM_CIRCUIT_HALF_OPEN_CALLS', default=1, cast=int),
+    enabled=config('LLM_CIRCUIT_BREAKER_ENABLED', default=True, cast=bool),
+)
+
+# Clientes compartidos por el proceso
+llm_client = LLMClient(circuit_breakers=llm_circuit_breakers, **_CLIENT_SETTINGS)
+async_llm_client = AsyncLLMClient(circuit_breakers=llm_circuit_breakers, **_CLIENT_SETTINGS)
@@ -0,0 +1,99 @@
+import time
+from datetime import timedelta
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+
+from ml_analysis.distillation import (
+    harvest_llm_labels, LabelAggregator, split_holdout, cascade_coverage, boost_incrementally
+)
+from ml_analysis.ml_service import LLM_CASCADE_SAFE_THRESHOLD, LLM_CASCADE_ABUSIVE_THRESHOLD
+from ml_analysis.model_registry import model_registry
+
+
+class Command(BaseCommand):
+    help = ('Destila los veredictos del LLM guardados en la tabla Clause en el clasificador local: '
+            'continúa el boosting del modelo activo y registra el resultado como una versión nueva.')
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--min-confidence', type=float, default=0.8, help='Confianza mínima del LLM.')
+        parser.add_argument('--include-unscored', action='store_true',
+                            help='Incluir cláusulas anteriores a gpt_confidence (sin confianza registrada).')
+        parser.add_argument('--days', type=int, default=0, help='Solo cláusulas de los últimos N días (0 = todas).')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Filas por bloque de lectura y de boosting.')
+        parser.add_argument('--trees-per-chunk', type=int, default=50, help='Árboles nuevos por bloque.')
+        parser.add_argument('--holdout', type=float, default=0.2, help='Fracción de plantillas para evaluar.')
+        parser.add_argument('--replay-dataset', type=str, default=None,
+                            help='CSV original (text,is_abusive o clausula,etiqueta) que se mezcla en cada bloque.')
+        parser.add_argument('--min-samples', type=int, default=200, help='Mínimo de plantillas etiquetadas para entrenar.')
+        parser.add_argument('--activate', action='store_true',
+                            help='Activar la versión nueva si mejora la cobertura sin bajar el acuerdo.')
+        parser.add_argument('--min-agreement', type=float, default=0.95,
+                            help='Acuerdo mínimo con el LLM en las cláusulas decididas para activar.')
+
+    def handle(self, *args, **options):
+        base_version = model_registry.active_version()
+        if not base_version:
+            raise CommandError('No hay un modelo activo en el registro sobre el que destilar.')
+        base = model_registry.load(base_version, compact=False)
+
+        started = time.monotonic()
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] > 0 else None
+        aggregator = LabelAggregator()
+        rows_read = 0
+        for chunk in harvest_llm_labels(options['min_confidence'], options['include_unscored'],
+                                        options['chunk_size'], since):
+            aggregator.add(chunk)
+            rows_read += len(chunk)
+        labelled = aggregator.labelled()
+        self.stdout.write(f'Leídas {rows_read} cláusulas con veredicto del LLM: {len(labelled)} plantillas '
+                          f'({aggregator.conflicts} descartadas por veredictos en empate).')
+        if len(labelled) < options['min_samples']:
+            self.stdout.write(self.style.WARNING(f"Menos de {options['min_samples']} plantillas: no se entrena."))
+            return
+
+        train, holdout = split_holdout(labelled, options['holdout'])
+        holdout_texts, holdout_labels = [r[1] for r in holdout], [r[2] for r in holdout]
+        thresholds = (LLM_CASCADE_SAFE_THRESHOLD, LLM_CASCADE_ABUSIVE_THRESHOLD)
+        before = cascade_coverage(base, holdout_texts, holdout_labels, *thresholds)
+
+        replay = None
+        if options['replay_dataset']:
+            df = pd.read_csv(options['replay_dataset']).rename(columns={'clausula': 'text', 'etiqueta': 'is_abusive'})
+            replay = (df['text'].tolist(), df['is_abusive'].astype(int).tolist())
+
+        self.stdout.write(self.style.NOTICE(f'Continuando el boosting de {base_version} con {len(train)} plantillas...'))
+        distilled = boost_incrementally(
+            base, [r[1] for r in train], [r[2] for r in train],
+            trees_per_chunk=options['trees_per_chunk'], chunk_size=options['chunk_size'], replay=replay,
+        )
+        after = cascade_coverage(distilled, holdout_texts, holdout_labels, *thresholds)
+
+        for label, metrics in (('antes', before), ('después', after)):
+            self.stdout.write(f"{label:<8} cobertura sin LLM {metrics['coverage']:.1%} "
+                              f"({metrics['decided']}/{metrics['total']}) | acuerdo con el LLM {metrics['agreement']:.1%}")
+
+        improves = after['coverage'] > before['coverage'] and after['agreement'] >= options['min_agreement']
+        version = model_registry.register(
+            distilled,
+            dataset_hash=None,
+            metrics={
+                'base_version': base_version,
+                'llm_rows': rows_read,
+                'train_templates': len(train),
+                'holdout_templates': len(holdout),
+                'coverage_before': before['coverage'],
+                'coverage_after': after['coverage'],
+                'agreement_before': before['agreement'],
+                'agreement_after': after['agreement'],
+            },
+            feature_config=model_registry.get(base_version).get('feature_config', {}),
+            activate=options['activate'] and improves,
+            source='distillation',
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ Versión destilada {version} registrada en {time.monotonic() - started:.1f}s'))
+        if model_registry.active_version() == version:
+            self.stdout.write(self.style.SUCCESS('Versión activada: los workers la cargarán en caliente.'))
+        elif options['activate']:
+            self.stdout.write(self.style.WARNING('No se activa: la cobertura no mejora o el acuerdo queda por debajo del mínimo.'))
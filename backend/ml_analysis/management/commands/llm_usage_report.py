@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from contracts.models import AnalysisResult
+from ml_analysis.usage import STAGE_EXTRACTION, STAGE_VALIDATION, STAGE_SUMMARY
+
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = 'Reporta el consumo del LLM (llamadas, tokens, latencia y coste) por etapa del análisis.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--days', type=int, default=30, help='Analizar solo los últimos N días (0 = todos).')
+        parser.add_argument('--limit', type=int, default=1000, help='Número máximo de análisis a considerar.')
+
+    def handle(self, *args, **options):
+        queryset = AnalysisResult.objects.order_by('-created_at')
+        if options['days'] > 0:
+            queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+        usages = [
+            features['llm_usage'] for features in
+            queryset.values_list('features_extracted', flat=True)[:options['limit']]
+            if isinstance(features, dict) and features.get('llm_usage')
+        ]
+        if not usages:
+            self.stdout.write(self.style.WARNING('No hay análisis con datos de consumo del LLM.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Consumo del LLM en {len(usages)} análisis'))
+        stage_names = [STAGE_EXTRACTION, STAGE_VALIDATION, STAGE_SUMMARY]
+        stage_names += sorted({name for u in usages for name in u.get('stages', {})} - set(stage_names))
+
+        header = f"{'etapa':<12} {'métrica':<24}" + ''.join(f"{f'p{int(p * 100)}':>12}" for p in PERCENTILES)
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name in stage_names:
+            stages = [u['stages'][name] for u in usages if name in u.get('stages', {})]
+            if not stages:
+                continue
+            # Métricas por contrato y latencia por llamada
+            rows = {
+                'llamadas/contrato': [s['calls'] for s in stages],
+                'cache/contrato': [s['cached_calls'] for s in stages],
+                'tokens entrada/contrato': [s['prompt_tokens'] for s in stages],
+                'tokens salida/contrato': [s['completion_tokens'] for s in stages],
+                'coste USD/contrato': [s['cost_usd'] for s in stages],
+                'latencia/llamada (s)': [lat for s in stages for lat in s.get('latencies', [])],
+            }
+            for metric, values in rows.items():
+                if not values:
+                    continue
+                cells = ''.join(f"{percentile(values, p):>12.4g}" for p in PERCENTILES)
+                self.stdout.write(f"{name:<12} {metric:<24}{cells}")
+
+        totals = [u['totals'] for u in usages]
+        total_tokens = sum(t['prompt_tokens'] + t['completion_tokens'] for t in totals)
+        total_cost = sum(t['cost_usd'] for t in totals)
+        self.stdout.write('')
+        self.stdout.write(f"Total: {total_tokens} tokens, {total_cost:.4f} USD "
+                          f"({total_cost / len(usages):.4f} USD por contrato)")
+
+        # Análisis anteriores a la tabla de precios por modelo no traen 'cost_by_model'
+        cost_by_model = {}
+        for u in usages:
+            for model, cost in u.get('cost_by_model', {}).items():
+                cost_by_model[model] = cost_by_model.get(model, 0.0) + cost
+        for model, cost in sorted(cost_by_model.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {model}: {cost:.4f} USD")
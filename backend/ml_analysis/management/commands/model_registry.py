@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from ml_analysis.model_registry import model_registry, ModelRegistryError
+
+
+class Command(BaseCommand):
+    help = 'Gestiona el registro de modelos: listar versiones, activar, fijar y eliminar artefactos antiguos.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        subparsers = parser.add_subparsers(dest='action', required=True)
+        subparsers.add_parser('list', help='Lista las versiones registradas.')
+        activate = subparsers.add_parser('activate', help='Activa una versión (los workers la recargan en caliente).')
+        activate.add_argument('version')
+        for name, help_text in (('pin', 'Protege una versión de la recolección de basura.'),
+                                ('unpin', 'Quita la protección de una versión.')):
+            sub = subparsers.add_parser(name, help=help_text)
+            sub.add_argument('version')
+        bundle = subparsers.add_parser('export-bundle', help='Genera el paquete de inferencia compacto de una versión.')
+        bundle.add_argument('version')
+        gc = subparsers.add_parser('gc', help='Elimina artefactos de versiones antiguas.')
+        gc.add_argument('--keep', type=int, default=None, help='Versiones recientes a conservar (por defecto ML_MODEL_REGISTRY_KEEP).')
+        gc.add_argument('--dry-run', action='store_true', help='Solo mostrar qué se eliminaría.')
+
+    def handle(self, *args, **options):
+        if not model_registry.models_path:
+            raise CommandError('ML_MODELS_PATH no está configurado.')
+        try:
+            getattr(self, f"_{options['action'].replace('-', '_')}")(options)
+        except ModelRegistryError as e:
+            raise CommandError(str(e))
+
+    def _list(self, options):
+        active = model_registry.active_version()
+        versions = model_registry.list_versions()
+        if not versions:
+            self.stdout.write(self.style.WARNING('No hay modelos registrados.'))
+            return
+        for version, entry in versions:
+            marker = '*' if version == active else ' '
+            flags = ' [fijado]' if entry.get('pinned') else ''
+            flags += ' [compacto]' if entry.get('bundle') else ''
+            metrics = ', '.join(f'{k}={v}' for k, v in entry.get('metrics', {}).items())
+            self.stdout.write(f"{marker} {version:<24} {entry.get('source', ''):<12} {metrics}{flags}")
+
+    def _activate(self, options):
+        model_registry.activate(options['version'])
+        self.stdout.write(self.style.SUCCESS(f"Versión {options['version']} activada."))
+
+    def _pin(self, options):
+        model_registry.set_pinned(options['version'], True)
+        self.stdout.write(self.style.SUCCESS(f"Versión {options['version']} fijada."))
+
+    def _unpin(self, options):
+        model_registry.set_pinned(options['version'], False)
+        self.stdout.write(self.style.SUCCESS(f"Versión {options['version']} ya no está fijada."))
+
+    def _export_bundle(self, options):
+        if not model_registry.export_bundle(options['version']):
+            raise CommandError(f"No se pudo exportar el paquete compacto de {options['version']} (ver logs).")
+        self.stdout.write(self.style.SUCCESS(f"Paquete compacto generado en {model_registry.bundle_path(options['version'])}"))
+
+    def _gc(self, options):
+        removed = model_registry.collect_garbage(keep=options['keep'], dry_run=options['dry_run'])
+        verb = 'Se eliminarían' if options['dry_run'] else 'Eliminadas'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(removed)} versiones: {', '.join(removed) or '-'}"))
@@ -1,17 +1,22 @@
 import os
+import csv
+import json
+import hashlib
 import pandas as pd
-import joblib
-from datetime import datetime
 
 from django.core.management.base import BaseCommand, CommandParser
 from django.conf import settings
 
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score, classification_report
 import lightgbm as lgb
 
+from ml_analysis.dataset_dedup import deduplicate, iter_labelled_rows
+from ml_analysis.hyperparameter_search import cross_validated_search
+from ml_analysis.featurizers import FEATURIZERS, FEATURIZER_TFIDF, DEFAULT_HASH_FEATURES, build_featurizer
+from ml_analysis.model_registry import model_registry, file_sha256
+
 # Se moverán las importaciones de NLTK para evitar errores de importación circular
 # import nltk
 # from nltk.corpus import stopwords
@@ -26,6 +31,56 @@ class Command(BaseCommand):
             help='Ruta al archivo CSV del dataset para el entrenamiento.',
             required=True
         )
+        parser.add_argument(
+            '--extra-dataset',
+            action='append',
+            default=[],
+            help='CSV adicional con el mismo formato (se puede repetir); se combina con --dataset_path.'
+        )
+        parser.add_argument(
+            '--dedup',
+            action='store_true',
+            help='Colapsar cláusulas duplicadas y casi duplicadas (MinHash/LSH) antes de dividir en entrenamiento y prueba.'
+        )
+        parser.add_argument('--dedup-threshold', type=float, default=0.8, help='Similitud de Jaccard mínima para considerar dos cláusulas casi duplicadas.')
+        parser.add_argument('--dedup-report', type=str, default=None, help='Ruta de un CSV con los grupos de duplicados con etiquetas en conflicto.')
+        parser.add_argument(
+            '--no-activate',
+            action='store_true',
+            help='Registrar el modelo sin activarlo (se puede activar luego con "model_registry activate").'
+        )
+        parser.add_argument(
+            '--gc',
+            action='store_true',
+            help='Tras registrar, eliminar los modelos antiguos (conserva el activo, los fijados y los más recientes).'
+        )
+        parser.add_argument(
+            '--featurizer',
+            choices=FEATURIZERS,
+            default=FEATURIZER_TFIDF,
+            help='Featurizador: "tfidf" (vocabulario ajustado) o "hashing" (hashing sin estado + IDF persistido).'
+        )
+        parser.add_argument(
+            '--hash-features',
+            type=int,
+            default=DEFAULT_HASH_FEATURES,
+            help='Número de columnas del featurizador "hashing".'
+        )
+        parser.add_argument(
+            '--search',
+            choices=['grid', 'random'],
+            default=None,
+            help='Buscar hiperparámetros de LightGBM con validación cruzada antes de entrenar el modelo final.'
+        )
+        parser.add_argument('--folds', type=int, default=5, help='Folds de la validación cruzada de la búsqueda.')
+        parser.add_argument('--n-iter', type=int, default=20, help='Candidatos a evaluar con --search random.')
+        parser.add_argument('--n-jobs', type=int, default=None, help='Procesos del pool de la búsqueda (por defecto, todas las CPU).')
+        parser.add_argument(
+            '--param-space',
+            type=str,
+            default=None,
+            help='Espacio de búsqueda como JSON (o ruta a un .json), p. ej. \'{"num_leaves": [15, 31], "learning_rate": [0.05, 0.1]}\'.'
+        )
 
     def handle(self, *args, **options):
         # Importar y configurar NLTK aquí para evitar el error de importación circular
@@ -54,15 +109,20 @@ class Command(BaseCommand):
             return
         
         dataset_path = options['dataset_path']
+        dataset_paths = [dataset_path] + options['extra_dataset']
 
-        if not os.path.exists(dataset_path):
-            self.stdout.write(self.style.ERROR(f'El archivo no fue encontrado en: {dataset_path}'))
-            return
+        for path in dataset_paths:
+            if not os.path.exists(path):
+                self.stdout.write(self.style.ERROR(f'El archivo no fue encontrado en: {path}'))
+                return
 
-        self.stdout.write(self.style.SUCCESS(f'Cargando dataset desde: {dataset_path}'))
+        self.stdout.write(self.style.SUCCESS(f'Cargando dataset desde: {", ".join(dataset_paths)}'))
         
         try:
-            df = pd.read_csv(dataset_path)
+            if options['dedup']:
+                df = self._deduplicated_dataset(dataset_paths, options)
+            else:
+                df = pd.concat([pd.read_csv(path) for path in dataset_paths], ignore_index=True)
             
             # Adaptarse al formato del usuario 'clausula' y 'etiqueta'
             if 'clausula' in df.columns and 'etiqueta' in df.columns:
@@ -91,20 +151,32 @@ class Command(BaseCommand):
         self.stdout.write(self.style.NOTICE('Creando y entrenando el pipeline del modelo...'))
 
         # Crear pipeline de Scikit-learn con LightGBM
+        step_name, featurizer, feature_config = build_featurizer(
+            options['featurizer'],
+            stop_words=stopwords_es,
+            max_features=2000,
+            ngram_range=(1, 2),
+            n_features=options['hash_features'],
+        )
+        classifier_params = dict(
+            objective='binary',
+            class_weight='balanced',
+            n_estimators=200,
+            learning_rate=0.05,
+            num_leaves=31,
+            random_state=42
+        )
+
+        search_metrics = {}
+        if options['search']:
+            best_params, search_metrics = self._search_hyperparameters(
+                featurizer, X_train, y_train, classifier_params, options
+            )
+            classifier_params.update(best_params)
+
         pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(
-                stop_words=stopwords_es, 
-                max_features=2000, 
-                ngram_range=(1, 2)
-            )),
-            ('classifier', lgb.LGBMClassifier(
-                objective='binary',
-                class_weight='balanced',
-                n_estimators=200,
-                learning_rate=0.05,
-                num_leaves=31,
-                random_state=42
-            ))
+            (step_name, featurizer),
+            ('classifier', lgb.LGBMClassifier(**classifier_params))
         ])
 
         # Entrenar el modelo
@@ -123,15 +195,105 @@ class Command(BaseCommand):
         self.stdout.write(report)
         self.stdout.write(self.style.NOTICE('----------------------------------------------------'))
 
-        # Guardar el modelo
-        models_path = getattr(settings, 'ML_MODELS_PATH', 'ml_models/')
-        os.makedirs(models_path, exist_ok=True)
+        # Registrar el modelo con sus metadatos
+        report_dict = classification_report(y_test, y_pred, output_dict=True)
+        metrics = {
+            'accuracy': round(accuracy, 4),
+            'f1_abusive': round(report_dict['1']['f1-score'], 4) if '1' in report_dict else None,
+            'f1_macro': round(report_dict['macro avg']['f1-score'], 4),
+            'train_rows': len(X_train),
+            'test_rows': len(X_test),
+            **search_metrics,
+        }
+        if not model_registry.models_path:
+            model_registry.models_path = str(getattr(settings, 'ML_MODELS_PATH', 'ml_models/'))
+        version = model_registry.register(
+            pipeline,
+            dataset_hash=self._dataset_hash(dataset_paths, options),
+            metrics=metrics,
+            feature_config=dict(feature_config, classifier_params={
+                k: v for k, v in classifier_params.items() if k not in ('objective', 'random_state')
+            }),
+            activate=not options['no_activate'],
+        )
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        model_filename = f'modelo_clausulas_{timestamp}.joblib'
-        model_path = os.path.join(models_path, model_filename)
+        self.stdout.write(self.style.SUCCESS(f'✅ Modelo registrado como versión {version} en: {model_registry.artifact_path(version)}'))
+        if model_registry.get(version).get('bundle'):
+            self.stdout.write(self.style.SUCCESS(f'Paquete de inferencia compacto: {model_registry.bundle_path(version)}'))
+        if model_registry.active_version() == version:
+            self.stdout.write(self.style.SUCCESS('Modelo activado: los workers lo cargarán en caliente sin reiniciar.'))
+        if options['gc']:
+            removed = model_registry.collect_garbage()
+            if removed:
+                self.stdout.write(self.style.NOTICE(f'Eliminados {len(removed)} modelos antiguos del registro.'))
 
-        joblib.dump(pipeline, model_path)
-        
-        self.stdout.write(self.style.SUCCESS(f'✅ Modelo guardado exitosamente en: {model_path}'))
-        self.stdout.write(self.style.WARNING('Para que la aplicación utilice el nuevo modelo, reinicia el servidor de Django.')) 
\ No newline at end of file
+    def _search_hyperparameters(self, featurizer, X_train, y_train, base_params, options):
+        """Búsqueda CV en paralelo; devuelve los parámetros ganadores y un resumen para los metadatos."""
+        space = None
+        if options['param_space']:
+            raw = options['param_space']
+            if os.path.exists(raw):
+                with open(raw, encoding='utf-8') as f:
+                    raw = f.read()
+            space = json.loads(raw)
+
+        self.stdout.write(self.style.NOTICE(
+            f"Búsqueda de hiperparámetros ({options['search']}, {options['folds']} folds)..."
+        ))
+        search = cross_validated_search(
+            featurizer, X_train.tolist(), y_train.tolist(), base_params, space=space, mode=options['search'],
+            n_iter=options['n_iter'], n_folds=options['folds'], n_jobs=options['n_jobs'],
+        )
+        self.stdout.write(
+            f"{search['candidates']} candidatos x {search['folds']} folds en {search['n_jobs']} procesos: "
+            f"{search['wall_seconds']:.1f}s (features por fold: {search['featurize_seconds']:.1f}s)"
+        )
+        for rank, result in enumerate(search['results'][:5], start=1):
+            fold_f1 = ' '.join(f"{fold['f1']:.3f}" for fold in result['folds'])
+            self.stdout.write(f"  #{rank} F1 {result['mean_f1']:.4f} ± {result['std_f1']:.4f} [{fold_f1}] {result['params']}")
+
+        best = search['best']
+        self.stdout.write(self.style.SUCCESS(f"Configuración elegida: {best['params']}"))
+        return best['params'], {
+            'cv_mean_f1': round(best['mean_f1'], 4),
+            'cv_std_f1': round(best['std_f1'], 4),
+            'cv_fold_f1': [round(fold['f1'], 4) for fold in best['folds']],
+            'cv_candidates': search['candidates'],
+            'cv_wall_seconds': round(search['wall_seconds'], 1),
+        }
+
+    @staticmethod
+    def _dataset_hash(dataset_paths, options):
+        """Hash de los CSV de entrada (y de la deduplicación aplicada) para los metadatos del modelo."""
+        if len(dataset_paths) == 1 and not options['dedup']:
+            return file_sha256(dataset_paths[0])
+        parts = [file_sha256(path) for path in dataset_paths]
+        if options['dedup']:
+            parts.append(f"dedup={options['dedup_threshold']}")
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def _deduplicated_dataset(self, dataset_paths, options):
+        """
+        Lee los CSV en streaming y colapsa duplicados exactos y casi duplicados (MinHash/LSH) en un
+        único ejemplo por grupo con la etiqueta mayoritaria; los grupos en empate se descartan.
+        Evita que variantes de la misma cláusula inflen el entrenamiento y se filtren al conjunto de prueba.
+        """
+        rows = (row for path in dataset_paths for row in iter_labelled_rows(path))
+        index = deduplicate(rows, threshold=options['dedup_threshold'])
+        stats = index.stats
+        conflicts = index.conflicts()
+        self.stdout.write(self.style.NOTICE(
+            f"Deduplicación: {stats['rows']} filas -> {len(index.groups)} grupos "
+            f"({stats['exact_duplicates']} duplicados exactos, {stats['near_duplicates']} casi duplicados, "
+            f"{len(conflicts)} grupos con etiquetas en conflicto)"
+        ))
+        for conflict in conflicts[:5]:
+            self.stdout.write(self.style.WARNING(f"  Conflicto {conflict['labels']} en {conflict['size']} filas: {conflict['text'][:100]}"))
+        if options['dedup_report'] and conflicts:
+            with open(options['dedup_report'], 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['text', 'size', 'labels'])
+                for conflict in conflicts:
+                    writer.writerow([conflict['text'], conflict['size'], json.dumps(conflict['labels'])])
+            self.stdout.write(f"Reporte de conflictos guardado en: {options['dedup_report']}")
+        return pd.DataFrame(list(index.collapsed()), columns=['text', 'is_abusive'])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from ml_analysis.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Carga por adelantado los modelos ML y el índice RAG y reporta cuánto tarda cada uno.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--skip-rag', action='store_true', help='No inicializar el índice RAG.')
+
+    def handle(self, *args, **options):
+        timings = warm_up(include_rag=not options['skip_rag'])
+        for name, seconds in timings.items():
+            self.stdout.write(f"{name:<12} {seconds:>8.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Modelos listos en {sum(timings.values()):.2f}s"))
@@ -1,44 +1,196 @@
 import os
 import re
-import spacy
-import joblib
-import pandas as pd
+import copy
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
 from django.conf import settings
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.pipeline import Pipeline
-from spacy.matcher import Matcher
-import lightgbm as lgb
-import nltk
-from nltk.corpus import stopwords
 from decouple import config
 import json
+import httpx
 import requests
 import logging
 
+from .llm_cache import llm_cache
+from .clause_cache import clause_cache
+from .llm_client import llm_client, async_llm_client, CircuitOpenError
+from .segmenter import clause_segmenter
+from .model_registry import model_registry, ModelRegistryError
+from .featurizers import build_featurizer, FEATURIZER_TFIDF
+from .hedging import llm_hedging
+from .streaming import IncrementalArrayParser
+from .usage import (
+    track_llm_usage, record_llm_call, run_in_context, STAGE_EXTRACTION, STAGE_VALIDATION, STAGE_SUMMARY
+)
+
 # Configurar logger
 logger = logging.getLogger('ml_analysis')
 
+DEFAULT_LLM_MODEL_NAME = "mistralai/Mixtral-8x7B-Instruct-v0.1"
+# Explicación usada cuando la validación con el LLM falla; estos veredictos no se guardan en cache.
+LLM_ERROR_EXPLANATION = 'Error al analizar la cláusula con el servicio de IA.'
+# Explicación de las cláusulas resueltas solo con el clasificador porque el circuito del LLM está abierto.
+LLM_DEGRADED_EXPLANATION = 'Servicio de IA no disponible: resultado basado únicamente en el clasificador local.'
+# Clave con la que se marca una respuesta de un backend secundario (hedging): esos veredictos no
+# son del modelo primario y no se guardan en `llm_cache` ni en la cache de cláusulas.
+HEDGE_MODEL_KEY = 'hedge_model'
+
+# Número máximo de llamadas simultáneas al LLM durante la validación de cláusulas.
+# Con 1 se conserva el comportamiento secuencial original.
+LLM_MAX_CONCURRENCY = config('LLM_MAX_CONCURRENCY', default=4, cast=int)
+
+# Modo de validación de cláusulas: 'per_clause' (un prompt por cláusula) o 'batch'
+# (varias cláusulas por prompt, ver `_validate_clauses_in_batches`).
+LLM_VALIDATION_MODE = config('LLM_VALIDATION_MODE', default='per_clause')
+# Presupuesto aproximado de tokens de entrada por lote y tope de cláusulas por lote.
+LLM_BATCH_PROMPT_TOKENS = config('LLM_BATCH_PROMPT_TOKENS', default=6000, cast=int)
+LLM_BATCH_MAX_CLAUSES = config('LLM_BATCH_MAX_CLAUSES', default=12, cast=int)
+# Tokens de salida reservados por veredicto dentro de un lote.
+LLM_BATCH_TOKENS_PER_VERDICT = 220
+
+# Extracción de cláusulas: 'single' (un prompt con todo el contrato), 'windowed' (ventanas
+# solapadas extraídas en paralelo) o 'auto' (ventanas solo si el contrato excede una ventana).
+LLM_EXTRACTION_MODE = config('LLM_EXTRACTION_MODE', default='auto')
+LLM_EXTRACTION_WINDOW_TOKENS = config('LLM_EXTRACTION_WINDOW_TOKENS', default=1500, cast=int)
+# Extracción en streaming: las cláusulas se validan a medida que el LLM las va generando
+LLM_EXTRACTION_STREAMING = config('LLM_EXTRACTION_STREAMING', default=False, cast=bool)
+# Límites del presupuesto de salida por ventana (la salida repite el texto de la ventana)
+LLM_EXTRACTION_MIN_OUTPUT_TOKENS = 512
+LLM_EXTRACTION_MAX_OUTPUT_TOKENS = 4096
+
+# Modo cascada: el clasificador decide solo las cláusulas claras y escala al LLM la banda incierta.
+# Probabilidad de abuso <= SAFE -> segura sin LLM; >= ABUSIVE -> abusiva sin LLM.
+LLM_CASCADE_ENABLED = config('LLM_CASCADE_ENABLED', default=False, cast=bool)
+LLM_CASCADE_SAFE_THRESHOLD = config('LLM_CASCADE_SAFE_THRESHOLD', default=0.15, cast=float)
+LLM_CASCADE_ABUSIVE_THRESHOLD = config('LLM_CASCADE_ABUSIVE_THRESHOLD', default=0.9, cast=float)
+
+# Camino seguido por cada cláusula (clave 'analysis_path' del resultado)
+PATH_LLM = 'llm'
+PATH_ML_SAFE = 'ml_safe'
+PATH_ML_ABUSIVE = 'ml_abusive'
+PATH_CACHE = 'cache'
+PATH_DEGRADED = 'ml_degraded'  # LLM caído (circuito abierto): solo clasificador
+
+# Umbral de probabilidad a partir del cual el clasificador marca una cláusula como abusiva
+CLASSIFIER_THRESHOLD = config('CLASSIFIER_THRESHOLD', default=0.5, cast=float)
+
+# spaCy: solo se usan NER y el Matcher (atributos léxicos), así que el resto del pipeline no se carga.
+# tok2vec se conserva por si el NER del modelo lo escucha.
+SPACY_EXCLUDED_COMPONENTS = ['parser', 'tagger', 'morphologizer', 'lemmatizer', 'attribute_ruler', 'senter']
+# Entidades por lotes con `nlp.pipe`; varios procesos solo compensan en trabajos masivos
+ENTITY_BATCH_SIZE = config('ENTITY_BATCH_SIZE', default=64, cast=int)
+ENTITY_N_PROCESS = config('ENTITY_N_PROCESS', default=1, cast=int)
+ENTITY_MULTIPROCESS_MIN_TEXTS = config('ENTITY_MULTIPROCESS_MIN_TEXTS', default=200, cast=int)
+
+# Registro de modelos: `ML_MODEL_VERSION` fija una versión concreta; si no, se sigue el puntero
+# `active` del manifiesto, que se revisa como mucho cada ML_MODEL_RELOAD_INTERVAL segundos.
+ML_MODEL_VERSION = config('ML_MODEL_VERSION', default='')
+ML_MODEL_RELOAD_INTERVAL = config('ML_MODEL_RELOAD_INTERVAL', default=5.0, cast=float)
+# Featurizador del modelo por defecto: 'tfidf' o 'hashing' (ver `featurizers`)
+ML_FEATURIZER = config('ML_FEATURIZER', default=FEATURIZER_TFIDF)
+
+# Segmentación local (reglas): si su confianza alcanza este umbral no se llama al LLM para extraer
+SEGMENTER_ENABLED = config('SEGMENTER_ENABLED', default=True, cast=bool)
+SEGMENTER_MIN_CONFIDENCE = config('SEGMENTER_MIN_CONFIDENCE', default=0.8, cast=float)
+
+# Fronteras estructurales donde puede cortarse un contrato: encabezados ordinales,
+# ARTÍCULO n, POR CUANTO/POR TANTO y párrafos separados por líneas en blanco.
+STRUCTURAL_BOUNDARY = re.compile(
+    r'\n\s*\n|(?=\b(?:PRIMERO|SEGUNDO|TERCERO|CUARTO|QUINTO|SEXTO|SÉPTIMO|OCTAVO|NOVENO|DÉCIMO|'
+    r'ARTÍCULO\s+\d+|POR CUANTO|POR TANTO)\b)'
+)
+
+class _LazyModelAttribute:
+    """Atributo de modelo que dispara la carga perezosa del servicio en su primer acceso."""
+
+    def __set_name__(self, owner, name):
+        self.name = '_' + name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance._ensure_loaded()
+        return instance.__dict__.get(self.name)
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+
 class ContractMLService:
     """
     Servicio principal para el análisis ML de contratos.
     Adapta el código del notebook para uso en producción.
+
+    Los modelos (spaCy, stopwords, clasificador) se cargan de forma perezosa en el primer uso,
+    no al importar el módulo; `warm_up()` permite forzar la carga (p. ej. en el master de
+    gunicorn con `preload_app`, solo carga, o con `manage.py warm_up_models`).
     """
+
+    nlp = _LazyModelAttribute()
+    classifier_pipeline = _LazyModelAttribute()
+    matcher = _LazyModelAttribute()
+    stopwords_es = _LazyModelAttribute()
+    model_version = _LazyModelAttribute()
     
     def __init__(self):
+        self._load_lock = threading.RLock()
+        self._models_ready = False
+        self._loading = False
+        self._reload_lock = threading.Lock()
+        self._manifest_mtime = None
+        self._next_model_check = 0.0
         self.nlp = None
         self.classifier_pipeline = None
         self.vectorizer = None
         self.matcher = None
         self.stopwords_es = None
-        self._load_models()
-    
+        self.model_version = None
+
+    def _ensure_loaded(self):
+        """Carga los modelos una sola vez (thread-safe); los accesos desde la propia carga no reentran."""
+        if self._models_ready:
+            return
+        with self._load_lock:
+            if self._models_ready or self._loading:
+                return
+            self._loading = True
+            try:
+                start = time.monotonic()
+                self._load_models()
+                self._invalidate_stale_clause_cache()
+                self._models_ready = True
+                logger.info(f"Modelos ML cargados en {time.monotonic() - start:.2f}s")
+            finally:
+                self._loading = False
+
+    def warm_up(self, inference: bool = True):
+        """
+        Carga los modelos y, con `inference`, ejecuta una inferencia mínima para que la primera
+        petición no pague el arranque. En el master de gunicorn se llama sin inferencia: los
+        pools de hilos de LightGBM/OpenMP creados antes del fork no sobreviven en los workers.
+        """
+        self._ensure_loaded()
+        if not inference:
+            return
+        sample = "El inquilino pagará la suma de RD$20,000.00 el 15 de marzo de 2024."
+        if self.classifier_pipeline is not None:
+            self._classify_clauses([sample])
+        self._extract_entities_batch([sample])
+
     def _load_models(self):
         """Carga todos los modelos necesarios"""
         try:
+            # Importaciones pesadas diferidas: importar el módulo no debe cargar spaCy ni NLTK
+            import spacy
+            import nltk
+            from spacy.matcher import Matcher
+            from nltk.corpus import stopwords
+
             # Cargar modelo spaCy
-            self.nlp = spacy.load("es_core_news_sm")
+            self.nlp = spacy.load("es_core_news_sm", exclude=SPACY_EXCLUDED_COMPONENTS)
             
             # Configurar matcher para entidades personalizadas
             self.matcher = Matcher(self.nlp.vocab)
@@ -78,13 +230,20 @@ class ContractMLService:
         self.matcher.add("DINERO", patterns[2:4])
         self.matcher.add("FECHAS", patterns[4:])
     
-    def _call_llm_api(self, prompt: str, system_message: str) -> Dict:
+    def _build_llm_request(self, prompt: str, system_message: str, max_tokens: int,
+                           backend: Optional[Dict] = None) -> Tuple[str, Dict, Dict, str]:
         """
-        Método central para hacer llamadas a la API del LLM (Together AI).
+        Arma URL, cabeceras, cuerpo y clave de cache de una llamada al LLM.
+        Sin `backend` se usa el primario (LLM_API_BASE_URL / LLM_MODEL_NAME); con él, un secundario
+        de `LLM_HEDGE_BACKENDS` (dict con url, model y api_key).
         """
-        api_key = config('TOGETHER_API_KEY')
-        base_url = config('LLM_API_BASE_URL', default="https://api.together.xyz/v1/chat/completions")
-        model_name = config('LLM_MODEL_NAME', default="mistralai/Mixtral-8x7B-Instruct-v0.1")
+        if backend is None:
+            api_key = config('TOGETHER_API_KEY')
+            base_url = config('LLM_API_BASE_URL', default="https://api.together.xyz/v1/chat/completions")
+            model_name = config('LLM_MODEL_NAME', default=DEFAULT_LLM_MODEL_NAME)
+        else:
+            api_key, base_url, model_name = backend['api_key'], backend['url'], backend['model']
+        temperature = 0.4
 
         headers = {
             "Authorization": f"Bearer {api_key}",
@@ -97,22 +256,108 @@ class ContractMLService:
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.4,
-            "max_tokens": 1024,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
             "response_format": {"type": "json_object"}
         }
 
+        cache_key = llm_cache.make_key(model_name, system_message, prompt, temperature, max_tokens)
+        return base_url, headers, data, cache_key
+
+    @staticmethod
+    def _mark_hedge_winner(analysis: Dict, winner: int) -> bool:
+        """
+        Si ganó un backend secundario, anota su modelo en la respuesta (`HEDGE_MODEL_KEY`) y devuelve
+        False: la clave de cache y el namespace son los del primario y no deben recibir otro modelo.
+        """
+        if winner <= 0:
+            return True
+        if isinstance(analysis, dict):
+            analysis[HEDGE_MODEL_KEY] = llm_hedging.secondaries[winner - 1]['model']
+        return False
+
+    @staticmethod
+    def _parse_llm_response(result: Dict) -> Dict:
+        content = result['choices'][0]['message']['content']
+        analysis = json.loads(content)
+        logger.debug(f"Análisis LLM recibido: {analysis}")
+        return analysis
+
+    def _record_llm_usage(self, stage: Optional[str], data: Dict, start: float, stats: Dict,
+                          usage: Optional[Dict] = None, completion_text: str = ''):
+        """
+        Registra tokens, latencia, reintentos y modelo de una llamada en el análisis en curso
+        (ver `track_llm_usage`). Si el proveedor no informa `usage`, se estima por longitud.
+        """
+        usage = usage or {}
+        prompt_tokens = usage.get('prompt_tokens') or sum(self._estimate_tokens(m['content']) for m in data['messages'])
+        completion_tokens = usage.get('completion_tokens') or self._estimate_tokens(completion_text)
+        record_llm_call(
+            stage, data['model'], prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            latency=time.monotonic() - start, retries=stats.get('retries', 0)
+        )
+
+    def _record_llm_response(self, stage: Optional[str], data: Dict, start: float, stats: Dict, result: Dict):
+        self._record_llm_usage(stage, data, start, stats, usage=result.get('usage'),
+                               completion_text=result['choices'][0]['message']['content'])
+
+    def _llm_attempt(self, prompt: str, system_message: str, max_tokens: int, stage: Optional[str],
+                     backend: Optional[Dict] = None):
+        """
+        Devuelve una función que hace una llamada a un backend y retorna el JSON ya parseado,
+        de modo que una respuesta inválida cuenta como fallo (y no gana un hedge).
+        """
+        def attempt() -> Dict:
+            base_url, headers, data, _ = self._build_llm_request(prompt, system_message, max_tokens, backend)
+            # Cliente compartido: pool de conexiones, timeouts y reintentos con backoff
+            start, stats = time.monotonic(), {}
+            result = llm_client.post_chat_completion(base_url, headers, data, stats=stats)
+            self._record_llm_response(stage, data, start, stats, result)
+            return self._parse_llm_response(result)
+        return attempt
+
+    def _allm_attempt(self, prompt: str, system_message: str, max_tokens: int, stage: Optional[str],
+                      backend: Optional[Dict] = None):
+        """Versión asíncrona de `_llm_attempt`."""
+        async def attempt() -> Dict:
+            base_url, headers, data, _ = self._build_llm_request(prompt, system_message, max_tokens, backend)
+            start, stats = time.monotonic(), {}
+            result = await async_llm_client.post_chat_completion(base_url, headers, data, stats=stats)
+            self._record_llm_response(stage, data, start, stats, result)
+            return self._parse_llm_response(result)
+        return attempt
+
+    def _call_llm_api(self, prompt: str, system_message: str, max_tokens: int = 1024,
+                      stage: Optional[str] = None) -> Dict:
+        """
+        Método central para hacer llamadas a la API del LLM (Together AI).
+        Las respuestas se memorizan en `llm_cache` (LLM_CACHE_ENABLED=False la desactiva), salvo
+        las de un backend secundario que gana el hedge (ver `_mark_hedge_winner`).
+        Cada llamada (o acierto de cache) se contabiliza en la etapa `stage` del análisis en curso.
+        """
+        base_url, headers, data, cache_key = self._build_llm_request(prompt, system_message, max_tokens)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Respuesta LLM obtenida de la cache")
+            record_llm_call(stage, data['model'], cached=True)
+            return cached
+
         try:
-            logger.debug(f"Enviando solicitud a LLM API. Modelo: {model_name}")
-            response = requests.post(base_url, headers=headers, json=data)
-            response.raise_for_status()  # Lanza una excepción para códigos de error HTTP
-            
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-            analysis = json.loads(content)
-            logger.debug(f"Análisis LLM recibido: {analysis}")
+            logger.debug(f"Enviando solicitud a LLM API. Modelo: {data['model']}")
+            if llm_hedging.active:
+                # Varios backends: duplicar la petición si el primario tarda más que su p95
+                attempts = [run_in_context(self._llm_attempt(prompt, system_message, max_tokens, stage, backend))
+                            for backend in [None] + llm_hedging.secondaries]
+                analysis, winner = llm_hedging.call(attempts)
+                if not self._mark_hedge_winner(analysis, winner):
+                    return analysis
+            else:
+                analysis = self._llm_attempt(prompt, system_message, max_tokens, stage)()
+            llm_cache.set(cache_key, analysis, namespace=data['model'])
             return analysis
 
+        except CircuitOpenError:
+            raise
         except requests.exceptions.HTTPError as http_err:
             logger.error(f"Error HTTP en API LLM: {http_err.response.status_code} - {http_err.response.text}")
             raise Exception(f"API Error: {http_err.response.status_code}") from http_err
@@ -120,20 +365,42 @@ class ContractMLService:
             logger.exception(f"Error en el análisis del LLM: {e}")
             raise
 
-    def _get_llm_summary(self, abusive_clauses: List[str]) -> Dict[str, str]:
+    async def _acall_llm_api(self, prompt: str, system_message: str, max_tokens: int = 1024,
+                             stage: Optional[str] = None) -> Dict:
         """
-        Usa un LLM para generar un resumen y recomendaciones.
+        Versión asíncrona de `_call_llm_api` sobre `async_llm_client`. Las lecturas y escrituras de
+        `llm_cache` (SQLite, con su purga periódica) van a un hilo para no bloquear el event loop.
         """
-        if not abusive_clauses:
-            logger.info("No hay cláusulas para analizar con LLM")
-            return {
-                'summary': 'No se encontraron cláusulas para analizar.',
-                'recommendations': 'No hay recomendaciones adicionales disponibles.'
-            }
+        base_url, headers, data, cache_key = self._build_llm_request(prompt, system_message, max_tokens)
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
+            logger.debug("Respuesta LLM obtenida de la cache")
+            record_llm_call(stage, data['model'], cached=True)
+            return cached
 
-        logger.info(f"Iniciando análisis LLM para {len(abusive_clauses)} cláusulas")
+        try:
+            logger.debug(f"Enviando solicitud asíncrona a LLM API. Modelo: {data['model']}")
+            if llm_hedging.active:
+                attempts = [self._allm_attempt(prompt, system_message, max_tokens, stage, backend)
+                            for backend in [None] + llm_hedging.secondaries]
+                analysis, winner = await llm_hedging.acall(attempts)
+                if not self._mark_hedge_winner(analysis, winner):
+                    return analysis
+            else:
+                analysis = await self._allm_attempt(prompt, system_message, max_tokens, stage)()
+            await asyncio.to_thread(llm_cache.set, cache_key, analysis, namespace=data['model'])
+            return analysis
+
+        except CircuitOpenError:
+            raise
+        except httpx.HTTPStatusError as http_err:
+            logger.error(f"Error HTTP en API LLM: {http_err.response.status_code} - {http_err.response.text}")
+            raise Exception(f"API Error: {http_err.response.status_code}") from http_err
+        except Exception as e:
+            logger.exception(f"Error en el análisis del LLM: {e}")
+            raise
 
-        # Construir el prompt
+    def _build_summary_prompt(self, abusive_clauses: List[str]) -> Tuple[str, str]:
         clauses_text = "\n".join([f"- {clause}" for clause in abusive_clauses])
         prompt = f"""
         Actúa como un asistente legal experto en la legislación de República Dominicana. He analizado un contrato y he identificado las siguientes cláusulas como potencialmente abusivas:
@@ -146,25 +413,93 @@ class ContractMLService:
         2.  **recomendaciones**: Proporciona una lista de 2 a 3 recomendaciones prácticas y accionables que el usuario debería considerar.
         """
         system_message = "Eres un asistente legal experto que analiza cláusulas de contratos en español, específicamente para el marco legal de República Dominicana. Tu respuesta debe ser siempre un objeto JSON válido."
+        return prompt, system_message
 
-        try:
-            analysis = self._call_llm_api(prompt, system_message)
-            return {
-                'summary': analysis.get('resumen', 'No se pudo generar el resumen.'),
-                'recommendations': analysis.get('recomendaciones', 'No se pudieron generar recomendaciones.')
-            }
-        except Exception:
-            return {
-                'summary': 'Error en el análisis de IA externa.',
-                'recommendations': 'No hay recomendaciones disponibles debido a un error técnico.'
-            }
+    @staticmethod
+    def _empty_summary() -> Dict[str, str]:
+        return {
+            'summary': 'No se encontraron cláusulas para analizar.',
+            'recommendations': 'No hay recomendaciones adicionales disponibles.'
+        }
 
-    def _extract_clauses_with_llm(self, contract_text: str) -> List[Dict[str, any]]:
+    @staticmethod
+    def _summary_from_analysis(analysis: Dict) -> Dict[str, str]:
+        return {
+            'summary': analysis.get('resumen', 'No se pudo generar el resumen.'),
+            'recommendations': analysis.get('recomendaciones', 'No se pudieron generar recomendaciones.')
+        }
+
+    @staticmethod
+    def _summary_error() -> Dict[str, str]:
+        return {
+            'summary': 'Error en el análisis de IA externa.',
+            'recommendations': 'No hay recomendaciones disponibles debido a un error técnico.'
+        }
+
+    @staticmethod
+    def _local_summary(abusive_clauses: List[str]) -> Dict[str, str]:
+        """Resumen sin LLM (circuito abierto), a partir de las cláusulas marcadas como abusivas."""
+        count = len(abusive_clauses)
+        return {
+            'summary': (f'Se identificaron {count} cláusula(s) potencialmente abusiva(s) con el clasificador local. '
+                        'El servicio de IA no está disponible, por lo que este resumen es preliminar.'),
+            'recommendations': ('Revise con un abogado las cláusulas marcadas como abusivas antes de firmar y '
+                                'vuelva a analizar el contrato más tarde para obtener el análisis completo.'),
+            'degraded': True
+        }
+
+    @staticmethod
+    def _llm_backend_urls() -> List[str]:
+        """URL del backend primario seguida de las de los secundarios de hedging (si está activo)."""
+        urls = [config('LLM_API_BASE_URL', default="https://api.together.xyz/v1/chat/completions")]
+        if llm_hedging.active:
+            urls += [backend['url'] for backend in llm_hedging.secondaries]
+        return urls
+
+    def _llm_available(self) -> bool:
         """
-        Usa un LLM para extraer cláusulas de un contrato, con prompt mejorado y ejemplos (few-shot).
+        False mientras el circuito de todos los proveedores del LLM está abierto: el análisis se
+        degrada a modo solo-ML. Con hedging basta un backend disponible.
         """
-        logger.info("Iniciando extracción de cláusulas con LLM (prompt mejorado)")
-        
+        return not llm_client.circuit_breakers.all_open(self._llm_backend_urls())
+
+    def _get_llm_summary(self, abusive_clauses: List[str]) -> Dict[str, str]:
+        """
+        Usa un LLM para generar un resumen y recomendaciones.
+        """
+        if not abusive_clauses:
+            logger.info("No hay cláusulas para analizar con LLM")
+            return self._empty_summary()
+        if not self._llm_available():
+            return self._local_summary(abusive_clauses)
+
+        logger.info(f"Iniciando análisis LLM para {len(abusive_clauses)} cláusulas")
+        prompt, system_message = self._build_summary_prompt(abusive_clauses)
+
+        try:
+            return self._summary_from_analysis(self._call_llm_api(prompt, system_message, stage=STAGE_SUMMARY))
+        except CircuitOpenError:
+            return self._local_summary(abusive_clauses)
+        except Exception:
+            return self._summary_error()
+
+    async def _aget_llm_summary(self, abusive_clauses: List[str]) -> Dict[str, str]:
+        """Versión asíncrona de `_get_llm_summary`."""
+        if not abusive_clauses:
+            logger.info("No hay cláusulas para analizar con LLM")
+            return self._empty_summary()
+        if not self._llm_available():
+            return self._local_summary(abusive_clauses)
+
+        prompt, system_message = self._build_summary_prompt(abusive_clauses)
+        try:
+            return self._summary_from_analysis(await self._acall_llm_api(prompt, system_message, stage=STAGE_SUMMARY))
+        except CircuitOpenError:
+            return self._local_summary(abusive_clauses)
+        except Exception:
+            return self._summary_error()
+
+    def _build_extraction_prompt(self, contract_text: str) -> Tuple[str, str]:
         # Ejemplos para few-shot
         few_shot_examples = '''
         Ejemplo de respuesta:
@@ -195,26 +530,179 @@ class ContractMLService:
         --- FIN DEL CONTRATO ---
         """
         system_message = "Eres un asistente legal experto que extrae cláusulas de documentos legales. Tu respuesta debe ser siempre un objeto JSON válido que contenga una única clave 'clauses'. Si una cláusula no tiene número, usa 'SIN_NUMERO'."
+        return prompt, system_message
+
+    @staticmethod
+    def _clauses_from_analysis(analysis: Dict) -> List[Dict[str, any]]:
+        clauses = analysis.get('clauses', [])
+        if not isinstance(clauses, list):
+            logger.error(f"La extracción de cláusulas con LLM no devolvió una lista, sino {type(clauses)}")
+            return []
+        return clauses
+
+    def _regex_fallback_clauses(self, contract_text: str) -> List[Dict[str, any]]:
+        # Fallback: usar el segmentador por reglas (o el método regex antiguo) si el LLM falla
+        logger.info("Usando método de extracción regex como respaldo.")
+        segmentation = clause_segmenter.segment(contract_text)
+        if segmentation.clauses:
+            return segmentation.clauses
+        return [{"clause_number": f"SIN_NUMERO_{i+1}", "text": c} for i, c in enumerate(self._extract_clauses(contract_text))]
+
+    def _segment_locally(self, contract_text: str) -> Optional[List[Dict[str, any]]]:
+        """
+        Camino rápido: segmenta el contrato con reglas y devuelve las cláusulas si la confianza
+        alcanza `SEGMENTER_MIN_CONFIDENCE`; si no, devuelve None para que se use el LLM.
+        """
+        if not SEGMENTER_ENABLED:
+            return None
+        start = datetime.now()
+        segmentation = clause_segmenter.segment(contract_text)
+        elapsed_ms = (datetime.now() - start).total_seconds() * 1000
+        fast_path = segmentation.confidence >= SEGMENTER_MIN_CONFIDENCE
+        clause_segmenter.record_path(fast_path)
+        logger.info(
+            f"Segmentación local: {len(segmentation.clauses)} cláusulas, confianza {segmentation.confidence:.2f} "
+            f"{segmentation.details} en {elapsed_ms:.1f} ms -> {'camino rápido' if fast_path else 'extracción con LLM'}"
+        )
+        return segmentation.clauses if fast_path else None
+
+    def _extract_clauses_with_llm(self, contract_text: str) -> List[Dict[str, any]]:
+        """
+        Usa un LLM para extraer cláusulas de un contrato, con prompt mejorado y ejemplos (few-shot).
+        Los contratos largos se dividen en ventanas que se extraen en paralelo (ver `LLM_EXTRACTION_MODE`).
+        Con el circuito del LLM abierto se usa directamente la segmentación por reglas.
+        """
+        if not self._llm_available():
+            logger.warning("LLM no disponible: extracción de cláusulas por reglas")
+            return self._regex_fallback_clauses(contract_text)
+        windows = self._split_extraction_windows(contract_text)
+        if len(windows) > 1:
+            logger.info(f"Extrayendo cláusulas con LLM en {len(windows)} ventanas")
+            max_workers = max(1, min(LLM_MAX_CONCURRENCY, len(windows)))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-extract') as executor:
+                window_clauses = list(executor.map(run_in_context(self._extract_window_with_llm), windows))
+            return self._merge_window_clauses(contract_text, window_clauses)
+
+        logger.info("Iniciando extracción de cláusulas con LLM (prompt mejorado)")
+        prompt, system_message = self._build_extraction_prompt(contract_text)
 
         try:
-            analysis = self._call_llm_api(prompt, system_message)
-            clauses = analysis.get('clauses', [])
-            if not isinstance(clauses, list):
-                logger.error(f"La extracción de cláusulas con LLM no devolvió una lista, sino {type(clauses)}")
-                return []
-            return clauses
+            return self._clauses_from_analysis(self._call_llm_api(prompt, system_message, stage=STAGE_EXTRACTION))
         except Exception:
             logger.exception("No se pudieron extraer cláusulas con el LLM.")
-            # Fallback: usar método regex si el LLM falla
-            logger.info("Usando método de extracción regex como respaldo.")
-            return [{"clause_number": f"SIN_NUMERO_{i+1}", "text": c} for i, c in enumerate(self._extract_clauses(contract_text))]
+            return self._regex_fallback_clauses(contract_text)
 
-    def _validate_clause_with_llm(self, clause_text: str) -> Dict[str, any]:
+    async def _aextract_clauses_with_llm(self, contract_text: str) -> List[Dict[str, any]]:
+        """Versión asíncrona de `_extract_clauses_with_llm`."""
+        if not self._llm_available():
+            logger.warning("LLM no disponible: extracción de cláusulas por reglas")
+            return self._regex_fallback_clauses(contract_text)
+        windows = self._split_extraction_windows(contract_text)
+        if len(windows) > 1:
+            window_clauses = await asyncio.gather(*(self._aextract_window_with_llm(w) for w in windows))
+            return self._merge_window_clauses(contract_text, list(window_clauses))
+
+        prompt, system_message = self._build_extraction_prompt(contract_text)
+        try:
+            return self._clauses_from_analysis(await self._acall_llm_api(prompt, system_message, stage=STAGE_EXTRACTION))
+        except Exception:
+            logger.exception("No se pudieron extraer cláusulas con el LLM.")
+            return self._regex_fallback_clauses(contract_text)
+
+    def _split_extraction_windows(self, contract_text: str) -> List[str]:
         """
-        Usa un LLM para validar una cláusula específica. Prompt mejorado con few-shot y campo de confianza.
+        Divide el contrato en ventanas de ~`LLM_EXTRACTION_WINDOW_TOKENS` cortando solo en fronteras
+        estructurales. Cada ventana repite el último bloque de la anterior para que una cláusula
+        partida en el borde aparezca completa en alguna ventana.
         """
-        logger.info(f"Validando cláusula con LLM: '{clause_text[:80]}...'")
-        
+        if LLM_EXTRACTION_MODE == 'single':
+            return [contract_text]
+        if LLM_EXTRACTION_MODE == 'auto' and self._estimate_tokens(contract_text) <= LLM_EXTRACTION_WINDOW_TOKENS:
+            return [contract_text]
+
+        blocks = [block.strip() for block in STRUCTURAL_BOUNDARY.split(contract_text) if block and block.strip()]
+        windows = []
+        current, current_tokens = [], 0
+        for block in blocks:
+            tokens = self._estimate_tokens(block)
+            if current and current_tokens + tokens > LLM_EXTRACTION_WINDOW_TOKENS:
+                windows.append("\n\n".join(current))
+                # Solapamiento: el último bloque abre la siguiente ventana
+                current = [current[-1]]
+                current_tokens = self._estimate_tokens(current[0])
+            current.append(block)
+            current_tokens += tokens
+        if current:
+            windows.append("\n\n".join(current))
+        return windows or [contract_text]
+
+    def _window_output_tokens(self, window_text: str) -> int:
+        """Presupuesto de salida proporcional a la ventana: el JSON repite su texto más la estructura."""
+        budget = int(self._estimate_tokens(window_text) * 1.3) + 200
+        return max(LLM_EXTRACTION_MIN_OUTPUT_TOKENS, min(LLM_EXTRACTION_MAX_OUTPUT_TOKENS, budget))
+
+    def _extract_window_with_llm(self, window_text: str) -> List[Dict[str, any]]:
+        prompt, system_message = self._build_extraction_prompt(window_text)
+        try:
+            analysis = self._call_llm_api(prompt, system_message, max_tokens=self._window_output_tokens(window_text),
+                                          stage=STAGE_EXTRACTION)
+            return self._clauses_from_analysis(analysis)
+        except Exception:
+            logger.exception("No se pudieron extraer cláusulas de una ventana con el LLM.")
+            return self._regex_fallback_clauses(window_text)
+
+    async def _aextract_window_with_llm(self, window_text: str) -> List[Dict[str, any]]:
+        prompt, system_message = self._build_extraction_prompt(window_text)
+        try:
+            analysis = await self._acall_llm_api(prompt, system_message, max_tokens=self._window_output_tokens(window_text),
+                                                 stage=STAGE_EXTRACTION)
+            return self._clauses_from_analysis(analysis)
+        except Exception:
+            logger.exception("No se pudieron extraer cláusulas de una ventana con el LLM.")
+            return self._regex_fallback_clauses(window_text)
+
+    @staticmethod
+    def _comparable_text(text: str) -> str:
+        return re.sub(r'\s+', ' ', text).strip().lower()
+
+    def _merge_window_clauses(self, contract_text: str, window_clauses: List[List[Dict]]) -> List[Dict[str, any]]:
+        """
+        Une las cláusulas de todas las ventanas en orden de documento. Las repetidas por el
+        solapamiento se descartan; si una está contenida en otra (cortada en el borde de la
+        ventana) se conserva la versión más larga.
+        """
+        contract_comparable = self._comparable_text(contract_text)
+        merged = []
+        for window_index, clauses in enumerate(window_clauses):
+            for clause in clauses:
+                if not isinstance(clause, dict) or not clause.get('text'):
+                    continue
+                comparable = self._comparable_text(clause['text'])
+                duplicate = False
+                for kept in merged:
+                    if comparable in kept['comparable']:
+                        duplicate = True
+                        break
+                    if kept['comparable'] in comparable:
+                        position = contract_comparable.find(comparable[:60])
+                        kept.update(clause=clause, comparable=comparable,
+                                    order=(position if position >= 0 else kept['order'][0],) + kept['order'][1:])
+                        duplicate = True
+                        break
+                if duplicate:
+                    continue
+                position = contract_comparable.find(comparable[:60])
+                merged.append({
+                    'clause': clause,
+                    'comparable': comparable,
+                    # Si el LLM reformuló el texto y no aparece literal, usar el orden de la ventana
+                    'order': (position if position >= 0 else float('inf'), window_index, len(merged))
+                })
+
+        merged.sort(key=lambda item: item['order'])
+        return [item['clause'] for item in merged]
+
+    def _build_validation_prompt(self, clause_text: str) -> Tuple[str, str]:
         # Ejemplo few-shot para el prompt
         few_shot = '''
         Ejemplo de respuesta para una cláusula abusiva:
@@ -241,36 +729,169 @@ class ContractMLService:
         --- FIN DE LA CLÁUSULA ---
         """
         system_message = "Eres un asistente legal experto que analiza cláusulas de contratos. Tu respuesta debe ser siempre un objeto JSON válido con las claves 'is_valid_clause', 'is_abusive', 'explanation', 'suggested_fix' y 'confidence'."
+        return prompt, system_message
+
+    @staticmethod
+    def _degraded_validation() -> Dict[str, any]:
+        # Sin 'is_abusive': el risk_score y el resumen usan solo el clasificador
+        return {'degraded': True, 'explanation': LLM_DEGRADED_EXPLANATION}
+
+    @staticmethod
+    def _validation_error() -> Dict[str, any]:
+        return {
+            'is_valid_clause': False,
+            'is_abusive': False,
+            'explanation': LLM_ERROR_EXPLANATION,
+            'suggested_fix': '',
+            'confidence': 0.0
+        }
+
+    def _validate_clause_with_llm(self, clause_text: str) -> Dict[str, any]:
+        """
+        Usa un LLM para validar una cláusula específica. Prompt mejorado con few-shot y campo de confianza.
+        """
+        if not self._llm_available():
+            return self._degraded_validation()
+        logger.info(f"Validando cláusula con LLM: '{clause_text[:80]}...'")
+        prompt, system_message = self._build_validation_prompt(clause_text)
 
         try:
-            return self._call_llm_api(prompt, system_message)
+            return self._call_llm_api(prompt, system_message, stage=STAGE_VALIDATION)
+        except CircuitOpenError:
+            return self._degraded_validation()
         except Exception:
             logger.exception(f"No se pudo validar la cláusula con el LLM.")
-            return {
-                'is_valid_clause': False,
-                'is_abusive': False,
-                'explanation': 'Error al analizar la cláusula con el servicio de IA.',
-                'suggested_fix': '',
-                'confidence': 0.0
-            }
+            return self._validation_error()
+
+    async def _avalidate_clause_with_llm(self, clause_text: str) -> Dict[str, any]:
+        """Versión asíncrona de `_validate_clause_with_llm`."""
+        if not self._llm_available():
+            return self._degraded_validation()
+        prompt, system_message = self._build_validation_prompt(clause_text)
+        try:
+            return await self._acall_llm_api(prompt, system_message, stage=STAGE_VALIDATION)
+        except CircuitOpenError:
+            return self._degraded_validation()
+        except Exception:
+            logger.exception("No se pudo validar la cláusula con el LLM.")
+            return self._validation_error()
     
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Estimación barata de tokens (~4 caracteres por token en español)."""
+        return len(text) // 4 + 1
+
+    def _build_validation_batches(self, clause_texts: List[str]) -> List[List[int]]:
+        """
+        Agrupa los índices de las cláusulas en lotes que respetan el presupuesto de tokens
+        (`LLM_BATCH_PROMPT_TOKENS`) y el tope `LLM_BATCH_MAX_CLAUSES`. Las cláusulas largas
+        producen lotes más pequeños; una cláusula que excede el presupuesto va sola.
+        """
+        batches = []
+        current, current_tokens = [], 0
+        for i, text in enumerate(clause_texts):
+            tokens = self._estimate_tokens(text)
+            if current and (current_tokens + tokens > LLM_BATCH_PROMPT_TOKENS or len(current) >= LLM_BATCH_MAX_CLAUSES):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _validate_clause_batch_with_llm(self, clause_texts: List[str]) -> List[Dict]:
+        """
+        Valida varias cláusulas en una sola llamada al LLM. La respuesta debe ser un objeto JSON
+        con la clave "results": un array de veredictos identificados por "index".
+        Si la respuesta es inválida o incompleta, el lote se divide en dos recursivamente;
+        un lote de una sola cláusula usa `_validate_clause_with_llm` (con su respaldo de error).
+        """
+        if len(clause_texts) == 1:
+            return [self._validate_clause_with_llm(clause_texts[0])]
+        if not self._llm_available():
+            return [self._degraded_validation() for _ in clause_texts]
+
+        logger.info(f"Validando lote de {len(clause_texts)} cláusulas con LLM")
+
+        numbered = "\n".join(
+            f"[{i}] {text}" for i, text in enumerate(clause_texts)
+        )
+        prompt = f"""
+        Actúa como un asistente legal experto en la legislación de República Dominicana. Analiza CADA una de las siguientes cláusulas de contrato (identificadas por su índice entre corchetes) y determina su validez y si es abusiva. Devuelve un objeto JSON con una única clave "results": un array con un objeto por cláusula con las claves:
+        - "index": El índice entero de la cláusula.
+        - "is_valid_clause": Un booleano. `true` si parece ser una cláusula legal real, `false` si es texto sin sentido, un encabezado, o no es una cláusula.
+        - "is_abusive": Un booleano. `true` si la cláusula contiene elementos que podrían ser considerados abusivos o injustos para una de las partes; de lo contrario, `false`.
+        - "explanation": Una explicación concisa (1-2 frases) del motivo de tu evaluación.
+        - "suggested_fix": Si la cláusula es abusiva, una sugerencia de cómo reescribirla; si no, una cadena vacía.
+        - "confidence": Un número entre 0 y 1 que indica tu nivel de confianza.
+
+        --- INICIO DE LAS CLÁUSULAS ---
+        {numbered}
+        --- FIN DE LAS CLÁUSULAS ---
+        """
+        system_message = "Eres un asistente legal experto que analiza cláusulas de contratos. Tu respuesta debe ser siempre un objeto JSON válido con una única clave 'results' que contenga un veredicto por cada índice recibido."
+        max_tokens = LLM_BATCH_TOKENS_PER_VERDICT * len(clause_texts) + 100
+
+        verdicts = {}
+        try:
+            analysis = self._call_llm_api(prompt, system_message, max_tokens=max_tokens, stage=STAGE_VALIDATION)
+            results = analysis.get('results', [])
+            if isinstance(results, list):
+                for item in results:
+                    if isinstance(item, dict) and isinstance(item.get('index'), int) and 0 <= item['index'] < len(clause_texts):
+                        verdict = dict(item)
+                        verdict.pop('index')
+                        if HEDGE_MODEL_KEY in analysis:
+                            verdict[HEDGE_MODEL_KEY] = analysis[HEDGE_MODEL_KEY]
+                        verdicts[item['index']] = verdict
+        except Exception:
+            logger.exception("Falló la validación por lote con el LLM.")
+
+        if len(verdicts) == len(clause_texts):
+            return [verdicts[i] for i in range(len(clause_texts))]
+
+        # Respuesta malformada o incompleta: dividir el lote y reintentar cada mitad
+        logger.warning(f"Lote incompleto ({len(verdicts)}/{len(clause_texts)} veredictos), dividiendo")
+        middle = len(clause_texts) // 2
+        return (self._validate_clause_batch_with_llm(clause_texts[:middle]) +
+                self._validate_clause_batch_with_llm(clause_texts[middle:]))
+
+    def _validate_clauses_in_batches(self, clause_texts: List[str], max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Modo por lotes: agrupa las cláusulas según su longitud y valida cada lote con una sola
+        llamada al LLM. Los lotes se envían en paralelo (hasta `max_workers`) y el resultado
+        conserva el orden de `clause_texts`.
+        """
+        batches = self._build_validation_batches(clause_texts)
+        if max_workers is None:
+            max_workers = LLM_MAX_CONCURRENCY
+        max_workers = max(1, min(max_workers, len(batches)))
+
+        batch_texts = [[clause_texts[i] for i in batch] for batch in batches]
+        logger.info(f"Validando {len(clause_texts)} cláusulas en {len(batches)} lotes")
+        if max_workers == 1:
+            batch_results = [self._validate_clause_batch_with_llm(texts) for texts in batch_texts]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-batch') as executor:
+                batch_results = list(executor.map(run_in_context(self._validate_clause_batch_with_llm), batch_texts))
+
+        return [verdict for results in batch_results for verdict in results]
+
     def _load_pretrained_models(self):
-        """Intenta cargar modelos preentrenados"""
+        """Carga la versión fijada (`ML_MODEL_VERSION`) o la activa del registro de modelos"""
         models_path = getattr(settings, 'ML_MODELS_PATH', None)
         if models_path and os.path.exists(models_path):
             try:
-                # Buscar archivos de modelo más recientes
-                model_files = [f for f in os.listdir(models_path) if f.startswith('modelo_clausulas_') and f.endswith('.joblib')]
+                self._manifest_mtime = model_registry.manifest_mtime()
+                version = ML_MODEL_VERSION or model_registry.active_version()
                 
-                if model_files:
-                    # Usar el modelo más reciente
-                    latest_model = sorted(model_files)[-1]
-                    model_path = os.path.join(models_path, latest_model)
-                    
+                if version:
                     # Cargar el pipeline completo (incluye vectorizador)
-                    self.classifier_pipeline = joblib.load(model_path)
+                    self.classifier_pipeline = model_registry.load(version)
+                    self.model_version = version
                     
-                    print(f"Modelo cargado: {latest_model}")
+                    print(f"Modelo cargado: {version}")
                     return True
                 else:
                     print(f"No se encontraron modelos en {models_path}")
@@ -280,6 +901,39 @@ class ContractMLService:
             print(f"Ruta de modelos no existe: {models_path}")
         
         return False
+
+    def _refresh_model_if_changed(self):
+        """
+        Recarga en caliente el clasificador si otro proceso activó una versión nueva en el registro.
+        La nueva versión se carga aparte y se sustituye con una sola asignación: las peticiones en
+        curso terminan con el pipeline que ya tenían y ningún worker necesita reiniciarse.
+        """
+        if ML_MODEL_VERSION or not self._models_ready:
+            return
+        now = time.monotonic()
+        if now < self._next_model_check:
+            return
+        self._next_model_check = now + ML_MODEL_RELOAD_INTERVAL
+        mtime = model_registry.manifest_mtime()
+        if mtime is None or mtime == self._manifest_mtime:
+            return
+        # Una sola recarga por proceso; el resto de peticiones sigue con el modelo actual
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            version = model_registry.active_version()
+            if version and version != self.model_version:
+                start = time.monotonic()
+                pipeline = model_registry.load(version)
+                self.classifier_pipeline, self.model_version = pipeline, version
+                logger.info(f"Modelo {version} recargado en caliente en {time.monotonic() - start:.2f}s")
+                self._invalidate_stale_clause_cache()
+            self._manifest_mtime = mtime
+        except (ModelRegistryError, OSError, ValueError) as e:
+            logger.error(f"No se pudo recargar el modelo activo; se mantiene {self.model_version}: {e}")
+            self._manifest_mtime = mtime
+        finally:
+            self._reload_lock.release()
     
     def _train_default_model(self):
         """Entrena un modelo por defecto con datos del notebook"""
@@ -299,11 +953,18 @@ class ContractMLService:
             {"clausula": "POR TANTO: La señora Carla Estévez Herrera se obliga con FINANCIERA DOMINICANA, S.R.L. al pago de la suma de RD$3,200,000.00 con un interés del 1.7% mensual.", "etiqueta": 0}
         ]
         
+        import pandas as pd
+        import lightgbm as lgb
+        from sklearn.pipeline import Pipeline
+
         df = pd.DataFrame(training_data)
         
         # Crear pipeline con LightGBM
+        step_name, featurizer, feature_config = build_featurizer(
+            ML_FEATURIZER, stop_words=self.stopwords_es, max_features=1000, ngram_range=(1, 1)
+        )
         self.classifier_pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(stop_words=self.stopwords_es, max_features=1000)),
+            (step_name, featurizer),
             ('classifier', lgb.LGBMClassifier(
                 objective='binary',
                 class_weight='balanced',
@@ -315,53 +976,213 @@ class ContractMLService:
         self.classifier_pipeline.fit(df['clausula'], df['etiqueta'])
         
         # Guardar modelo
-        self._save_model()
+        self.model_version = 'default'
+        self._save_model(feature_config)
         
         print("Modelo por defecto entrenado")
     
-    def _save_model(self):
-        """Guarda el modelo entrenado"""
+    def _save_model(self, feature_config: Optional[Dict] = None):
+        """Registra el modelo por defecto (solo pasa a ser el activo si no hay ninguno)"""
         models_path = getattr(settings, 'ML_MODELS_PATH', None)
         if models_path:
-            os.makedirs(models_path, exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            version = model_registry.register(
+                self.classifier_pipeline,
+                feature_config=feature_config,
+                activate=False,
+                source='default',
+            )
+            self._manifest_mtime = model_registry.manifest_mtime()
             
-            model_path = os.path.join(models_path, f'modelo_clausulas_{timestamp}.joblib')
-            joblib.dump(self.classifier_pipeline, model_path)
-            
-            print(f"Modelo guardado en: {model_path}")
+            print(f"Modelo guardado en: {model_registry.artifact_path(version)}")
     
-    def _analyze_clause(self, clause_text: str) -> Dict:
+    def _validate_clauses_concurrently(self, clause_texts: List[str], max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Valida varias cláusulas con el LLM en paralelo, con un máximo de llamadas en vuelo.
+        Los resultados se devuelven en el mismo orden que `clause_texts`. Cada cláusula
+        conserva su propio respaldo de error (ver `_validate_clause_with_llm`).
+        """
+        if max_workers is None:
+            max_workers = LLM_MAX_CONCURRENCY
+        max_workers = max(1, min(max_workers, len(clause_texts)))
+
+        if max_workers == 1:
+            return [self._validate_clause_with_llm(text) for text in clause_texts]
+
+        logger.info(f"Validando {len(clause_texts)} cláusulas con LLM ({max_workers} en paralelo)")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-validate') as executor:
+            # `map` preserva el orden de entrada aunque las respuestas lleguen desordenadas
+            return list(executor.map(run_in_context(self._validate_clause_with_llm), clause_texts))
+
+    def _clause_cache_version(self) -> str:
+        """Versión de los modelos que produjeron un resultado de cláusula (clasificador + LLM)."""
+        return clause_cache.make_version(
+            self.model_version or 'unknown',
+            config('LLM_MODEL_NAME', default=DEFAULT_LLM_MODEL_NAME)
+        )
+
+    def _invalidate_stale_clause_cache(self):
+        """Elimina los resultados de cláusulas generados con otros modelos."""
+        try:
+            clause_cache.invalidate_except(self._clause_cache_version())
+        except Exception as e:
+            logger.warning(f"No se pudo invalidar la cache de cláusulas: {e}")
+
+    def _get_cached_clause_analysis(self, clause_text: str, extract_entities: bool = True) -> Optional[Dict]:
+        """
+        Busca el análisis de una cláusula equivalente (misma plantilla, ver `normalize_clause_text`).
+        El veredicto ML/LLM se reutiliza tal cual; las entidades solo si el texto es idéntico,
+        porque sus posiciones dependen del texto exacto. Si no lo es y `extract_entities` es False,
+        `entities` queda en None para que `_complete_clause_results` las extraiga por lotes.
+        """
+        key = clause_cache.make_clause_key(clause_text, self._clause_cache_version())
+        cached = clause_cache.get(key)
+        if cached is None:
+            return None
+
+        entities = cached['entities']
+        if cached.get('text_hash') != clause_cache.text_hash(clause_text):
+            entities = self._extract_entities(clause_text) if extract_entities else None
+
+        return {
+            'text': clause_text,
+            'ml_analysis': copy.deepcopy(cached['ml_analysis']),
+            'gpt_analysis': copy.deepcopy(cached['gpt_analysis']),
+            'entities': copy.deepcopy(entities),
+            'analysis_path': PATH_CACHE
+        }
+
+    def _store_clause_analysis(self, result: Dict):
+        """
+        Guarda el análisis de una cláusula, salvo que el LLM haya fallado o no haya intervenido
+        (los resultados solo-ML del modo cascada son baratos de recalcular y dependen de sus umbrales),
+        o que el veredicto venga de un backend secundario: la versión de la cache es la del primario.
+        """
+        if result.get('analysis_path') != PATH_LLM:
+            return
+        if result['gpt_analysis'].get('explanation') == LLM_ERROR_EXPLANATION:
+            return
+        if HEDGE_MODEL_KEY in result['gpt_analysis']:
+            return
+        version = self._clause_cache_version()
+        clause_cache.set(
+            clause_cache.make_clause_key(result['text'], version),
+            {
+                'text_hash': clause_cache.text_hash(result['text']),
+                'ml_analysis': result['ml_analysis'],
+                'gpt_analysis': result['gpt_analysis'],
+                'entities': result['entities']
+            },
+            namespace=version
+        )
+
+    def _analyze_clause(self, clause_text: str, llm_analysis: Optional[Dict] = None) -> Dict:
         """
         Analiza una cláusula individual y retorna resultados.
+        Primero consulta la cache de cláusulas; si no hay entrada, ejecuta el análisis completo.
+        """
+        cached = self._get_cached_clause_analysis(clause_text)
+        if cached is not None:
+            return cached
+        return self._compute_clause_analysis(clause_text, llm_analysis)
+
+    def _classify_clauses(self, clause_texts: List[str]) -> List[Dict]:
+        """
+        Predicción del clasificador local para varias cláusulas en una sola pasada: el TF-IDF
+        vectoriza todas en una matriz dispersa y LightGBM ejecuta un único `predict_proba`.
+        La etiqueta se deriva de la probabilidad con `CLASSIFIER_THRESHOLD`.
+        """
+        if not clause_texts:
+            return []
+        pipeline = self.classifier_pipeline  # referencia estable aunque haya una recarga en caliente
+        probabilities = pipeline.predict_proba(list(clause_texts))[:, 1]  # clase '1' (abusiva)
+        return [
+            {
+                'is_abusive': bool(probability >= CLASSIFIER_THRESHOLD),
+                'abuse_probability': float(probability)
+            }
+            for probability in probabilities
+        ]
+
+    def _classify_clause(self, clause_text: str) -> Dict:
+        """Predicción del clasificador local para una cláusula."""
+        return self._classify_clauses([clause_text])[0]
+
+    def _cascade_path(self, ml_analysis: Dict) -> str:
+        """Decide si una cláusula necesita al LLM según la banda de probabilidad del clasificador."""
+        if not self._llm_available():
+            return PATH_DEGRADED
+        if not LLM_CASCADE_ENABLED:
+            return PATH_LLM
+        abuse_probability = ml_analysis['abuse_probability']
+        if abuse_probability <= LLM_CASCADE_SAFE_THRESHOLD:
+            return PATH_ML_SAFE
+        if abuse_probability >= LLM_CASCADE_ABUSIVE_THRESHOLD:
+            return PATH_ML_ABUSIVE
+        return PATH_LLM
+
+    def _compute_clause_analysis(self, clause_text: str, llm_analysis: Optional[Dict] = None,
+                                 ml_analysis: Optional[Dict] = None, entities: Optional[List[Dict]] = None) -> Dict:
+        """
+        Ejecuta el análisis ML + LLM + entidades de una cláusula y lo guarda en la cache.
+        Si `llm_analysis` se proporciona (p. ej. validado en paralelo), no se vuelve a llamar al LLM;
+        si `ml_analysis` se proporciona, no se vuelve a ejecutar el clasificador, y lo mismo con
+        `entities` (extraídas por lotes en `_complete_clause_results`).
+        En modo cascada las cláusulas claras no pasan por el LLM y `gpt_analysis` queda vacío.
         """
         # 1. Predecir si es abusiva con el modelo ML
-        prediction = self.classifier_pipeline.predict([clause_text])[0]
-        probability = self.classifier_pipeline.predict_proba([clause_text])
-        abuse_probability = probability[0][1] # Probabilidad de ser clase '1' (abusiva)
+        if ml_analysis is None:
+            ml_analysis = self._classify_clause(clause_text)
 
-        # 2. Validar con el LLM para una segunda opinión
-        llm_analysis = self._validate_clause_with_llm(clause_text)
+        # 2. Validar con el LLM para una segunda opinión (solo la banda incierta en modo cascada)
+        if llm_analysis is not None:
+            path = PATH_LLM
+        else:
+            path = self._cascade_path(ml_analysis)
+            if path == PATH_LLM:
+                llm_analysis = self._validate_clause_with_llm(clause_text)
+            elif path == PATH_DEGRADED:
+                llm_analysis = self._degraded_validation()
+            else:
+                llm_analysis = {}
+        if llm_analysis.get('degraded'):
+            # El circuito se abrió mientras se validaba: resultado solo-ML, no se guarda en cache
+            path = PATH_DEGRADED
         
         # 3. Extraer entidades con spaCy
-        entities = self._extract_entities(clause_text)
+        if entities is None:
+            entities = self._extract_entities(clause_text)
         
-        return {
+        result = {
             'text': clause_text,
-            'ml_analysis': {
-                'is_abusive': bool(prediction),
-                'abuse_probability': abuse_probability
-            },
+            'ml_analysis': ml_analysis,
             'gpt_analysis': llm_analysis, # Renombrado de 'gpt_analysis' a 'llm_analysis' sería un paso futuro
-            'entities': entities
+            'entities': entities,
+            'analysis_path': path
         }
+        self._store_clause_analysis(result)
+        return result
 
     def _extract_entities(self, text: str) -> List[Dict]:
         """Extrae entidades usando spaCy + reglas personalizadas"""
+        return self._extract_entities_batch([text])[0]
+
+    def _extract_entities_batch(self, texts: List[str], n_process: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Extrae las entidades de varias cláusulas con `nlp.pipe` (lotes de `ENTITY_BATCH_SIZE`).
+        Con `n_process` (o `ENTITY_N_PROCESS` si hay al menos `ENTITY_MULTIPROCESS_MIN_TEXTS` textos)
+        spaCy reparte los lotes entre varios procesos. El resultado por cláusula es el mismo que
+        con `_extract_entities`.
+        """
         if not self.nlp:
+            return [[] for _ in texts]
+        if not texts:
             return []
-        
-        doc = self.nlp(text)
+        if n_process is None:
+            n_process = ENTITY_N_PROCESS if len(texts) >= ENTITY_MULTIPROCESS_MIN_TEXTS else 1
+        docs = self.nlp.pipe(texts, batch_size=ENTITY_BATCH_SIZE, n_process=max(1, n_process))
+        return [self._entities_from_doc(doc) for doc in docs]
+
+    def _entities_from_doc(self, doc) -> List[Dict]:
         entities = []
         
         # Entidades de spaCy
@@ -407,45 +1228,70 @@ class ContractMLService:
         # Esta lógica se ha movido a _get_llm_summary y se llama desde analyze_contract
         return "Recomendaciones generadas por el análisis de IA."
 
-    def analyze_contract(self, contract_text: str) -> Dict:
+    def _empty_contract_result(self, start_time: datetime, degraded: bool = False) -> Dict:
         """
-        Orquesta el análisis completo de un contrato. Mejoras: risk_score híbrido ML+LLM y mayor cobertura de extracción.
+        Respuesta cuando no se extrae ninguna cláusula. Con `degraded` (circuito del LLM abierto y
+        la segmentación por reglas sin resultados) se marca como tal para que el cliente sepa que
+        el LLM no intervino y que conviene reintentar más tarde.
         """
-        start_time = datetime.now()
-        
-        # 1. Extraer cláusulas del texto usando el LLM (prompt mejorado)
-        extracted_clauses = self._extract_clauses_with_llm(contract_text)
-        
-        clause_results = []
-        if not extracted_clauses:
-            logger.warning("No se pudieron extraer cláusulas del contrato.")
+        logger.warning("No se pudieron extraer cláusulas del contrato.")
+        if degraded:
             return {
                 'clause_results': [],
-                'summary': 'Error: No se pudieron extraer cláusulas del documento para su análisis.',
-                'recommendations': 'Por favor, verifique que el texto del contrato sea claro y esté bien estructurado.',
+                'summary': ('Error: El servicio de IA no está disponible y la segmentación por reglas no encontró '
+                            'cláusulas en el documento.'),
+                'recommendations': ('Vuelva a analizar el contrato más tarde o verifique que sus cláusulas tengan '
+                                    'encabezados reconocibles (PRIMERO, ARTÍCULO 1, CLÁUSULA 1...).'),
+                'analysis_paths': {PATH_DEGRADED: 0},
+                'degraded': True,
                 'processing_time': (datetime.now() - start_time).total_seconds()
             }
+        return {
+            'clause_results': [],
+            'summary': 'Error: No se pudieron extraer cláusulas del documento para su análisis.',
+            'recommendations': 'Por favor, verifique que el texto del contrato sea claro y esté bien estructurado.',
+            'processing_time': (datetime.now() - start_time).total_seconds()
+        }
 
-        # 2. Analizar cada cláusula individualmente
-        for i, clause_data in enumerate(extracted_clauses):
-            analysis_result = self._analyze_clause(clause_data['text'])
-            
-            # Combinar número de cláusula con el resultado del análisis
-            analysis_result['clause_number'] = clause_data.get('clause_number', f'Cláusula {i+1}')
-            
-            # Mejor risk_score: ponderación ML y LLM
-            ml_risk = analysis_result['ml_analysis']['abuse_probability']
-            llm_conf = analysis_result['gpt_analysis'].get('confidence', 0.0)
-            llm_is_abusive = analysis_result['gpt_analysis'].get('is_abusive', False)
-            # Si el LLM detecta abuso, ponderar más su confianza
-            if llm_is_abusive:
-                risk_score = 0.6 * ml_risk + 0.4 * llm_conf
-            else:
-                risk_score = ml_risk * 0.8 + llm_conf * 0.2
-            analysis_result['risk_score'] = risk_score
-            clause_results.append(analysis_result)
+    def _finalize_clause_result(self, analysis_result: Dict, clause_data: Dict, index: int) -> Dict:
+        """Añade número de cláusula y risk_score híbrido ML+LLM al resultado de una cláusula."""
+        # Combinar número de cláusula con el resultado del análisis
+        analysis_result['clause_number'] = clause_data.get('clause_number', f'Cláusula {index+1}')
+        
+        # Mejor risk_score: ponderación ML y LLM
+        ml_risk = analysis_result['ml_analysis']['abuse_probability']
+        llm_conf = analysis_result['gpt_analysis'].get('confidence', 0.0)
+        llm_is_abusive = analysis_result['gpt_analysis'].get('is_abusive', False)
+        if not self._has_llm_verdict(analysis_result):
+            # Sin veredicto del LLM (modo cascada): el clasificador decide solo
+            risk_score = ml_risk
+        # Si el LLM detecta abuso, ponderar más su confianza
+        elif llm_is_abusive:
+            risk_score = 0.6 * ml_risk + 0.4 * llm_conf
+        else:
+            risk_score = ml_risk * 0.8 + llm_conf * 0.2
+        analysis_result['risk_score'] = risk_score
+        return analysis_result
+
+    @staticmethod
+    def _has_llm_verdict(clause_result: Dict) -> bool:
+        return 'is_abusive' in clause_result['gpt_analysis']
 
-        # 3. Calcular métricas generales
+    def _abusive_texts(self, clause_results: List[Dict]) -> List[str]:
+        """Cláusulas abusivas para el resumen: según el LLM o, si no intervino, según el clasificador."""
+        return [
+            c['text'] for c in clause_results
+            if c['gpt_analysis'].get('is_abusive')
+            or (not self._has_llm_verdict(c) and c['ml_analysis']['is_abusive'])
+        ]
+
+    def _build_contract_result(self, clause_results: List[Dict], summary_data: Dict, start_time: datetime,
+                               degraded_extraction: bool = False) -> Dict:
+        """
+        Calcula las métricas generales del contrato y arma la respuesta final.
+        `degraded` indica que alguna parte (extracción, validación o resumen) se resolvió sin el LLM
+        por estar su circuito abierto.
+        """
         total_clauses = len(clause_results)
         final_risk_score = 0.0
         abusive_clauses_count = 0
@@ -454,13 +1300,12 @@ class ContractMLService:
             final_risk_score = sum(c['risk_score'] for c in clause_results) / total_clauses
             abusive_clauses_count = sum(1 for c in clause_results if c['gpt_analysis'].get('is_abusive') or c['ml_analysis']['is_abusive'])
 
-        # 4. Generar resumen y recomendaciones con el LLM
-        abusive_texts = [
-            c['text'] for c in clause_results if c['gpt_analysis'].get('is_abusive')
-        ]
-        
-        summary_data = self._get_llm_summary(abusive_texts)
-        
+        # Cuántas cláusulas decidió cada camino (LLM, solo clasificador, cache)
+        analysis_paths = {}
+        for c in clause_results:
+            path = c.get('analysis_path', PATH_LLM)
+            analysis_paths[path] = analysis_paths.get(path, 0) + 1
+
         end_time = datetime.now()
         processing_time = (end_time - start_time).total_seconds()
         
@@ -470,11 +1315,254 @@ class ContractMLService:
             'risk_score': final_risk_score,
             'processing_time': processing_time,
             'clause_results': clause_results,
+            'analysis_paths': analysis_paths,
+            'degraded': degraded_extraction or PATH_DEGRADED in analysis_paths or summary_data.get('degraded', False),
             'entities': [], # TODO: Agregar entidades de todo el contrato
             'executive_summary': summary_data.get('summary', ''),
             'recommendations': summary_data.get('recommendations', '')
         }
 
+    def _analyze_extracted_clauses(self, extracted_clauses: List[Dict], max_concurrency: Optional[int] = None) -> List[Dict]:
+        """Cache, clasificador, validación LLM y entidades para una lista de cláusulas ya extraídas."""
+        # 2. Reutilizar resultados de cláusulas ya analizadas en otros contratos
+        clause_texts = [clause_data['text'] for clause_data in extracted_clauses]
+        cached_results = [self._get_cached_clause_analysis(text, extract_entities=False) for text in clause_texts]
+        pending = [i for i, cached in enumerate(cached_results) if cached is None]
+        logger.info(f"Cache de cláusulas: {len(clause_texts) - len(pending)}/{len(clause_texts)} aciertos")
+
+        # 3. Clasificar las cláusulas restantes en un solo lote, antes de cualquier llamada al LLM;
+        #    en modo cascada solo la banda incierta va al LLM
+        ml_by_index = dict(zip(pending, self._classify_clauses([clause_texts[i] for i in pending])))
+        escalated = [i for i in pending if self._cascade_path(ml_by_index[i]) == PATH_LLM]
+        if LLM_CASCADE_ENABLED:
+            logger.info(f"Modo cascada: {len(escalated)}/{len(pending)} cláusulas escaladas al LLM")
+
+        # 4. Validar las cláusulas escaladas con el LLM (en paralelo o por lotes, orden preservado)
+        escalated_texts = [clause_texts[i] for i in escalated]
+        if LLM_VALIDATION_MODE == 'batch':
+            llm_analyses = self._validate_clauses_in_batches(escalated_texts, max_workers=max_concurrency)
+        else:
+            llm_analyses = self._validate_clauses_concurrently(escalated_texts, max_workers=max_concurrency)
+        llm_by_index = dict(zip(escalated, llm_analyses))
+
+        # 5. Completar cada cláusula (entidades por lotes y resultado)
+        return self._complete_clause_results(extracted_clauses, cached_results, ml_by_index, llm_by_index)
+
+    def _complete_clause_results(self, extracted_clauses: List[Dict], cached_results: List[Optional[Dict]],
+                                 ml_by_index: Dict[int, Dict], llm_by_index: Dict[int, Dict]) -> List[Dict]:
+        """
+        Último paso común a los motores: extrae las entidades de todas las cláusulas no cacheadas
+        (y de los aciertos de cache cuyo texto no es idéntico) con una sola pasada de `nlp.pipe`
+        y arma el resultado final de cada cláusula, en orden.
+        """
+        pending = [i for i, cached in enumerate(cached_results) if cached is None or cached['entities'] is None]
+        entities = self._extract_entities_batch([extracted_clauses[i]['text'] for i in pending])
+        entities_by_index = dict(zip(pending, entities))
+
+        clause_results = []
+        for i, clause_data in enumerate(extracted_clauses):
+            analysis_result = cached_results[i]
+            if analysis_result is None:
+                analysis_result = self._compute_clause_analysis(
+                    clause_data['text'], llm_analysis=llm_by_index.get(i), ml_analysis=ml_by_index[i],
+                    entities=entities_by_index[i]
+                )
+            elif analysis_result['entities'] is None:
+                analysis_result['entities'] = entities_by_index[i]
+            clause_results.append(self._finalize_clause_result(analysis_result, clause_data, i))
+        return clause_results
+
+    def _should_stream_extraction(self, contract_text: str) -> bool:
+        # Los contratos largos ya se extraen en ventanas paralelas (ver `_split_extraction_windows`)
+        # El streaming va siempre al primario: con su circuito abierto se extrae sin streaming (con hedging)
+        primary_url = self._llm_backend_urls()[0]
+        return (LLM_EXTRACTION_STREAMING and not llm_client.circuit_breakers.for_url(primary_url).is_open()
+                and len(self._split_extraction_windows(contract_text)) == 1)
+
+    def _stream_extract_clauses(self, contract_text: str):
+        """
+        Extrae cláusulas con el LLM en streaming y las va devolviendo (generador) en cuanto cada
+        objeto del array "clauses" está completo. La respuesta completa se guarda en `llm_cache`.
+        """
+        prompt, system_message = self._build_extraction_prompt(contract_text)
+        base_url, headers, data, cache_key = self._build_llm_request(prompt, system_message, 1024)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            record_llm_call(STAGE_EXTRACTION, data['model'], cached=True)
+            yield from self._clauses_from_analysis(cached)
+            return
+
+        logger.info("Iniciando extracción de cláusulas con LLM en streaming")
+        parser = IncrementalArrayParser('clauses')
+        start, stats = time.monotonic(), {}
+        for chunk in llm_client.stream_chat_completion(base_url, headers, data, stats=stats):
+            yield from parser.feed(chunk)
+        self._record_llm_usage(STAGE_EXTRACTION, data, start, stats, completion_text=parser.text)
+
+        try:
+            llm_cache.set(cache_key, json.loads(parser.text), namespace=data['model'])
+        except ValueError:
+            logger.warning("La respuesta en streaming no es un JSON completo; no se guarda en cache")
+
+    @staticmethod
+    def _unstreamed_remainder(contract_text: str, clauses: List[Dict]) -> str:
+        """Texto posterior a la última cláusula recibida del stream; el contrato entero si no se localiza."""
+        if clauses:
+            last_text = clauses[-1]['text']
+            position = contract_text.find(last_text)
+            if position >= 0:
+                return contract_text[position + len(last_text):]
+        return contract_text
+
+    def _analyze_with_streaming_extraction(self, contract_text: str,
+                                           max_concurrency: Optional[int] = None) -> Tuple[List[Dict], bool]:
+        """
+        Superpone extracción y validación: cada cláusula que llega del stream se busca en la cache,
+        se clasifica y, si corresponde, su validación LLM se lanza de inmediato en el pool mientras
+        el LLM sigue generando las siguientes. Las entidades se extraen al final, por lotes, en el hilo principal.
+        Si el streaming falla a mitad, las cláusulas ya recibidas (y sus validaciones en curso) se
+        conservan y solo se extrae sin streaming el texto que queda después de la última. El segundo
+        valor devuelto indica si ese resto se segmentó por reglas porque el LLM no estaba disponible
+        (circuito abierto), como `degraded_extraction` en `_analyze_contract`; si el LLM lo extrae, no.
+        """
+        max_workers = max(1, max_concurrency or LLM_MAX_CONCURRENCY)
+        clauses, cached_results, ml_results, futures = [], [], [], []
+        validate = run_in_context(self._validate_clause_with_llm)
+        degraded = False
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-stream') as executor:
+            def accept(clause_data):
+                if not isinstance(clause_data, dict) or not clause_data.get('text'):
+                    return
+                text = clause_data['text']
+                cached = self._get_cached_clause_analysis(text, extract_entities=False)
+                ml_analysis, future = None, None
+                if cached is None:
+                    ml_analysis = self._classify_clause(text)
+                    if self._cascade_path(ml_analysis) == PATH_LLM:
+                        future = executor.submit(validate, text)
+                clauses.append(clause_data)
+                cached_results.append(cached)
+                ml_results.append(ml_analysis)
+                futures.append(future)
+
+            try:
+                for clause_data in self._stream_extract_clauses(contract_text):
+                    accept(clause_data)
+            except Exception:
+                remainder = self._unstreamed_remainder(contract_text, clauses)
+                logger.exception(f"Falló la extracción en streaming tras {len(clauses)} cláusulas; "
+                                 f"se extraen sin streaming los {len(remainder)} caracteres restantes.")
+                if remainder.strip():
+                    degraded = not self._llm_available()
+                    received = {clause_data['text'] for clause_data in clauses}
+                    for clause_data in self._extract_clauses_with_llm(remainder):
+                        if isinstance(clause_data, dict) and clause_data.get('text') not in received:
+                            accept(clause_data)
+
+            ml_by_index = {i: ml for i, ml in enumerate(ml_results) if ml is not None}
+            llm_by_index = {i: future.result() for i, future in enumerate(futures) if future is not None}
+        return self._complete_clause_results(clauses, cached_results, ml_by_index, llm_by_index), degraded
+
+    def analyze_contract(self, contract_text: str, max_concurrency: Optional[int] = None) -> Dict:
+        """
+        Orquesta el análisis completo de un contrato. Mejoras: risk_score híbrido ML+LLM y mayor cobertura de extracción.
+        `max_concurrency` limita las validaciones LLM simultáneas (por defecto `LLM_MAX_CONCURRENCY`).
+        El resultado incluye `llm_usage`: tokens, latencia, reintentos y coste de las llamadas al LLM por etapa.
+        """
+        with track_llm_usage() as usage:
+            result = self._analyze_contract(contract_text, max_concurrency)
+        result['llm_usage'] = usage.summary()
+        return result
+
+    def _analyze_contract(self, contract_text: str, max_concurrency: Optional[int] = None) -> Dict:
+        self._ensure_loaded()
+        self._refresh_model_if_changed()
+        start_time = datetime.now()
+        
+        # 1. Extraer cláusulas: segmentador local y, si no es fiable, el LLM (prompt mejorado)
+        extracted_clauses = self._segment_locally(contract_text)
+        degraded_extraction = extracted_clauses is None and not self._llm_available()
+        if extracted_clauses is None and self._should_stream_extraction(contract_text):
+            # Pasos 1-5 superpuestos: validación de cada cláusula mientras se extraen las demás
+            clause_results, stream_degraded = self._analyze_with_streaming_extraction(contract_text, max_concurrency)
+            degraded_extraction = degraded_extraction or stream_degraded
+        else:
+            if extracted_clauses is None:
+                extracted_clauses = self._extract_clauses_with_llm(contract_text)
+            # Pasos 2-5: cache, clasificador, LLM y entidades
+            clause_results = self._analyze_extracted_clauses(extracted_clauses, max_concurrency)
+
+        if not clause_results:
+            return self._empty_contract_result(start_time, degraded_extraction)
+
+        # 6. Generar resumen y recomendaciones con el LLM
+        summary_data = self._get_llm_summary(self._abusive_texts(clause_results))
+
+        # 7. Calcular métricas generales
+        return self._build_contract_result(clause_results, summary_data, start_time, degraded_extraction)
+
+    async def aanalyze_contract(self, contract_text: str, max_concurrency: Optional[int] = None) -> Dict:
+        """
+        Versión asyncio de `analyze_contract`: la E/S con el LLM usa `async_llm_client` y los pasos
+        de CPU (clasificador, spaCy, cache de cláusulas) se ejecutan en el executor por defecto.
+        Las validaciones se lanzan a la vez, limitadas por un semáforo de `max_concurrency`,
+        de modo que un solo event loop puede atender varios análisis simultáneos.
+        Siempre valida cláusula por cláusula (el modo por lotes solo aplica a la versión síncrona).
+        """
+        with track_llm_usage() as usage:
+            result = await self._aanalyze_contract(contract_text, max_concurrency)
+        result['llm_usage'] = usage.summary()
+        return result
+
+    async def _aanalyze_contract(self, contract_text: str, max_concurrency: Optional[int] = None) -> Dict:
+        if not self._models_ready:
+            await asyncio.to_thread(self._ensure_loaded)
+        await asyncio.to_thread(self._refresh_model_if_changed)
+        start_time = datetime.now()
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or LLM_MAX_CONCURRENCY))
+
+        # 1. Extraer cláusulas (segmentador local o LLM)
+        extracted_clauses = self._segment_locally(contract_text)
+        degraded_extraction = extracted_clauses is None and not self._llm_available()
+        if extracted_clauses is None:
+            extracted_clauses = await self._aextract_clauses_with_llm(contract_text)
+        if not extracted_clauses:
+            return self._empty_contract_result(start_time, degraded_extraction)
+
+        # 2. Cache de cláusulas (lecturas SQLite, así que va al executor; las entidades se extraen en el paso 5)
+        clause_texts = [clause_data['text'] for clause_data in extracted_clauses]
+        cached_results = await asyncio.to_thread(
+            lambda: [self._get_cached_clause_analysis(text, extract_entities=False) for text in clause_texts]
+        )
+        # 3. Clasificador (CPU) en un solo lote para todas las cláusulas pendientes, antes de llamar al LLM
+        pending = [i for i, cached in enumerate(cached_results) if cached is None]
+        ml_results = await asyncio.to_thread(self._classify_clauses, [clause_texts[i] for i in pending])
+        ml_by_index = dict(zip(pending, ml_results))
+
+        # 4. Validación con el LLM (en modo cascada solo la banda incierta), con límite de llamadas en vuelo
+        escalated = [i for i in pending if self._cascade_path(ml_by_index[i]) == PATH_LLM]
+
+        async def validate_one(index: int) -> Dict:
+            async with semaphore:
+                return await self._avalidate_clause_with_llm(clause_texts[index])
+
+        # `gather` conserva el orden de las cláusulas
+        llm_analyses = await asyncio.gather(*(validate_one(i) for i in escalated))
+        llm_by_index = dict(zip(escalated, llm_analyses))
+
+        # 5. Entidades por lotes y resultado de cada cláusula (CPU)
+        clause_results = await asyncio.to_thread(
+            self._complete_clause_results, extracted_clauses, cached_results, ml_by_index, llm_by_index
+        )
+
+        # 6. Resumen y recomendaciones
+        async with semaphore:
+            summary_data = await self._aget_llm_summary(self._abusive_texts(clause_results))
+
+        # 7. Métricas generales
+        return self._build_contract_result(clause_results, summary_data, start_time, degraded_extraction)
+
     def _extract_clauses(self, text: str) -> List[str]:
         """
         (MÉTODO ANTIGUO - CONSERVADO COMO REFERENCIA)
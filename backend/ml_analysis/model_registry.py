@@ -0,0 +1,323 @@
+import os
+import re
+import json
+import fcntl
+import shutil
+import hashlib
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from decouple import config
+
+logger = logging.getLogger('ml_analysis')
+
+MANIFEST_NAME = 'registry.json'
+LOCK_NAME = 'registry.lock'
+ARTIFACT_PREFIX = 'modelo_clausulas_'
+ARTIFACT_SUFFIX = '.joblib'
+BUNDLE_SUFFIX = '.bundle'
+# Servir con el paquete compacto (booster nativo + arrays, ver `compact_scorer`) cuando exista.
+# Desactivado por defecto: el Pipeline sigue siendo la referencia hasta activarlo explícitamente
+COMPACT_SCORER_ENABLED = config('ML_COMPACT_SCORER', default=False, cast=bool)
+# Diferencia máxima de probabilidad tolerada entre el paquete y el Pipeline al exportarlo
+COMPACT_PARITY_TOLERANCE = config('ML_COMPACT_PARITY_TOLERANCE', default=1e-6, cast=float)
+_LEGACY_ARTIFACT = re.compile(rf'^{ARTIFACT_PREFIX}(.+){re.escape(ARTIFACT_SUFFIX)}$')
+
+
+class ModelRegistryError(Exception):
+    """Error del registro de modelos (versión inexistente, checksum incorrecto, etc.)."""
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Registro de versiones del clasificador de cláusulas en `ML_MODELS_PATH`.
+
+    `registry.json` guarda, por versión, el artefacto, su checksum SHA-256, el hash del dataset,
+    las métricas y la configuración de features, más un puntero `active` a la versión en uso.
+    El manifiesto se reescribe de forma atómica (archivo temporal + `os.replace`) bajo un `flock`,
+    así que varios procesos pueden leerlo mientras otro registra o activa una versión; los
+    workers detectan el cambio comparando el mtime del manifiesto (ver `manifest_mtime`).
+    """
+
+    def __init__(self, models_path: Optional[str], keep: int = 5):
+        self.models_path = str(models_path) if models_path else None
+        self.keep = keep
+
+    @property
+    def manifest_path(self) -> Optional[str]:
+        return os.path.join(self.models_path, MANIFEST_NAME) if self.models_path else None
+
+    def artifact_path(self, version: str) -> str:
+        return os.path.join(self.models_path, f'{ARTIFACT_PREFIX}{version}{ARTIFACT_SUFFIX}')
+
+    def bundle_path(self, version: str) -> str:
+        return os.path.join(self.models_path, f'{ARTIFACT_PREFIX}{version}{BUNDLE_SUFFIX}')
+
+    # --- Manifiesto ---
+
+    @contextmanager
+    def _locked(self):
+        """Exclusión entre procesos para las escrituras del manifiesto."""
+        os.makedirs(self.models_path, exist_ok=True)
+        with open(os.path.join(self.models_path, LOCK_NAME), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'active': None, 'models': {}}
+
+    def _write(self, manifest: Dict):
+        tmp_path = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def manifest_mtime(self) -> Optional[int]:
+        """mtime del manifiesto: un `stat` barato para detectar activaciones desde otros procesos."""
+        if not self.models_path:
+            return None
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _adopt_legacy_artifacts(self, manifest: Dict) -> bool:
+        """Registra los `modelo_clausulas_*.joblib` anteriores al manifiesto; activa el más reciente."""
+        versions = sorted(
+            match.group(1) for match in map(_LEGACY_ARTIFACT.match, os.listdir(self.models_path)) if match
+        )
+        adopted = False
+        for version in versions:
+            if version in manifest['models']:
+                continue
+            path = self.artifact_path(version)
+            manifest['models'][version] = {
+                'file': os.path.basename(path),
+                'sha256': file_sha256(path),
+                'created_at': datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+                'dataset_hash': None,
+                'metrics': {},
+                'feature_config': {},
+                'source': 'legacy',
+            }
+            adopted = True
+        if adopted and not manifest.get('active'):
+            manifest['active'] = versions[-1]
+        return adopted
+
+    def manifest(self) -> Dict:
+        """Manifiesto actual; la primera vez adopta los artefactos sueltos existentes."""
+        if not self.models_path or not os.path.isdir(self.models_path):
+            return {'active': None, 'models': {}}
+        if os.path.exists(self.manifest_path):
+            return self._read()
+        with self._locked():
+            manifest = self._read()
+            if self._adopt_legacy_artifacts(manifest):
+                self._write(manifest)
+                logger.info(f"Registro de modelos creado con {len(manifest['models'])} artefactos existentes")
+            return manifest
+
+    # --- Consultas ---
+
+    def list_versions(self) -> List[Tuple[str, Dict]]:
+        return sorted(self.manifest()['models'].items())
+
+    def active_version(self) -> Optional[str]:
+        return self.manifest().get('active')
+
+    def get(self, version: str) -> Dict:
+        entry = self.manifest()['models'].get(version)
+        if entry is None:
+            raise ModelRegistryError(f"Versión de modelo no registrada: {version}")
+        return entry
+
+    def load(self, version: str, compact: Optional[bool] = None) -> Any:
+        """
+        Carga el clasificador de `version` verificando antes el checksum del artefacto. Si la
+        versión tiene paquete compacto (y `ML_COMPACT_SCORER` está activo) devuelve un
+        `CompactClauseScorer`, tras verificar el checksum de cada archivo del paquete; si no,
+        el Pipeline, con sus arrays mapeados en memoria (`ML_ARTIFACTS_MMAP`) y compartidos
+        entre workers.
+        """
+        from .shared_artifacts import load_joblib
+
+        entry = self.get(version)
+        compact = COMPACT_SCORER_ENABLED if compact is None else compact
+        if compact and entry.get('bundle'):
+            from .compact_scorer import CompactClauseScorer
+
+            bundle_dir = os.path.join(self.models_path, entry['bundle'])
+            if entry.get('bundle_files'):
+                for name, checksum in entry['bundle_files'].items():
+                    if file_sha256(os.path.join(bundle_dir, name)) != checksum:
+                        raise ModelRegistryError(
+                            f"Checksum incorrecto para {name} del paquete compacto {version} ({entry['bundle']})"
+                        )
+                return CompactClauseScorer(bundle_dir)
+            # Paquetes anteriores solo tenían el checksum del booster: se regeneran con "export-bundle"
+            logger.warning(f"El paquete compacto de {version} no tiene checksums de todos sus archivos; "
+                           f"se usa el Pipeline (regenérelo con 'model_registry export-bundle {version}')")
+
+        path = os.path.join(self.models_path, entry['file'])
+        if file_sha256(path) != entry['sha256']:
+            raise ModelRegistryError(f"Checksum incorrecto para el modelo {version} ({entry['file']})")
+        return load_joblib(path)
+
+    # --- Escrituras ---
+
+    def register(self, pipeline: Any, dataset_hash: Optional[str] = None, metrics: Optional[Dict] = None,
+                 feature_config: Optional[Dict] = None, activate: bool = True, source: str = 'train_model') -> str:
+        """Guarda el pipeline como nueva versión (y opcionalmente la activa). Devuelve la versión."""
+        import joblib
+
+        os.makedirs(self.models_path, exist_ok=True)
+        version = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        path = self.artifact_path(version)
+        tmp_path = f'{path}.tmp'
+        # Sin compresión: es lo que permite cargarlo después con mmap
+        joblib.dump(pipeline, tmp_path, compress=0)
+        os.replace(tmp_path, path)
+        bundle = self._export_bundle(pipeline, version)
+
+        with self._locked():
+            manifest = self._read()
+            self._adopt_legacy_artifacts(manifest)
+            manifest['models'][version] = {
+                'file': os.path.basename(path),
+                'sha256': file_sha256(path),
+                'created_at': datetime.now().isoformat(),
+                'dataset_hash': dataset_hash,
+                'metrics': metrics or {},
+                'feature_config': feature_config or {},
+                'source': source,
+                **bundle,
+            }
+            if activate or not manifest.get('active'):
+                manifest['active'] = version
+            self._write(manifest)
+        logger.info(f"Modelo {version} registrado{' y activado' if manifest['active'] == version else ''}")
+        return version
+
+    def _export_bundle(self, pipeline: Any, version: str) -> Dict:
+        """
+        Exporta el paquete compacto de `version` y lo compara con el Pipeline: si alguna
+        probabilidad difiere más de `ML_COMPACT_PARITY_TOLERANCE` el paquete se descarta.
+        Devuelve los campos del manifiesto (o {} si falla).
+        """
+        from .compact_scorer import BUNDLE_FILES, export_bundle, parity_max_diff
+
+        bundle_dir = self.bundle_path(version)
+        tmp_dir = f'{bundle_dir}.tmp'
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            export_bundle(pipeline, tmp_dir)
+            max_diff = parity_max_diff(pipeline, tmp_dir)
+            if not max_diff <= COMPACT_PARITY_TOLERANCE:
+                raise ValueError(f"difiere del Pipeline en {max_diff:.3g} (tolerancia {COMPACT_PARITY_TOLERANCE:g})")
+            shutil.rmtree(bundle_dir, ignore_errors=True)
+            os.rename(tmp_dir, bundle_dir)
+        except Exception as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            logger.warning(f"No se pudo exportar el paquete compacto del modelo {version}: {e}")
+            return {}
+        return {
+            'bundle': os.path.basename(bundle_dir),
+            'bundle_files': {name: file_sha256(os.path.join(bundle_dir, name)) for name in BUNDLE_FILES},
+            'bundle_parity_max_diff': max_diff,
+        }
+
+    def export_bundle(self, version: str) -> bool:
+        """Genera el paquete compacto de una versión ya registrada (p. ej. un modelo heredado)."""
+        pipeline = self.load(version, compact=False)
+        bundle = self._export_bundle(pipeline, version)
+        if not bundle:
+            return False
+        with self._locked():
+            manifest = self._read()
+            if version not in manifest['models']:
+                raise ModelRegistryError(f"Versión de modelo no registrada: {version}")
+            manifest['models'][version].update(bundle)
+            self._write(manifest)
+        return True
+
+    def activate(self, version: str):
+        """Cambia el puntero de versión activa; los workers lo recogen sin reiniciar."""
+        with self._locked():
+            manifest = self._read()
+            self._adopt_legacy_artifacts(manifest)
+            if version not in manifest['models']:
+                raise ModelRegistryError(f"Versión de modelo no registrada: {version}")
+            manifest['active'] = version
+            self._write(manifest)
+        logger.info(f"Modelo {version} activado")
+
+    def set_pinned(self, version: str, pinned: bool = True):
+        """Marca una versión para que la recolección de basura no la elimine."""
+        with self._locked():
+            manifest = self._read()
+            if version not in manifest['models']:
+                raise ModelRegistryError(f"Versión de modelo no registrada: {version}")
+            manifest['models'][version]['pinned'] = pinned
+            self._write(manifest)
+
+    def collect_garbage(self, keep: Optional[int] = None, dry_run: bool = False) -> List[str]:
+        """
+        Elimina los artefactos de versiones antiguas: conserva la activa, las fijadas
+        (`pinned`, p. ej. las usadas en `ML_MODEL_VERSION`) y las `keep` más recientes.
+        """
+        keep = self.keep if keep is None else keep
+        with self._locked():
+            manifest = self._read()
+            self._adopt_legacy_artifacts(manifest)
+            versions = sorted(manifest['models'])
+            retained = set(versions[-keep:] if keep > 0 else [])
+            retained.add(manifest.get('active'))
+            retained.update(v for v, entry in manifest['models'].items() if entry.get('pinned'))
+            removed = [v for v in versions if v not in retained]
+            if dry_run:
+                return removed
+            for version in removed:
+                entry = manifest['models'].pop(version)
+                try:
+                    os.remove(os.path.join(self.models_path, entry['file']))
+                except FileNotFoundError:
+                    pass
+                if entry.get('bundle'):
+                    shutil.rmtree(os.path.join(self.models_path, entry['bundle']), ignore_errors=True)
+            if removed:
+                self._write(manifest)
+        if removed:
+            logger.info(f"Eliminados {len(removed)} modelos antiguos del registro")
+        return removed
+
+
+def _default_models_path() -> Optional[str]:
+    from django.conf import settings
+    return getattr(settings, 'ML_MODELS_PATH', None)
+
+
+# Registro compartido por el proceso
+model_registry = ModelRegistry(
+    _default_models_path(),
+    keep=config('ML_MODEL_REGISTRY_KEEP', default=5, cast=int),
+)
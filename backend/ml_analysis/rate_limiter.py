@@ -0,0 +1,378 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from decouple import config
+
+logger = logging.getLogger('ml_analysis')
+
+
+def _refill_and_take(tokens: float, rate: float, updated_at: float, now: float, burst: float) -> Tuple[float, float]:
+    """Recarga el bucket según el tiempo transcurrido e intenta consumir un token. Devuelve (tokens, espera)."""
+    tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryTokenBucket:
+    """Token bucket en memoria: solo coordina los hilos de un proceso (desarrollo y pruebas)."""
+
+    def __init__(self, rate: float = 10.0, burst: float = 10.0, min_rate: float = 0.2, max_rate: Optional[float] = None):
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate
+        self._rate = rate
+        self._tokens = burst
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        with self._lock:
+            now = time.time()
+            self._tokens, wait = _refill_and_take(self._tokens, self._rate, self._updated_at, now, self.burst)
+            self._updated_at = now
+            return wait
+
+    def adjust_rate(self, multiply: float = 1.0, add: float = 0.0) -> float:
+        with self._lock:
+            self._rate = max(self.min_rate, min(self.max_rate, self._rate * multiply + add))
+            return self._rate
+
+    def get_rate(self) -> float:
+        return self._rate
+
+
+class SQLiteTokenBucket(MemoryTokenBucket):
+    """
+    Token bucket compartido entre procesos (workers de gunicorn, Celery) mediante una fila SQLite.
+    Cada operación es una transacción `BEGIN IMMEDIATE`, así que el bloqueo de escritura de SQLite
+    serializa a todos los workers de la máquina. La tasa actual también vive en la fila, de modo
+    que el ajuste AIMD que hace un worker lo aplican todos.
+    """
+
+    def __init__(self, db_path: str, name: str = 'llm', **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self.name = name
+        self._db_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # El directorio se crea antes de conectar: sqlite3 no crea directorios intermedios
+        if not self._db_ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        if not self._db_ready:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS token_bucket ('
+                ' name TEXT PRIMARY KEY,'
+                ' tokens REAL NOT NULL,'
+                ' rate REAL NOT NULL,'
+                ' updated_at REAL NOT NULL)'
+            )
+            self._db_ready = True
+        return conn
+
+    def _load(self, conn: sqlite3.Connection, now: float) -> Tuple[float, float, float]:
+        row = conn.execute('SELECT tokens, rate, updated_at FROM token_bucket WHERE name = ?', (self.name,)).fetchone()
+        if row is None:
+            conn.execute('INSERT INTO token_bucket (name, tokens, rate, updated_at) VALUES (?, ?, ?, ?)',
+                         (self.name, self.burst, self._rate, now))
+            return self.burst, self._rate, now
+        return row
+
+    def take(self) -> float:
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            tokens, rate, updated_at = self._load(conn, now)
+            tokens, wait = _refill_and_take(tokens, rate, updated_at, now, self.burst)
+            conn.execute('UPDATE token_bucket SET tokens = ?, updated_at = ? WHERE name = ?', (tokens, now, self.name))
+            conn.execute('COMMIT')
+            self._rate = rate
+            return wait
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def adjust_rate(self, multiply: float = 1.0, add: float = 0.0) -> float:
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            _, rate, _ = self._load(conn, time.time())
+            rate = max(self.min_rate, min(self.max_rate, rate * multiply + add))
+            conn.execute('UPDATE token_bucket SET rate = ? WHERE name = ?', (rate, self.name))
+            conn.execute('COMMIT')
+            self._rate = rate
+            return rate
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+_REDIS_TAKE = """
+local now, burst, default_rate = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'rate', 'updated_at')
+local rate = tonumber(data[2]) or default_rate
+local tokens = math.min(burst, (tonumber(data[1]) or burst) + math.max(0, now - (tonumber(data[3]) or now)) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'rate', rate, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], 86400)
+return {tostring(wait), tostring(rate)}
+"""
+
+_REDIS_ADJUST = """
+local multiply, add = tonumber(ARGV[1]), tonumber(ARGV[2])
+local min_rate, max_rate, default_rate = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or default_rate
+rate = math.max(min_rate, math.min(max_rate, rate * multiply + add))
+redis.call('HSET', KEYS[1], 'rate', rate)
+return tostring(rate)
+"""
+
+
+class RedisTokenBucket(MemoryTokenBucket):
+    """Token bucket compartido entre máquinas sobre Redis (scripts Lua atómicos)."""
+
+    def __init__(self, url: str, name: str = 'llm', **kwargs):
+        super().__init__(**kwargs)
+        import redis  # dependencia opcional: solo si se configura LLM_RATE_LIMIT_REDIS_URL
+        self.key = f'ml_analysis:token_bucket:{name}'
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(_REDIS_TAKE)
+        self._adjust = self._redis.register_script(_REDIS_ADJUST)
+
+    def take(self) -> float:
+        wait, rate = self._take(keys=[self.key], args=[time.time(), self.burst, self._rate])
+        self._rate = float(rate)
+        return float(wait)
+
+    def adjust_rate(self, multiply: float = 1.0, add: float = 0.0) -> float:
+        rate = self._adjust(keys=[self.key], args=[multiply, add, self.min_rate, self.max_rate, self._rate])
+        self._rate = float(rate)
+        return self._rate
+
+
+class LLMRateLimiter:
+    """
+    Limitador de las llamadas al LLM con dos controles:
+
+      1. Token bucket compartido (SQLite entre procesos de la máquina o Redis entre máquinas):
+         limita las peticiones por segundo de todo el despliegue.
+      2. Límite de concurrencia por proceso con AIMD: crece de forma aditiva mientras las
+         respuestas llegan bien y rápido, y se reduce multiplicativamente ante un 429 o cuando
+         la latencia supera `target_latency`. Un 429 reduce también la tasa compartida.
+
+    Si el backend compartido falla, el limitador deja pasar la petición (fail-open) y lo registra.
+    El aumento aditivo de la tasa compartida se aplica como mucho una vez cada
+    `rate_increase_interval` segundos por proceso, no en cada respuesta correcta: así no se
+    escribe en el backend compartido en cada petición.
+    Las variantes asyncio (`aacquire`, `arelease`) ejecutan las operaciones sobre el bucket en un
+    hilo (`asyncio.to_thread`) para no bloquear el event loop con SQLite o Redis.
+    """
+
+    def __init__(self, bucket=None, max_concurrency: int = 16, min_concurrency: int = 1,
+                 target_latency: float = 20.0, decrease_factor: float = 0.5,
+                 latency_decrease_factor: float = 0.9, rate_increase: float = 0.05,
+                 rate_increase_interval: float = 1.0, enabled: bool = True):
+        self.bucket = bucket or MemoryTokenBucket()
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.latency_decrease_factor = latency_decrease_factor
+        self.rate_increase = rate_increase
+        self.rate_increase_interval = rate_increase_interval
+        self.enabled = enabled
+
+        self.concurrency_limit = float(max_concurrency)
+        self._in_flight = 0
+        self._last_rate_increase = 0.0
+        self._cond = threading.Condition()
+        self._waits = deque(maxlen=1000)
+        self.stats = {'acquired': 0, 'delayed': 0, 'wait_total': 0.0, 'rate_limit_backoffs': 0,
+                      'latency_backoffs': 0, 'backend_errors': 0}
+
+    # --- Adquisición ---
+
+    def _try_enter(self) -> bool:
+        with self._cond:
+            if self._in_flight < max(self.min_concurrency, int(self.concurrency_limit)):
+                self._in_flight += 1
+                return True
+            return False
+
+    def _take_token(self) -> float:
+        try:
+            return self.bucket.take()
+        except Exception as e:
+            with self._cond:
+                self.stats['backend_errors'] += 1
+            logger.warning(f"Limitador LLM no disponible ({type(e).__name__}: {e}); se deja pasar la petición")
+            return 0.0
+
+    def acquire(self) -> float:
+        """Bloquea hasta tener hueco de concurrencia y un token. Devuelve los segundos esperados."""
+        if not self.enabled:
+            return 0.0
+        start = time.monotonic()
+        with self._cond:
+            while self._in_flight >= max(self.min_concurrency, int(self.concurrency_limit)):
+                self._cond.wait(timeout=0.5)
+            self._in_flight += 1
+        try:
+            wait = self._take_token()
+            while wait > 0:
+                time.sleep(min(wait, 1.0))
+                wait = self._take_token()
+        except BaseException:
+            self._leave()
+            raise
+        return self._record_wait(time.monotonic() - start)
+
+    async def aacquire(self) -> float:
+        """Variante asyncio de `acquire` (espera con `asyncio.sleep` en lugar de bloquear el loop)."""
+        if not self.enabled:
+            return 0.0
+        start = time.monotonic()
+        while not self._try_enter():
+            await asyncio.sleep(0.05)
+        try:
+            wait = await asyncio.to_thread(self._take_token)
+            while wait > 0:
+                await asyncio.sleep(min(wait, 1.0))
+                wait = await asyncio.to_thread(self._take_token)
+        except BaseException:
+            self._leave()
+            raise
+        return self._record_wait(time.monotonic() - start)
+
+    def _leave(self):
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._cond.notify()
+
+    def release(self, status_code: Optional[int] = None, latency: Optional[float] = None):
+        """Libera el hueco de concurrencia y ajusta los límites según el resultado de la petición."""
+        if not self.enabled:
+            return
+        self._leave()
+        try:
+            self._adapt(status_code, latency)
+        except Exception as e:
+            logger.warning(f"No se pudo ajustar la tasa del limitador LLM: {e}")
+
+    async def arelease(self, status_code: Optional[int] = None, latency: Optional[float] = None):
+        """Variante asyncio de `release`: el hueco se libera al momento y el ajuste va a un hilo."""
+        if not self.enabled:
+            return
+        self._leave()
+        try:
+            await asyncio.to_thread(self._adapt, status_code, latency)
+        except Exception as e:
+            logger.warning(f"No se pudo ajustar la tasa del limitador LLM: {e}")
+
+    # --- AIMD ---
+
+    def _adapt(self, status_code: Optional[int], latency: Optional[float]):
+        if status_code == 429:
+            with self._cond:
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * self.decrease_factor)
+                self.stats['rate_limit_backoffs'] += 1
+            rate = self.bucket.adjust_rate(multiply=self.decrease_factor)
+            logger.warning(f"429 del proveedor LLM: concurrencia {self.concurrency_limit:.1f}, tasa {rate:.2f} req/s")
+        elif latency is not None and latency > self.target_latency:
+            with self._cond:
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * self.latency_decrease_factor)
+                self.stats['latency_backoffs'] += 1
+        elif status_code is not None and status_code < 400:
+            with self._cond:
+                # Incremento aditivo de ~1 hueco por "ventana" completa de respuestas correctas
+                self.concurrency_limit = min(self.max_concurrency,
+                                             self.concurrency_limit + 1.0 / max(self.concurrency_limit, 1.0))
+                self._cond.notify()
+                now = time.monotonic()
+                increase_rate = (now - self._last_rate_increase >= self.rate_increase_interval
+                                 and self.bucket.get_rate() < self.bucket.max_rate)
+                if increase_rate:
+                    self._last_rate_increase = now
+            if increase_rate:
+                self.bucket.adjust_rate(add=self.rate_increase)
+
+    # --- Métricas ---
+
+    def _record_wait(self, waited: float) -> float:
+        with self._cond:
+            self.stats['acquired'] += 1
+            self.stats['wait_total'] += waited
+            if waited > 0.001:
+                self.stats['delayed'] += 1
+            self._waits.append(waited)
+        return waited
+
+    def get_metrics(self) -> Dict:
+        """Esperas en el limitador (segundos), límite de concurrencia actual y tasa compartida."""
+        with self._cond:
+            metrics = dict(self.stats)
+            metrics['concurrency_limit'] = round(self.concurrency_limit, 2)
+            metrics['in_flight'] = self._in_flight
+            waits = sorted(self._waits)
+        metrics['rate'] = self.bucket.get_rate()
+        if waits:
+            metrics.update({
+                'wait_p50': waits[min(len(waits) - 1, int(0.50 * len(waits)))],
+                'wait_p95': waits[min(len(waits) - 1, int(0.95 * len(waits)))],
+                'wait_max': waits[-1],
+            })
+        return metrics
+
+
+def _default_db_path() -> Optional[str]:
+    from django.conf import settings
+    models_path = getattr(settings, 'ML_MODELS_PATH', None)
+    if not models_path:
+        return None
+    return os.path.join(models_path, 'llm_rate_limit.sqlite3')
+
+
+def _build_bucket():
+    bucket_settings = dict(
+        rate=config('LLM_RATE_LIMIT_RPS', default=10.0, cast=float),
+        burst=config('LLM_RATE_LIMIT_BURST', default=10.0, cast=float),
+        min_rate=config('LLM_RATE_LIMIT_MIN_RPS', default=0.2, cast=float),
+    )
+    redis_url = config('LLM_RATE_LIMIT_REDIS_URL', default='')
+    if redis_url:
+        try:
+            return RedisTokenBucket(redis_url, **bucket_settings)
+        except ImportError:
+            logger.warning("LLM_RATE_LIMIT_REDIS_URL configurado pero el paquete redis no está instalado; se usa SQLite")
+    db_path = config('LLM_RATE_LIMIT_PATH', default=None) or _default_db_path()
+    if db_path:
+        return SQLiteTokenBucket(db_path, **bucket_settings)
+    return MemoryTokenBucket(**bucket_settings)
+
+
+# Instancia compartida por el proceso (los clientes LLM síncrono y asíncrono pasan por ella)
+llm_rate_limiter = LLMRateLimiter(
+    bucket=_build_bucket(),
+    max_concurrency=config('LLM_RATE_LIMIT_MAX_CONCURRENCY', default=16, cast=int),
+    min_concurrency=config('LLM_RATE_LIMIT_MIN_CONCURRENCY', default=1, cast=int),
+    target_latency=config('LLM_RATE_LIMIT_TARGET_LATENCY', default=20.0, cast=float),
+    rate_increase_interval=config('LLM_RATE_LIMIT_INCREASE_INTERVAL', default=1.0, cast=float),
+    enabled=config('LLM_RATE_LIMIT_ENABLED', default=True, cast=bool),
+)
@@ -0,0 +1,182 @@
+import re
+import time
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger('ml_analysis')
+
+
+_ORDINALS = [
+    'PRIMERO', 'SEGUNDO', 'TERCERO', 'CUARTO', 'QUINTO', 'SEXTO', 'SEPTIMO', 'OCTAVO', 'NOVENO', 'DECIMO',
+    'UNDECIMO', 'DUODECIMO',
+]
+# Valor numérico de cada ordinal (sin tildes, forma masculina), para validar la secuencia
+ORDINAL_VALUES = {name: i + 1 for i, name in enumerate(_ORDINALS)}
+ORDINAL_VALUES.update({'DECIMO PRIMERO': 11, 'DECIMO SEGUNDO': 12, 'DECIMO TERCERO': 13, 'DECIMO CUARTO': 14,
+                       'DECIMO QUINTO': 15, 'DECIMO SEXTO': 16, 'DECIMO SEPTIMO': 17, 'DECIMO OCTAVO': 18,
+                       'DECIMO NOVENO': 19, 'VIGESIMO': 20})
+
+_ORDINAL_WORD = (
+    r'(?:D[EÉ]CIM[OA]\s*[-\s]?\s*(?:PRIMER[OA]?|SEGUND[OA]|TERCER[OA]|CUART[OA]|QUINT[OA]|SEXT[OA]|S[EÉ]PTIM[OA]|OCTAV[OA]|NOVEN[OA])'
+    r'|PRIMER[OA]|SEGUND[OA]|TERCER[OA]|CUART[OA]|QUINT[OA]|SEXT[OA]|S[EÉ]PTIM[OA]|OCTAV[OA]|NOVEN[OA]'
+    r'|D[EÉ]CIM[OA]|UND[EÉ]CIM[OA]|DUOD[EÉ]CIM[OA]|VIG[EÉ]SIM[OA])'
+)
+
+# Encabezados estructurales: deben abrir una línea (o seguir a un punto) y terminar en puntuación
+STRUCTURAL_HEADING = re.compile(
+    r'(?:^|(?<=[.;:]\s))[ \t]*'
+    r'(?P<heading>'
+    r'(?P<ordinal>' + _ORDINAL_WORD + r')'
+    r'|(?P<article>(?:ART[IÍ]CULO|ART\.|CL[AÁ]USULA)\s+(?:\d+|[IVXLC]+|' + _ORDINAL_WORD + r'))'
+    r'|(?P<recital>POR\s+CUANTO|POR\s+TANTO|CONSIDERANDO)'
+    r')\s*(?:\([^)]{0,40}\))?\s*[:.\-–—]+',
+    re.MULTILINE
+)
+# Listas numeradas ("1.", "2)", "3 -") al inicio de línea; solo se usan si no hay encabezados estructurales
+NUMBERED_HEADING = re.compile(r'^[ \t]*(?P<heading>\d{1,2})\s*[.)\-–]\s+', re.MULTILINE)
+# Líneas con forma de encabezado que los patrones anteriores no reconocen (ordinales en minúsculas,
+# títulos en mayúsculas seguidos de dos puntos) y a las que sigue texto de cláusula: indican que
+# la segmentación se saltó una cláusula. Los PÁRRAFO/PARÁGRAFO son subdivisiones legítimas.
+HEADING_LIKE = re.compile(
+    r'^[ \t]*(?:(?i:' + _ORDINAL_WORD + r')|(?!P[AÁ]RRAFO\b|PAR[AÁ]GRAFO\b)[A-ZÁÉÍÓÚÑ]{4,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,3})'
+    r'\s*[:.\-–—]+\s*[A-Za-zÁÉÍÓÚÑáéíóúñ][^\n]{20,}',
+    re.MULTILINE
+)
+# Líneas sin minúsculas (títulos como "CONTRATO DE ALQUILER"): no cuentan como contenido del preámbulo
+TITLE_LINE = re.compile(r'^[^a-záéíóúñ\n]*$', re.MULTILINE)
+PREAMBLE_NUMBER = 'PREÁMBULO'
+
+MIN_CLAUSE_CHARS = 20
+MAX_CLAUSE_CHARS = 3000
+
+
+class Segmentation(NamedTuple):
+    clauses: List[Dict[str, str]]
+    confidence: float
+    details: Dict[str, float]
+
+
+def _strip_accents(text: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+
+
+def _ordinal_value(heading: str):
+    key = re.sub(r'[\s\-]+', ' ', _strip_accents(heading.upper())).strip()
+    key = re.sub(r'A\b', 'O', key)  # forma femenina -> masculina (PRIMERA -> PRIMERO)
+    key = re.sub(r'\b(PRIMER|TERCER)\b', r'\1O', key)  # apócope (PRIMER, DÉCIMO PRIMER)
+    return ORDINAL_VALUES.get(key)
+
+
+class ClauseSegmenter:
+    """
+    Segmentador local de cláusulas basado en reglas para contratos dominicanos.
+
+    Reconoce ordinales (PRIMERO, SEGUNDA, DÉCIMO TERCERO, DÉCIMA PRIMERA...), ARTÍCULO/CLÁUSULA n,
+    bloques POR CUANTO/POR TANTO y, como último recurso, listas numeradas. Devuelve además una
+    confianza en [0, 1] que combina la coherencia de la secuencia de ordinales, el tamaño de las
+    cláusulas y la fracción del texto que queda antes del primer encabezado, penalizada por las
+    líneas con forma de encabezado que quedaron dentro de una cláusula o del preámbulo. Ningún
+    texto se descarta: los segmentos demasiado cortos se unen a la cláusula vecina y el texto
+    anterior al primer encabezado (comparecencia de las partes) se devuelve como un segmento
+    `PREÁMBULO` si contiene algo más que el título. Con confianza baja el servicio recurre a la
+    extracción con LLM.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'fast_path': 0, 'llm_fallback': 0, 'total_time': 0.0}
+
+    def segment(self, text: str) -> Segmentation:
+        start = time.monotonic()
+        matches = list(STRUCTURAL_HEADING.finditer(text))
+        if not matches:
+            matches = list(NUMBERED_HEADING.finditer(text))
+
+        clauses = []
+        ordinal_values = []
+        pending, merged = '', 0
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            clause_text = text[match.end():end].strip()
+            if len(clause_text) < MIN_CLAUSE_CHARS:
+                # Segmento demasiado corto: se une a la cláusula anterior (o a la siguiente) para no
+                # perder texto; su ordinal no entra en la secuencia y eso ya baja la confianza
+                fragment = text[match.start():end].strip()
+                merged += 1
+                if clauses:
+                    clauses[-1]['text'] += '\n' + fragment
+                else:
+                    pending += fragment + '\n'
+                continue
+            heading = re.sub(r'\s+', ' ', match.group('heading')).strip()
+            clauses.append({'clause_number': heading.upper(), 'text': pending + clause_text})
+            pending = ''
+            if match.groupdict().get('ordinal'):
+                ordinal_values.append(_ordinal_value(heading))
+
+        preamble = self._preamble_segment(text, matches)
+        segments = ([preamble] if preamble else []) + clauses
+        unmatched = sum(len(HEADING_LIKE.findall(c['text'])) for c in segments)
+        confidence, details = self._score(text, matches, clauses, ordinal_values, unmatched)
+        details['merged'] = merged
+        details['preamble_segment'] = preamble is not None
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['total_time'] += time.monotonic() - start
+        return Segmentation(segments, confidence, details)
+
+    @staticmethod
+    def _preamble_segment(text: str, matches) -> Optional[Dict[str, str]]:
+        """Texto anterior al primer encabezado, o None si no lo hay o solo contiene el título."""
+        preamble = text[:matches[0].start()].strip() if matches else ''
+        if len(TITLE_LINE.sub('', preamble).strip()) < MIN_CLAUSE_CHARS:
+            return None
+        return {'clause_number': PREAMBLE_NUMBER, 'text': preamble}
+
+    @staticmethod
+    def _score(text: str, matches, clauses: List[Dict], ordinal_values: List, unmatched: int = 0) -> Tuple[float, Dict]:
+        if len(clauses) < 2:
+            return 0.0, {'clauses': len(clauses)}
+
+        # 1. Secuencia: los ordinales deben avanzar de uno en uno
+        known = [v for v in ordinal_values if v is not None]
+        if len(known) >= 2:
+            in_order = sum(1 for a, b in zip(known, known[1:]) if b == a + 1)
+            sequence = in_order / (len(known) - 1)
+        else:
+            sequence = 1.0
+
+        # 2. Tamaño: cláusulas demasiado largas suelen esconder encabezados no reconocidos
+        well_sized = sum(1 for c in clauses if len(c['text']) <= MAX_CLAUSE_CHARS)
+        size = well_sized / len(clauses)
+
+        # 3. Preámbulo: mucho texto antes del primer encabezado indica segmentación incompleta
+        preamble = matches[0].start() / max(len(text), 1)
+        preamble_score = 1.0 if preamble <= 0.3 else max(0.0, 1.0 - (preamble - 0.3) / 0.5)
+
+        # 4. Encabezados no reconocidos dentro de las cláusulas: cada uno es una cláusula perdida
+        headings = len(clauses) / (len(clauses) + unmatched)
+
+        confidence = (0.4 * sequence + 0.3 * size + 0.3 * preamble_score) * headings
+        return round(confidence, 3), {
+            'clauses': len(clauses), 'sequence': round(sequence, 3),
+            'size': round(size, 3), 'preamble': round(preamble, 3), 'unmatched_headings': unmatched
+        }
+
+    def record_path(self, fast_path: bool):
+        with self._lock:
+            self.stats['fast_path' if fast_path else 'llm_fallback'] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        decided = stats['fast_path'] + stats['llm_fallback']
+        stats['fast_path_rate'] = stats['fast_path'] / decided if decided else 0.0
+        stats['avg_time_ms'] = 1000 * stats['total_time'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+
+
+# Instancia compartida por el proceso
+clause_segmenter = ClauseSegmenter()
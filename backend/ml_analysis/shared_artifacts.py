@@ -0,0 +1,79 @@
+import os
+import json
+import shutil
+import logging
+from typing import Any, Optional
+
+from decouple import config
+
+logger = logging.getLogger('ml_analysis')
+
+# Modo de mapeo en memoria de los artefactos ('r' = solo lectura compartido; vacío = copia por proceso).
+# Con mmap los arrays NumPy (IDF, matrices dispersas, histogramas) no se copian al heap de cada worker:
+# todos los procesos leen las mismas páginas de la cache de páginas del sistema.
+ARTIFACTS_MMAP_MODE = config('ML_ARTIFACTS_MMAP', default='r') or None
+
+CSR_PARTS = ('data', 'indices', 'indptr')
+
+
+def load_joblib(path: str) -> Any:
+    """`joblib.load` con mmap de los arrays NumPy (requiere artefactos sin comprimir)."""
+    import joblib
+    return joblib.load(path, mmap_mode=ARTIFACTS_MMAP_MODE)
+
+
+def save_csr(matrix, directory: str):
+    """Guarda una matriz CSR como tres `.npy` planos más su forma, mapeables con `np.load(mmap_mode)`."""
+    import numpy as np
+
+    matrix = matrix.tocsr()
+    for part in CSR_PARTS:
+        np.save(os.path.join(directory, f'{part}.npy'), getattr(matrix, part))
+    with open(os.path.join(directory, 'shape.json'), 'w') as f:
+        json.dump(list(matrix.shape), f)
+
+
+def load_csr(directory: str):
+    """Reconstruye la matriz CSR sobre arrays mapeados en memoria (sin copiarlos)."""
+    import numpy as np
+    from scipy.sparse import csr_matrix
+
+    with open(os.path.join(directory, 'shape.json')) as f:
+        shape = tuple(json.load(f))
+    data, indices, indptr = (
+        np.load(os.path.join(directory, f'{part}.npy'), mmap_mode=ARTIFACTS_MMAP_MODE) for part in CSR_PARTS
+    )
+    return csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def publish_directory(tmp_dir: str, final_dir: str) -> bool:
+    """
+    Publica un directorio de artefactos de forma atómica (`os.rename`). Si otro proceso ya lo
+    publicó, se descarta el temporal y se usa el existente. Devuelve True si se publicó este.
+    """
+    try:
+        os.rename(tmp_dir, final_dir)
+        return True
+    except OSError:
+        if os.path.isdir(final_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return False
+        raise
+
+
+def prune_siblings(keep_dir: str):
+    """Elimina los demás directorios publicados junto a `keep_dir` (p. ej. índices de un corpus anterior)."""
+    parent = os.path.dirname(keep_dir)
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        # Los temporales empiezan por '.': pueden pertenecer a otro proceso que aún está escribiendo
+        if path != keep_dir and os.path.isdir(path) and not name.startswith('.'):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def artifacts_dir(namespace: str) -> Optional[str]:
+    from django.conf import settings
+    models_path = getattr(settings, 'ML_MODELS_PATH', None)
+    if not models_path:
+        return None
+    return os.path.join(str(models_path), namespace)
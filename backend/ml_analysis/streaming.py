@@ -0,0 +1,92 @@
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List
+
+logger = logging.getLogger('ml_analysis')
+
+
+class IncrementalArrayParser:
+    """
+    Parser JSON incremental que emite cada objeto de un array en cuanto se completa.
+
+    Pensado para la respuesta en streaming de la extracción de cláusulas
+    ({"clauses": [{...}, {...}]}): recibe fragmentos de texto con `feed` y devuelve los objetos
+    del array `key` que ya están cerrados, sin esperar al resto del documento. Lleva el control
+    de cadenas y escapes para que las llaves dentro del texto de una cláusula no confundan el conteo.
+    """
+
+    def __init__(self, key: str = 'clauses'):
+        self.key = key
+        self._buffer = ''
+        self._pos = 0             # siguiente carácter por examinar
+        self._in_array = False
+        self._depth = 0           # profundidad de llaves/corchetes dentro del array
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        self._buffer += chunk
+        emitted = []
+        if self._done:
+            return emitted
+        if not self._in_array and not self._find_array_start():
+            return emitted
+
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if self._depth == 0 and char == '{':
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char in '}]':
+                if self._depth == 0 and char == ']':
+                    self._done = True
+                    self._pos += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and char == '}' and self._object_start is not None:
+                    raw = buffer[self._object_start:self._pos + 1]
+                    self._object_start = None
+                    try:
+                        emitted.append(json.loads(raw))
+                    except json.JSONDecodeError:
+                        logger.warning("Objeto JSON inválido en el streaming, se omite")
+            self._pos += 1
+        return emitted
+
+    def _find_array_start(self) -> bool:
+        """Busca `"key"` seguido de `[` y deja el cursor justo después del corchete."""
+        marker = self._buffer.find(f'"{self.key}"')
+        if marker == -1:
+            return False
+        bracket = self._buffer.find('[', marker)
+        if bracket == -1:
+            return False
+        self._in_array = True
+        self._pos = bracket + 1
+        return True
+
+    @property
+    def text(self) -> str:
+        """Texto completo recibido hasta ahora."""
+        return self._buffer
+
+
+def iter_streamed_objects(chunks: Iterable[str], key: str = 'clauses') -> Iterator[Dict]:
+    """Recorre los fragmentos de una respuesta en streaming y emite los objetos del array `key`."""
+    parser = IncrementalArrayParser(key)
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
@@ -0,0 +1,146 @@
+import json
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from decouple import config
+
+logger = logging.getLogger('ml_analysis')
+
+# Etapas del análisis a las que se atribuye cada llamada al LLM
+STAGE_EXTRACTION = 'extraction'
+STAGE_VALIDATION = 'validation'
+STAGE_SUMMARY = 'summary'
+STAGE_OTHER = 'other'
+
+# Precio por millón de tokens (USD) de los modelos que no aparecen en `LLM_PRICES`
+PRICE_PER_MTOKEN_INPUT = config('LLM_PRICE_PER_MTOKEN_INPUT', default=0.6, cast=float)
+PRICE_PER_MTOKEN_OUTPUT = config('LLM_PRICE_PER_MTOKEN_OUTPUT', default=0.6, cast=float)
+
+# Tarifas de Together (USD por millón de tokens de entrada y de salida) de los modelos habituales
+DEFAULT_PRICES = {
+    'mistralai/Mixtral-8x7B-Instruct-v0.1': {'input': 0.6, 'output': 0.6},
+    'meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo': {'input': 0.18, 'output': 0.18},
+    'meta-llama/Meta-Llama-3.1-70B-Instruct-Turbo': {'input': 0.88, 'output': 0.88},
+    'meta-llama/Llama-3.3-70B-Instruct-Turbo': {'input': 0.88, 'output': 0.88},
+    'meta-llama/Llama-3-70b-chat-hf': {'input': 0.9, 'output': 0.9},
+    'Qwen/Qwen2.5-72B-Instruct-Turbo': {'input': 1.2, 'output': 1.2},
+    'deepseek-ai/DeepSeek-V3': {'input': 1.25, 'output': 1.25},
+}
+
+
+def load_prices() -> Dict[str, Dict[str, float]]:
+    """
+    Tabla de precios por modelo: `DEFAULT_PRICES` actualizada con `LLM_PRICES` (objeto JSON), p. ej.:
+        {"meta-llama/Llama-3-70b-chat-hf": {"input": 0.9, "output": 0.9}}
+    """
+    prices = {model: dict(price) for model, price in DEFAULT_PRICES.items()}
+    raw = config('LLM_PRICES', default='')
+    if not raw:
+        return prices
+    try:
+        configured = json.loads(raw)
+    except ValueError:
+        logger.error("LLM_PRICES no es un JSON válido; se usan los precios por defecto")
+        return prices
+    for model, price in configured.items() if isinstance(configured, dict) else []:
+        try:
+            prices[model] = {'input': float(price['input']), 'output': float(price['output'])}
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Precio de LLM_PRICES inválido para {model}: se ignora")
+    return prices
+
+
+LLM_PRICES = load_prices()
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Coste en USD de una llamada según la tarifa de entrada y salida de su modelo."""
+    price = LLM_PRICES.get(model) or {'input': PRICE_PER_MTOKEN_INPUT, 'output': PRICE_PER_MTOKEN_OUTPUT}
+    return (prompt_tokens * price['input'] + completion_tokens * price['output']) / 1_000_000
+
+
+class LLMUsageRecorder:
+    """
+    Acumula las llamadas al LLM de un análisis (tokens, latencia, reintentos, modelo y coste)
+    agrupadas por etapa, con el coste desglosado además por modelo (con hedging una misma etapa
+    puede usar modelos de tarifas distintas). Es seguro entre hilos: las validaciones corren en un pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.models = set()
+        self.model_costs = {}
+
+    def record(self, stage: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+               latency: float = 0.0, retries: int = 0, cached: bool = False):
+        cost = call_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            entry = self.stages.setdefault(stage or STAGE_OTHER, {
+                'calls': 0, 'cached_calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                'retries': 0, 'cost_usd': 0.0, 'latency_total': 0.0, 'latencies': []
+            })
+            self.models.add(model)
+            if cached:
+                entry['cached_calls'] += 1
+                return
+            entry['calls'] += 1
+            entry['prompt_tokens'] += prompt_tokens
+            entry['completion_tokens'] += completion_tokens
+            entry['retries'] += retries
+            entry['cost_usd'] += cost
+            self.model_costs[model] = self.model_costs.get(model, 0.0) + cost
+            entry['latency_total'] += latency
+            entry['latencies'].append(round(latency, 3))
+
+    def summary(self) -> Dict:
+        """Resumen serializable a JSON (se guarda en `AnalysisResult.features_extracted['llm_usage']`)."""
+        with self._lock:
+            stages = {
+                name: dict(entry, cost_usd=round(entry['cost_usd'], 6),
+                           latency_total=round(entry['latency_total'], 3), latencies=list(entry['latencies']))
+                for name, entry in self.stages.items()
+            }
+            models = sorted(self.models)
+            model_costs = {model: round(cost, 6) for model, cost in self.model_costs.items()}
+        totals = {key: sum(s[key] for s in stages.values())
+                  for key in ('calls', 'cached_calls', 'prompt_tokens', 'completion_tokens', 'retries')}
+        totals['cost_usd'] = round(sum(s['cost_usd'] for s in stages.values()), 6)
+        totals['latency_total'] = round(sum(s['latency_total'] for s in stages.values()), 3)
+        return {'models': models, 'stages': stages, 'totals': totals, 'cost_by_model': model_costs}
+
+
+_current_recorder = contextvars.ContextVar('llm_usage_recorder', default=None)
+
+
+@contextmanager
+def track_llm_usage():
+    """Registra en un `LLMUsageRecorder` todas las llamadas al LLM hechas dentro del bloque."""
+    recorder = LLMUsageRecorder()
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+def record_llm_call(stage: Optional[str], model: str, **kwargs):
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.record(stage, model, **kwargs)
+
+
+def run_in_context(fn: Callable) -> Callable:
+    """
+    Envuelve `fn` para que se ejecute con el contexto actual (y su `LLMUsageRecorder`) en los
+    hilos de un ThreadPoolExecutor, que no heredan los contextvars del hilo que los lanza.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # Cada ejecución necesita su propia copia: un Context no puede usarse en dos hilos a la vez
+        return context.copy().run(fn, *args, **kwargs)
+    return run
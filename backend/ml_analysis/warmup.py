@@ -0,0 +1,33 @@
+import time
+import logging
+from typing import Dict
+
+logger = logging.getLogger('ml_analysis')
+
+
+def warm_up(include_rag: bool = True, inference: bool = True) -> Dict[str, float]:
+    """
+    Carga por adelantado los modelos perezosos (servicio ML y, opcionalmente, el índice RAG)
+    y devuelve el tiempo en segundos de cada uno.
+
+    Con gunicorn y `preload_app` se usa en dos fases (ver gunicorn.conf.py): el master solo carga
+    los modelos (`include_rag=False, inference=False`), sin inferencia ni consultas a la base de
+    datos, para que los workers los hereden por copy-on-write; cada worker ejecuta después la
+    inferencia de prueba y el índice RAG (que consulta la base de datos) con sus propios recursos.
+    """
+    from ml_analysis.ml_service import ml_service
+
+    timings = {}
+    start = time.monotonic()
+    ml_service.warm_up(inference=inference)
+    timings['ml_service'] = time.monotonic() - start
+
+    if include_rag:
+        from legal_knowledge.rag_service import rag_service
+
+        start = time.monotonic()
+        rag_service.warm_up()
+        timings['rag_service'] = time.monotonic() - start
+
+    logger.info("Warm-up completado: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    return timings
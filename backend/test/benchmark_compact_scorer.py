@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Benchmark del formato de inferencia compacto frente al Pipeline de sklearn serializado:
+tiempo de carga, latencia de una cláusula, throughput por lotes y diferencia máxima entre
+las probabilidades de ambos (deben coincidir dentro de la tolerancia).
+
+Uso:
+    python test/benchmark_compact_scorer.py [--version VERSION] [--repeat 200] [--tolerance 1e-6]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import django
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+import numpy as np
+
+from ml_analysis.model_registry import model_registry
+
+CLAUSULAS = [
+    "El Inquilino acepta hacerse responsable de cualquier multa impuesta por regulaciones ajenas a su operación.",
+    "La señora Carla Estévez Herrera se obliga al pago de la suma de RD$3,200,000.00 al Banco Popular Dominicano.",
+    "El contrato se prorroga automáticamente cada año con un aumento de 25% en el alquiler, sin opción de renegociación.",
+    "El depósito de RD$ 20,000 no será devuelto si el inquilino decide no renovar.",
+    "Las partes eligen domicilio en sus respectivas direcciones indicadas al inicio del presente contrato.",
+]
+
+
+def timed(fn, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--version', default=None, help='Versión del registro (por defecto, la activa).')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    version = args.version or model_registry.active_version()
+    if not model_registry.get(version).get('bundle_files'):
+        print(f"🔄 La versión {version} no tiene paquete compacto; exportándolo...")
+        model_registry.export_bundle(version)
+
+    pipeline, load_pipeline = timed(lambda: model_registry.load(version, compact=False))
+    scorer, load_scorer = timed(lambda: model_registry.load(version, compact=True))
+    print(f"\n📦 Carga: Pipeline {load_pipeline[0] * 1000:.1f} ms | compacto {load_scorer[0] * 1000:.1f} ms")
+
+    texts = CLAUSULAS * 40
+    expected = pipeline.predict_proba(texts)[:, 1]
+    actual = scorer.predict_proba(texts)[:, 1]
+    max_diff = float(np.max(np.abs(expected - actual)))
+    print(f"🎯 Diferencia máxima de probabilidad: {max_diff:.2e} (tolerancia {args.tolerance:.0e})")
+
+    for label, model in (('Pipeline', pipeline), ('compacto', scorer)):
+        _, single = timed(lambda: model.predict_proba(CLAUSULAS[:1]), args.repeat)
+        _, batch = timed(lambda: model.predict_proba(texts), max(1, args.repeat // 20))
+        print(f"⏱️  {label:<9} 1 cláusula: p50 {statistics.median(single) * 1000:.3f} ms | "
+              f"{len(texts)} cláusulas: p50 {statistics.median(batch) * 1000:.1f} ms")
+
+    if max_diff > args.tolerance:
+        print("❌ El paquete compacto no reproduce el Pipeline dentro de la tolerancia")
+        sys.exit(1)
+    print("✅ Predicciones equivalentes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Compara los featurizadores del clasificador ('tfidf' con vocabulario ajustado frente a 'hashing'
+sin estado + IDF) sobre el mismo split: exactitud/F1, tamaño serializado, tiempo de carga y
+memoria asignada al deserializar el Pipeline.
+
+Uso:
+    python test/benchmark_featurizers.py [--dataset ml_analysis/training_data/nuevas_clausulas.csv]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+import joblib
+import lightgbm as lgb
+import pandas as pd
+from nltk.corpus import stopwords
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from ml_analysis.featurizers import FEATURIZERS, build_featurizer, describe_featurizer
+
+
+def load_dataset(path):
+    df = pd.read_csv(path)
+    if 'clausula' in df.columns:
+        df = df.rename(columns={'clausula': 'text', 'etiqueta': 'is_abusive', 'categoria': 'is_abusive'})
+    return df.dropna(subset=['text', 'is_abusive'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dataset', default=os.path.join(BACKEND_DIR, 'ml_analysis', 'training_data', 'nuevas_clausulas.csv'))
+    args = parser.parse_args()
+
+    df = load_dataset(args.dataset)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df['text'], df['is_abusive'].astype(int), test_size=0.2, random_state=42, stratify=df['is_abusive']
+    )
+    print(f"📚 {len(X_train)} filas de entrenamiento, {len(X_test)} de prueba")
+
+    for kind in FEATURIZERS:
+        step_name, featurizer, _ = build_featurizer(kind, stop_words=stopwords.words('spanish'))
+        pipeline = Pipeline([
+            (step_name, featurizer),
+            ('classifier', lgb.LGBMClassifier(objective='binary', class_weight='balanced', n_estimators=200,
+                                              learning_rate=0.05, num_leaves=31, random_state=42, verbose=-1)),
+        ])
+        start = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+        y_pred = pipeline.predict(X_test)
+
+        buffer = io.BytesIO()
+        joblib.dump(pipeline, buffer)
+        payload = buffer.getvalue()
+        tracemalloc.start()
+        start = time.perf_counter()
+        joblib.load(io.BytesIO(payload))
+        load_time = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        info = describe_featurizer(pipeline)
+        print(f"\n📊 {kind}")
+        print(f"  • exactitud {accuracy_score(y_test, y_pred):.4f} | F1 abusiva {f1_score(y_test, y_pred):.4f} | entrenamiento {fit_time:.2f}s")
+        print(f"  • vocabulario {info['vocabulary_size']} términos | IDF {info['idf_length']} valores")
+        print(f"  • serializado {len(payload) / 1024:.1f} KB | carga {load_time * 1000:.1f} ms | memoria pico al cargar {peak / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
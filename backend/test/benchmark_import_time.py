@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Benchmark de arranque: mide en un proceso limpio cuánto cuesta importar `ml_service`
+(ahora sin cargar modelos) frente al warm-up explícito, que equivale al coste que antes
+se pagaba en cada import. También muestra la latencia del primer análisis con y sin warm-up.
+
+Uso:
+    python test/benchmark_import_time.py [--runs 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, os, sys, time
+sys.path.insert(0, {backend!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+import django
+django.setup()
+timings = {{}}
+start = time.monotonic()
+from ml_analysis.ml_service import ml_service
+timings['import'] = time.monotonic() - start
+if {warm}:
+    from ml_analysis.warmup import warm_up
+    start = time.monotonic()
+    warm_up()
+    timings['warm_up'] = time.monotonic() - start
+start = time.monotonic()
+ml_service._classify_clauses(["El inquilino pagará una penalidad del 50% por cualquier retraso."])
+timings['first_request'] = time.monotonic() - start
+print(json.dumps(timings))
+'''
+
+
+def run_probe(warm: bool) -> dict:
+    code = PROBE.format(backend=BACKEND_DIR, warm=warm)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    for warm in (False, True):
+        runs = [run_probe(warm) for _ in range(args.runs)]
+        label = 'con warm-up' if warm else 'perezoso'
+        print(f"\n📊 {label} ({args.runs} procesos)")
+        for key in runs[0]:
+            values = [r[key] for r in runs]
+            print(f"  • {key:<14} mediana {statistics.median(values) * 1000:8.1f} ms | max {max(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
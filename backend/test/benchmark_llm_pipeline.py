@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Benchmark de throughput y latencia de cola del pipeline de análisis contra el servidor LLM simulado.
+
+Uso:
+    python test/mock_llm_server.py --port 8089 &
+    python test/benchmark_llm_pipeline.py --contracts 20 --parallel 4
+
+Hedging entre dos backends simulados (el segundo con latencia más estable):
+    python test/mock_llm_server.py --port 8090 --latency uniform --latency-min 0.3 --latency-max 0.6 &
+    LLM_HEDGING_ENABLED=True LLM_HEDGE_BACKENDS='[{"url": "http://127.0.0.1:8090/v1/chat/completions", "model": "mock-b"}]' \
+        python test/benchmark_llm_pipeline.py --contracts 20 --parallel 4
+
+El contrato de ejemplo con encabezados PRIMERO/SEGUNDO... lo resuelve el segmentador local sin
+llamar al LLM para extraer. Para medir la extracción con LLM (ventanas, streaming):
+    python test/benchmark_llm_pipeline.py --contract plain          # contrato sin encabezados
+    python test/benchmark_llm_pipeline.py --force-llm-extraction    # desactiva el segmentador
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Apuntar al servidor simulado antes de cargar el servicio
+os.environ.setdefault('LLM_API_BASE_URL', 'http://127.0.0.1:8089/v1/chat/completions')
+os.environ.setdefault('TOGETHER_API_KEY', 'mock')
+# Desactivar caches para medir llamadas reales al LLM
+os.environ.setdefault('LLM_CACHE_ENABLED', 'False')
+os.environ.setdefault('CLAUSE_CACHE_ENABLED', 'False')
+
+import django
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+import ml_analysis.ml_service as ml_service_module
+from ml_analysis.ml_service import ml_service
+from ml_analysis.segmenter import clause_segmenter
+from ml_analysis.llm_client import llm_client
+from ml_analysis.hedging import llm_hedging
+
+SAMPLE_CONTRACT = """
+CONTRATO DE ALQUILER DE LOCAL COMERCIAL
+
+PRIMERO: La Propietaria alquila a El Inquilino un local comercial en la Av. Abraham Lincoln No. 15, Santo Domingo. El local será usado para actividades comerciales, pero la propietaria se reserva el derecho de cambiar su uso sin previo aviso.
+
+SEGUNDO: El Inquilino acepta hacerse responsable de cualquier multa impuesta por el incumplimiento de regulaciones que sean ajenas a su operación.
+
+TERCERO: El contrato se prorroga automáticamente cada año con un aumento de 25% en el alquiler, sin opción de renegociación.
+
+CUARTO: El precio mensual del alquiler es de RD$45,000.00, pagaderos los primeros cinco días de cada mes.
+
+QUINTO: El depósito de RD$90,000.00 no será devuelto si el inquilino decide no renovar.
+
+SEXTO: Las partes eligen domicilio en sus respectivas direcciones para todos los fines del presente contrato.
+"""
+
+# Mismo contenido en prosa corrida, sin encabezados: el segmentador no alcanza la confianza
+# mínima y la extracción de cláusulas pasa por el LLM
+PLAIN_CONTRACT = """
+Contrato de alquiler de local comercial entre La Propietaria y El Inquilino. La Propietaria alquila a El Inquilino un local comercial en la Av. Abraham Lincoln No. 15, Santo Domingo, que será usado para actividades comerciales, aunque la propietaria se reserva el derecho de cambiar su uso sin previo aviso. El Inquilino acepta además hacerse responsable de cualquier multa impuesta por el incumplimiento de regulaciones que sean ajenas a su operación. El contrato se prorroga automáticamente cada año con un aumento de 25% en el alquiler, sin opción de renegociación, y el precio mensual es de RD$45,000.00, pagaderos los primeros cinco días de cada mes. El depósito de RD$90,000.00 no será devuelto si el inquilino decide no renovar. Para todos los fines del presente contrato las partes eligen domicilio en sus respectivas direcciones.
+"""
+
+CONTRACTS = {'headings': SAMPLE_CONTRACT, 'plain': PLAIN_CONTRACT}
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def run_one(contract_text):
+    start = time.monotonic()
+    result = ml_service.analyze_contract(contract_text)
+    return time.monotonic() - start, result.get('total_clauses', 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del pipeline contra el LLM simulado')
+    parser.add_argument('--contracts', type=int, default=10, help='Número de contratos a analizar')
+    parser.add_argument('--parallel', type=int, default=2, help='Análisis simultáneos (simula workers)')
+    parser.add_argument('--contract', choices=sorted(CONTRACTS), default='headings',
+                        help='Contrato de ejemplo: con encabezados (segmentador local) o en prosa (extracción con LLM)')
+    parser.add_argument('--force-llm-extraction', action='store_true',
+                        help='Desactiva el segmentador local para que toda extracción pase por el LLM')
+    args = parser.parse_args()
+    if args.force_llm_extraction:
+        ml_service_module.SEGMENTER_ENABLED = False
+    contract_text = CONTRACTS[args.contract]
+
+    print(f"🚀 Analizando {args.contracts} contratos con {args.parallel} en paralelo contra {os.environ['LLM_API_BASE_URL']}")
+    wall_start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        runs = list(executor.map(run_one, [contract_text] * args.contracts))
+    wall_time = time.monotonic() - wall_start
+
+    latencies = [latency for latency, _ in runs]
+    clauses = sum(count for _, count in runs)
+    print("\n📊 Resultados:")
+    print(f"  • Tiempo total: {wall_time:.2f}s")
+    print(f"  • Throughput: {args.contracts / wall_time:.2f} contratos/s ({clauses / wall_time:.2f} cláusulas/s)")
+    print(f"  • Latencia por contrato p50/p95/p99: "
+          f"{percentile(latencies, 0.50):.2f}s / {percentile(latencies, 0.95):.2f}s / {percentile(latencies, 0.99):.2f}s")
+    print(f"  • Segmentador local: {clause_segmenter.get_stats()}")
+    print(f"  • Métricas del cliente LLM: {llm_client.get_metrics()}")
+    if llm_hedging.active:
+        print(f"  • Hedging: {llm_hedging.get_metrics()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
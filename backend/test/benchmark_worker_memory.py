@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Benchmark de memoria por worker: lanza N procesos que cargan el clasificador activo del registro
+y el índice RAG (como haría cada worker de gunicorn) y reporta RSS, PSS y memoria compartida
+de cada uno, con artefactos copiados por proceso (antes) y mapeados en memoria (después).
+
+PSS reparte las páginas compartidas entre los procesos que las usan, así que es la medida
+honesta del coste real por worker; RSS cuenta las páginas compartidas en todos.
+
+Uso:
+    python test/benchmark_worker_memory.py [--workers 2] [--skip-rag]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r'''
+import json, os, sys
+sys.path.insert(0, {backend!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+import django
+django.setup()
+
+from ml_analysis.model_registry import model_registry
+pipeline = model_registry.load(model_registry.active_version())
+pipeline.predict_proba(["El inquilino pagará una penalidad del 50% por cualquier retraso."])
+if {include_rag}:
+    from legal_knowledge.rag_service import rag_service
+    rag_service.warm_up()
+    rag_service._semantic_search("depósito de garantía", 5, 0.0)
+
+
+def smaps_rollup():
+    values = {{}}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values
+
+
+print('ready', flush=True)
+sys.stdin.readline()  # esperar a que todos los workers hayan cargado antes de medir
+m = smaps_rollup()
+print(json.dumps({{
+    'rss_mb': m.get('Rss', 0) / 1024,
+    'pss_mb': m.get('Pss', 0) / 1024,
+    'shared_mb': (m.get('Shared_Clean', 0) + m.get('Shared_Dirty', 0)) / 1024,
+}}), flush=True)
+'''
+
+
+def measure(workers: int, mmap_mode: str, include_rag: bool):
+    env = dict(os.environ, ML_ARTIFACTS_MMAP=mmap_mode)
+    code = WORKER.format(backend=BACKEND_DIR, include_rag=include_rag)
+    procs = [
+        subprocess.Popen([sys.executable, '-c', code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        while proc.stdout.readline().strip() != 'ready':
+            if proc.poll() is not None:
+                raise RuntimeError('Un worker terminó antes de cargar los modelos')
+    results = []
+    for proc in procs:
+        proc.stdin.write('\n')
+        proc.stdin.flush()
+        results.append(json.loads(proc.stdout.readline()))
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--skip-rag', action='store_true')
+    args = parser.parse_args()
+
+    for label, mmap_mode in (('antes (copia por worker)', ''), ('después (mmap compartido)', 'r')):
+        results = measure(args.workers, mmap_mode, not args.skip_rag)
+        print(f"\n📊 {label}")
+        for i, r in enumerate(results):
+            print(f"  • worker {i}: RSS {r['rss_mb']:7.1f} MB | PSS {r['pss_mb']:7.1f} MB | compartida {r['shared_mb']:7.1f} MB")
+        total_pss = sum(r['pss_mb'] for r in results)
+        print(f"  • PSS total: {total_pss:.1f} MB ({total_pss / len(results):.1f} MB por worker)")
+
+
+if __name__ == "__main__":
+    main()
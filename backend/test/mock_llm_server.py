@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+"""
+Servidor LLM simulado compatible con Together AI (/v1/chat/completions).
+
+Permite ejecutar el pipeline de análisis y pruebas de carga sin llamar a la API de pago:
+
+    python test/mock_llm_server.py --port 8089 --latency lognormal --latency-mean 1.2 --error-rate 0.02 --rate-limit-rate 0.05
+    LLM_API_BASE_URL=http://127.0.0.1:8089/v1/chat/completions TOGETHER_API_KEY=mock python test/benchmark_llm_pipeline.py
+
+Responde JSON válido según el tipo de prompt que envía `ContractMLService`:
+  - extracción de cláusulas  -> {"clauses": [...]}
+  - validación por lote      -> {"results": [...]}
+  - validación individual    -> {"is_valid_clause", "is_abusive", "explanation", "suggested_fix", "confidence"}
+  - resumen ejecutivo        -> {"resumen", "recomendaciones"}
+
+Con "stream": true responde en formato SSE (eventos `data: {...}` terminados en `data: [DONE]`),
+repartiendo la latencia simulada entre los fragmentos como haría el proveedor real.
+
+GET /stats devuelve el conteo de peticiones, errores inyectados y tokens consumidos.
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CLAUSE_HEADING = re.compile(
+    r'(PRIMERO|SEGUNDO|TERCERO|CUARTO|QUINTO|SEXTO|SÉPTIMO|OCTAVO|NOVENO|DÉCIMO|ARTÍCULO\s+\d+|POR CUANTO|POR TANTO)\s*[:.]?'
+)
+ABUSIVE_HINTS = ('sin previo aviso', 'no será devuelto', 'exclusivo', 'renuncia', 'sin opción', 'automáticamente',
+                 'ajenas', 'unilateral', 'penalidad', 'no podrá reclamar')
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def between(text: str, start: str, end: str) -> str:
+    if start in text and end in text:
+        return text.split(start, 1)[1].split(end, 1)[0].strip()
+    return text
+
+
+def clause_verdict(clause_text: str) -> dict:
+    lowered = clause_text.lower()
+    is_abusive = any(hint in lowered for hint in ABUSIVE_HINTS)
+    return {
+        'is_valid_clause': len(clause_text.split()) > 3,
+        'is_abusive': is_abusive,
+        'explanation': 'Respuesta simulada: contiene términos desproporcionados.' if is_abusive
+                       else 'Respuesta simulada: cláusula estándar.',
+        'suggested_fix': 'Redactar la obligación de forma recíproca y proporcional.' if is_abusive else '',
+        'confidence': round(random.uniform(0.7, 0.95), 2),
+    }
+
+
+def build_content(system_message: str, prompt: str) -> dict:
+    """Genera una respuesta con el esquema que espera cada prompt del servicio."""
+    if "'clauses'" in system_message:
+        contract = between(prompt, '--- INICIO DEL CONTRATO ---', '--- FIN DEL CONTRATO ---')
+        parts = CLAUSE_HEADING.split(contract)
+        clauses = []
+        for i in range(1, len(parts), 2):
+            text = parts[i + 1].strip() if i + 1 < len(parts) else ''
+            if text:
+                clauses.append({'clause_number': parts[i].strip(), 'text': text})
+        if not clauses:
+            clauses = [{'clause_number': 'SIN_NUMERO', 'text': p.strip()}
+                       for p in contract.split('\n\n') if p.strip()]
+        return {'clauses': clauses}
+
+    if "'results'" in system_message:
+        block = between(prompt, '--- INICIO DE LAS CLÁUSULAS ---', '--- FIN DE LAS CLÁUSULAS ---')
+        parts = re.split(r'^\s*\[(\d+)\]\s*', block, flags=re.MULTILINE)
+        items = zip(parts[1::2], parts[2::2])
+        return {'results': [dict(clause_verdict(text), index=int(index)) for index, text in items]}
+
+    if "'is_valid_clause'" in system_message:
+        return clause_verdict(between(prompt, '--- INICIO DE LA CLÁUSULA ---', '--- FIN DE LA CLÁUSULA ---'))
+
+    return {
+        'resumen': 'Resumen simulado: el contrato contiene cláusulas que favorecen a una de las partes.',
+        'recomendaciones': 'Revisar las cláusulas señaladas con un abogado antes de firmar.',
+    }
+
+
+class MockState:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'completed': 0, 'injected_errors': 0, 'injected_429': 0,
+                      'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def sample_latency(self) -> float:
+        args = self.args
+        if args.latency == 'fixed':
+            return args.latency_mean
+        if args.latency == 'uniform':
+            return random.uniform(args.latency_min, args.latency_max)
+        # lognormal: cola larga, parecida a la del proveedor real
+        return random.lognormvariate(0, args.latency_sigma) * args.latency_mean
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.stats[key] += amount
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            if state.args.verbose:
+                super().log_message(format, *args)
+
+        def _send_json(self, status: int, body: dict, headers: dict = None):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_stream(self, content: str, total_latency: float, chunk_chars: int = 40):
+            """Envía `content` como eventos SSE, con el primer fragmento tras ~20% de la latencia."""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+
+            chunks = [content[i:i + chunk_chars] for i in range(0, len(content), chunk_chars)] or ['']
+            time.sleep(total_latency * 0.2)
+            per_chunk = total_latency * 0.8 / len(chunks)
+            for chunk in chunks:
+                event = {'choices': [{'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}]}
+                self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(per_chunk)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/stats':
+                with state.lock:
+                    self._send_json(200, dict(state.stats))
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            state.count('requests')
+
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {'error': 'not found'})
+                return
+
+            roll = random.random()
+            if roll < state.args.rate_limit_rate:
+                state.count('injected_429')
+                self._send_json(429, {'error': 'rate limited'}, {'Retry-After': str(state.args.retry_after)})
+                return
+            if roll < state.args.rate_limit_rate + state.args.error_rate:
+                state.count('injected_errors')
+                time.sleep(state.sample_latency() / 2)
+                self._send_json(503, {'error': 'injected failure'})
+                return
+
+            messages = request.get('messages', [])
+            system_message = next((m['content'] for m in messages if m.get('role') == 'system'), '')
+            prompt = next((m['content'] for m in messages if m.get('role') == 'user'), '')
+
+            latency = state.sample_latency()
+            content = json.dumps(build_content(system_message, prompt), ensure_ascii=False)
+
+            prompt_tokens = estimate_tokens(system_message) + estimate_tokens(prompt)
+            completion_tokens = estimate_tokens(content)
+            state.count('prompt_tokens', prompt_tokens)
+            state.count('completion_tokens', completion_tokens)
+            state.count('completed')
+
+            if request.get('stream'):
+                self._send_stream(content, latency)
+                return
+
+            time.sleep(latency)
+
+            self._send_json(200, {
+                'id': f'mock-{int(time.time() * 1000)}',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'mock-model'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens,
+                },
+            })
+
+    return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Servidor LLM simulado (formato Together /v1/chat/completions)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--latency-mean', type=float, default=0.8, help='Latencia base en segundos')
+    parser.add_argument('--latency-min', type=float, default=0.2)
+    parser.add_argument('--latency-max', type=float, default=2.0)
+    parser.add_argument('--latency-sigma', type=float, default=0.6, help='Dispersión de la lognormal')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fracción de respuestas 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fracción de respuestas 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Valor de Retry-After en los 429')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+
+def run(argv=None):
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(MockState(args)))
+    print(f"🤖 Servidor LLM simulado escuchando en http://{args.host}:{args.port}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Servidor detenido")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+"""
+Script de prueba: las claves de la cache de cláusulas deben compartirse entre cláusulas de la
+misma plantilla (nombres, montos, fechas) y separarse cuando cambia un porcentaje o un plazo.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_analysis.clause_cache import ClauseAnalysisCache
+
+VERSION = ClauseAnalysisCache.make_version('v-test', 'modelo-test')
+
+DISTINTAS = [
+    ("El inquilino pagará una penalidad del 5% del alquiler mensual por cada día de retraso.",
+     "El inquilino pagará una penalidad del 50% del alquiler mensual por cada día de retraso."),
+    ("El propietario podrá rescindir el contrato con un aviso previo de 30 días.",
+     "El propietario podrá rescindir el contrato con un aviso previo de 1 día."),
+]
+
+EQUIVALENTES = [
+    ("El señor Juan Pérez pagará RD$25,000.00 el 5 de enero de 2024.",
+     "El señor Pedro Gómez pagará RD$40,000.00 el 12 de marzo de 2025."),
+    ("PRIMERA: El inquilino entrega un depósito de US$ 500.",
+     "DÉCIMA PRIMERA: El inquilino entrega un depósito de US$ 1,200."),
+]
+
+
+def key(text):
+    return ClauseAnalysisCache.make_clause_key(text, VERSION)
+
+
+def test_clause_cache_keys():
+    for a, b in DISTINTAS:
+        assert key(a) != key(b), f"Colisión de clave:\n  {a}\n  {b}"
+    print("✅ Porcentajes y plazos distintos producen claves distintas")
+
+    for a, b in EQUIVALENTES:
+        assert key(a) == key(b), f"Plantilla no reconocida:\n  {a}\n  {b}"
+    print("✅ Nombres, montos, fechas y encabezados se enmascaran")
+
+
+if __name__ == '__main__':
+    test_clause_cache_keys()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Script de prueba: la deduplicación MinHash/LSH de los CSV de entrenamiento debe colapsar
+duplicados exactos y casi duplicados, conservar cláusulas distintas y reportar conflictos de etiqueta.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_analysis.dataset_dedup import deduplicate, iter_labelled_rows
+
+FILAS = [
+    ("El inquilino pagará una penalidad del 50% del alquiler por cada día de retraso en el pago mensual.", 1),
+    ("El inquilino pagará una penalidad del 50% del alquiler por cada día de retraso en el pago mensual.", 1),
+    ("El  INQUILINO pagará una penalidad del 50% del alquiler por cada día de retraso en el pago mensual", 1),
+    ("El inquilino pagará una penalidad del 50% del alquiler por cada día de retraso en el pago mensual acordado.", 0),
+    ("Las partes eligen domicilio en sus respectivas direcciones indicadas al inicio del presente contrato.", 0),
+    ("La propietaria se reserva el derecho de cambiar el uso del local sin previo aviso al inquilino.", 1),
+]
+
+
+def test_dataset_dedup():
+    print("🔄 Deduplicando filas de prueba...")
+    index = deduplicate(FILAS, threshold=0.7)
+    print(f"  • {index.stats}")
+    assert len(index.groups) == 3, f"Se esperaban 3 grupos, hay {len(index.groups)}"
+    assert index.stats['exact_duplicates'] == 2
+    assert index.stats['near_duplicates'] == 1
+
+    conflicts = index.conflicts()
+    assert len(conflicts) == 1 and conflicts[0]['labels'] == {1: 3, 0: 1}, conflicts
+    collapsed = dict(index.collapsed())
+    assert collapsed[FILAS[0][0]] == 1, "La etiqueta mayoritaria debe ganar"
+    print("✅ Duplicados colapsados y conflicto reportado")
+
+    dataset = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'ml_analysis', 'training_data', 'nuevas_clausulas.csv')
+    try:
+        index = deduplicate(iter_labelled_rows(dataset))
+        print(f"  • {os.path.basename(dataset)}: {index.stats['rows']} filas -> {len(index.groups)} grupos, "
+              f"{len(index.conflicts())} con conflicto")
+    except ValueError as e:
+        print(f"  • {os.path.basename(dataset)} omitido: {e}")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_dataset_dedup()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Script de prueba: las entidades extraídas por lotes (nlp.pipe con pipeline recortado)
+deben ser idénticas a las del pipeline completo de spaCy procesando cláusula por cláusula.
+"""
+import os
+import sys
+import time
+
+import django
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+import spacy
+from spacy.matcher import Matcher
+
+from ml_analysis.ml_service import ml_service
+
+CLAUSULAS = [
+    "El Inquilino acepta hacerse responsable de cualquier multa impuesta por regulaciones ajenas a su operación.",
+    "La señora Carla Estévez Herrera se obliga al pago de la suma de RD$3,200,000.00 al Banco Popular Dominicano.",
+    "El contrato se firma en Santo Domingo el 15 de marzo de 2024 entre El Vendedor y La Compradora.",
+    "El depósito de RD$ 20,000 no será devuelto si el inquilino decide no renovar.",
+] * 10
+
+
+def entities_full_pipeline(nlp, texts):
+    """Comportamiento anterior: pipeline completo y una llamada a nlp() por cláusula."""
+    matcher = Matcher(nlp.vocab)
+    original_matcher, original_nlp = ml_service.matcher, ml_service.nlp
+    ml_service.nlp, ml_service.matcher = nlp, matcher
+    try:
+        ml_service._setup_custom_patterns()
+        return [ml_service._entities_from_doc(nlp(text)) for text in texts]
+    finally:
+        ml_service.nlp, ml_service.matcher = original_nlp, original_matcher
+
+
+def test_entity_batching():
+    print("🔄 Comparando extracción de entidades por lotes con la extracción cláusula por cláusula...")
+    full_nlp = spacy.load("es_core_news_sm")
+    start = time.monotonic()
+    expected = entities_full_pipeline(full_nlp, CLAUSULAS)
+    full_time = time.monotonic() - start
+
+    start = time.monotonic()
+    batched = ml_service._extract_entities_batch(CLAUSULAS)
+    batch_time = time.monotonic() - start
+
+    print(f"  • Pipeline completo: {full_time * 1000:.1f} ms | Lotes recortados: {batch_time * 1000:.1f} ms")
+    print(f"  • Componentes activos: {ml_service.nlp.pipe_names}")
+    assert batched == expected, "Las entidades por lotes difieren de las del pipeline completo"
+    print("✅ Entidades idénticas")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_entity_batching()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Script de prueba para el segmentador local de cláusulas (camino rápido sin LLM)
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_analysis.segmenter import ClauseSegmenter
+
+MIN_CONFIDENCE = 0.8
+
+CONTRATOS = {
+    'alquiler_ordinales': """
+CONTRATO DE ALQUILER DE LOCAL COMERCIAL
+
+PRIMERO: La Propietaria alquila a El Inquilino un local comercial en la Av. Abraham Lincoln No. 15, Santo Domingo.
+SEGUNDO: El Inquilino acepta hacerse responsable de cualquier multa impuesta por regulaciones ajenas a su operación.
+TERCERO.- El contrato se prorroga automáticamente cada año con un aumento de 25% en el alquiler.
+CUARTO: El depósito de RD$20,000.00 no será devuelto si el inquilino decide no renovar.
+""",
+    'hipoteca_por_cuanto': """
+POR CUANTO: La señora Carla Estévez Herrera es propietaria del inmueble identificado como 9876543210.
+POR CUANTO: La señora Carla Estévez Herrera ha consentido en gravar dicho inmueble con una hipoteca.
+POR TANTO: La señora Carla Estévez Herrera se obliga al pago de la suma de RD$3,200,000.00.
+ARTÍCULO 1.- El interés será del 1.7% mensual sobre el saldo insoluto del préstamo.
+ARTÍCULO 2.- El incumplimiento de dos cuotas consecutivas hará exigible la totalidad de la deuda.
+""",
+    'ordinales_femeninos': """
+NOVENA: La arrendataria no podrá subarrendar el inmueble sin autorización escrita de la arrendadora.
+DÉCIMA: Los gastos de mantenimiento ordinario del inmueble correrán por cuenta de la arrendataria.
+DÉCIMA PRIMERA: La arrendadora podrá inspeccionar el inmueble previa notificación con 48 horas.
+DÉCIMA SEGUNDA: Las partes eligen domicilio en sus respectivas direcciones indicadas en este acto.
+""",
+    'encabezado_no_reconocido': """
+PRIMERO: La Propietaria alquila a El Inquilino un local comercial en la Av. Abraham Lincoln No. 15.
+SEGUNDO: El Inquilino acepta hacerse responsable de cualquier multa impuesta por regulaciones ajenas.
+Tercero: El contrato se prorroga automáticamente cada año con un aumento de 25% en el alquiler.
+CUARTO: El depósito de RD$20,000.00 no será devuelto si el inquilino decide no renovar.
+QUINTO: Nulo.
+""",
+    'con_comparecencia': """
+CONTRATO DE VENTA CONDICIONAL DE MUEBLES
+
+Entre la señora Ana Lucía Peña, dominicana, mayor de edad, portadora de la cédula 001-1234567-8, quien en lo
+adelante se denominará LA VENDEDORA, y el señor Luis Manuel Díaz, quien en lo adelante se denominará EL COMPRADOR,
+se ha convenido y pactado lo siguiente:
+
+PRIMERO: La Vendedora vende al Comprador un juego de comedor de caoba de seis sillas en perfecto estado.
+SEGUNDO: El precio convenido es de RD$85,000.00 pagaderos en doce cuotas mensuales iguales y consecutivas.
+TERCERO: La falta de pago de una sola cuota faculta a la Vendedora a retirar el mueble sin devolver lo pagado.
+""",
+    'sin_estructura': """
+Las partes acuerdan que el vendedor entregará el vehículo en buen estado y el comprador pagará el precio
+acordado en dos cuotas, la primera a la firma y la segunda a los treinta días, sin intereses adicionales.
+""",
+}
+
+
+def test_segmenter():
+    """Segmenta contratos de ejemplo y muestra la confianza y el camino elegido"""
+    print("🔄 Probando segmentador local de cláusulas...")
+    segmenter = ClauseSegmenter()
+
+    for name, text in CONTRATOS.items():
+        result = segmenter.segment(text)
+        fast_path = result.confidence >= MIN_CONFIDENCE
+        segmenter.record_path(fast_path)
+        print(f"\n📄 {name}: {len(result.clauses)} cláusulas, confianza {result.confidence:.2f} {result.details}")
+        print(f"   Camino: {'⚡ rápido (sin LLM)' if fast_path else '🤖 extracción con LLM'}")
+        for clause in result.clauses:
+            print(f"   • {clause['clause_number']}: {clause['text'][:70]}...")
+
+    stats = segmenter.get_stats()
+    print(f"\n📊 Camino rápido: {stats['fast_path_rate']:.0%} | Tiempo medio: {stats['avg_time_ms']:.2f} ms")
+
+    assert segmenter.segment(CONTRATOS['alquiler_ordinales']).confidence >= MIN_CONFIDENCE
+    assert segmenter.segment(CONTRATOS['hipoteca_por_cuanto']).confidence >= MIN_CONFIDENCE
+    assert segmenter.segment(CONTRATOS['sin_estructura']).confidence < MIN_CONFIDENCE
+
+    # El título se descarta, pero la comparecencia de las partes se conserva como segmento propio
+    comparecencia = segmenter.segment(CONTRATOS['con_comparecencia'])
+    assert [c['clause_number'] for c in comparecencia.clauses] == ['PREÁMBULO', 'PRIMERO', 'SEGUNDO', 'TERCERO']
+    assert 'Ana Lucía Peña' in comparecencia.clauses[0]['text']
+    assert segmenter.segment(CONTRATOS['alquiler_ordinales']).clauses[0]['clause_number'] == 'PRIMERO'
+
+    femeninos = segmenter.segment(CONTRATOS['ordinales_femeninos'])
+    assert [c['clause_number'] for c in femeninos.clauses] == ['NOVENA', 'DÉCIMA', 'DÉCIMA PRIMERA', 'DÉCIMA SEGUNDA']
+    assert femeninos.confidence >= MIN_CONFIDENCE
+
+    # "Tercero:" en minúsculas no se reconoce y "QUINTO: Nulo." es demasiado corto: ningún texto se
+    # pierde, pero la confianza baja lo suficiente para pasar por el LLM
+    dudoso = segmenter.segment(CONTRATOS['encabezado_no_reconocido'])
+    assert dudoso.details['unmatched_headings'] == 1 and dudoso.details['merged'] == 1
+    assert 'QUINTO: Nulo.' in dudoso.clauses[-1]['text']
+    assert dudoso.confidence < MIN_CONFIDENCE
+    return True
+
+
+if __name__ == "__main__":
+    success = test_segmenter()
+    sys.exit(0 if success else 1)